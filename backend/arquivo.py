@@ -0,0 +1,169 @@
+"""
+Arquivo morto de vendas antigas em arquivos comprimidos.
+
+`flask --app app vendas-arquivar --antes-de 2021-01-01` (ou o job
+`vendas_arquivar`) move, mês a mês e em lotes, as vendas anteriores ao corte
+para arquivos colunares: Parquet (zstd) se o pyarrow estiver instalado, senão
+NDJSON com gzip. Cada linha já leva o financeiro calculado (snapshot do
+fechamento, quando o mês foi fechado), no mesmo formato de GET /sales. Os
+arquivos ficam em ARQUIVO_VENDAS_PASTA e o manifesto em `vendas_arquivos`;
+GET /sales com intervalo de datas anterior ao horizonte lê os arquivos.
+"""
+import gzip
+import json
+import os
+from datetime import date, datetime
+
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import func, text
+
+from extensions import db
+from modelos import ArquivoVendas, Venda
+from util import _add_months
+from comissoes import _venda_to_dict, _vendedores_info, calcular_financeiro_lote
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pip install pyarrow
+    pa = pq = None
+
+bp = Blueprint('arquivo', __name__, cli_group=None)
+
+ARQUIVO_LOTE = int(os.getenv('ARQUIVO_LOTE', '20000'))
+ARQUIVO_MESES_MINIMO = int(os.getenv('ARQUIVO_MESES_MINIMO', '24'))  # idade mínima do corte
+EXTENSOES = {'parquet': '.parquet', 'ndjson': '.ndjson.gz'}
+
+def pasta_arquivo() -> str:
+    return (current_app.config.get('ARQUIVO_VENDAS_PASTA')
+            or os.path.join(current_app.instance_path, 'arquivo_vendas'))
+
+def formato_padrao() -> str:
+    return 'parquet' if pq is not None else 'ndjson'
+
+def corte_maximo() -> date:
+    """Corte mais recente permitido: 1º dia do mês de ARQUIVO_MESES_MINIMO meses atrás."""
+    hoje = date.today()
+    y, m = _add_months(hoje.year, hoje.month, -ARQUIVO_MESES_MINIMO)
+    return date(y, m, 1)
+
+def _grava(caminho: str, linhas: list, formato: str):
+    tmp = caminho + '.tmp'
+    if formato == 'parquet':
+        pq.write_table(pa.Table.from_pylist(linhas), tmp, compression='zstd')
+    else:
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            for l in linhas:
+                f.write(json.dumps(l, ensure_ascii=False, separators=(',', ':')) + '\n')
+    os.replace(tmp, caminho)
+
+def _le(caminho: str, formato: str) -> list:
+    if formato == 'parquet':
+        if pq is None:
+            raise RuntimeError(f'{caminho}: pyarrow não instalado')
+        return pq.read_table(caminho).to_pylist()
+    with gzip.open(caminho, 'rt', encoding='utf-8') as f:
+        return [json.loads(l) for l in f if l.strip()]
+
+def arquivar_vendas(antes_de: date, lote: int = ARQUIVO_LOTE, formato: str = None, log=print,
+                    progresso=None) -> int:
+    """Move as vendas com data_venda < antes_de para o arquivo morto (commit por lote).
+    `progresso(pct, mensagem)`, se informado, substitui `log`."""
+    if antes_de.day != 1:
+        raise ValueError('O corte deve ser o 1º dia de um mês')
+    if antes_de > corte_maximo():
+        raise ValueError(f'Só é possível arquivar vendas anteriores a {corte_maximo().isoformat()}')
+    formato = formato or formato_padrao()
+    if formato not in EXTENSOES:
+        raise ValueError(f'Formato inválido: {formato}')
+    if formato == 'parquet' and pq is None:
+        raise ValueError('pyarrow não instalado; use o formato ndjson')
+    pasta = pasta_arquivo()
+    os.makedirs(pasta, exist_ok=True)
+    corte = datetime(antes_de.year, antes_de.month, 1)
+
+    total = 0
+    previstas = db.session.query(func.count(Venda.id)).filter(Venda.data_venda < corte).scalar() if progresso else 0
+    while True:
+        primeira = db.session.query(func.min(Venda.data_venda)).filter(Venda.data_venda < corte).scalar()
+        if primeira is None:
+            break
+        ano, mes = primeira.year, primeira.month
+        ny, nm = _add_months(ano, mes, 1)
+        # FOR UPDATE: ninguém altera a venda entre a leitura e o DELETE
+        vendas = (Venda.query
+                  .filter(Venda.data_venda >= datetime(ano, mes, 1), Venda.data_venda < datetime(ny, nm, 1))
+                  .order_by(Venda.id).limit(lote).with_for_update().all())
+        vendedores = _vendedores_info({v.vendedor_id for v in vendas})
+        financeiro = calcular_financeiro_lote(vendas, vendedores)
+        linhas = [_venda_to_dict(v, fin, vendedores.get(v.vendedor_id, (None, None))[0])
+                  for v, fin in zip(vendas, financeiro)]
+        ids = [v.id for v in vendas]
+        nome = f'vendas_{ano:04d}-{mes:02d}_{ids[0]}-{ids[-1]}{EXTENSOES[formato]}'
+        # arquivo primeiro: se o commit falhar, fica um arquivo órfão (fora do
+        # manifesto, ignorado) e a próxima execução regrava o mesmo nome
+        _grava(os.path.join(pasta, nome), linhas, formato)
+        db.session.add(ArquivoVendas(ano=ano, mes=mes, arquivo=nome, formato=formato, linhas=len(ids),
+                                     venda_id_min=ids[0], venda_id_max=ids[-1]))
+        db.session.execute(text("DELETE FROM public.vendas WHERE id = ANY(:ids)"), {'ids': ids})
+        db.session.commit()
+        db.session.expunge_all()
+        total += len(ids)
+        msg = f'{ano:04d}-{mes:02d}: {len(ids)} vendas -> {nome} (total {total})'
+        if progresso:
+            progresso(min(100, total * 100 // max(previstas, 1)), msg)
+        else:
+            log(msg)
+    return total
+
+def horizonte_arquivo():
+    """Data a partir da qual não há vendas arquivadas (None: arquivo vazio)."""
+    ultimo = (db.session.query(ArquivoVendas.ano, ArquivoVendas.mes)
+              .order_by(ArquivoVendas.ano.desc(), ArquivoVendas.mes.desc()).first())
+    if ultimo is None:
+        return None
+    y, m = _add_months(ultimo.ano, ultimo.mes, 1)
+    return date(y, m, 1)
+
+def vendas_arquivadas(ini: date, fim: date, filtro, limite: int) -> list:
+    """Vendas arquivadas de [ini, fim] (datas inclusivas, None = aberto) que
+    passam em `filtro(linha)`, da mais recente para a mais antiga, até `limite`.
+    Lê só os arquivos dos meses do intervalo, do mais novo para o mais antigo."""
+    chave = ArquivoVendas.ano * 12 + ArquivoVendas.mes
+    q = ArquivoVendas.query
+    if ini:
+        q = q.filter(chave >= ini.year * 12 + ini.month)
+    if fim:
+        q = q.filter(chave <= fim.year * 12 + fim.month)
+    arquivos = q.order_by(ArquivoVendas.ano.desc(), ArquivoVendas.mes.desc(), ArquivoVendas.id).all()
+    pasta = pasta_arquivo()
+    out = []
+    i = 0
+    while i < len(arquivos) and len(out) < limite:
+        mes = (arquivos[i].ano, arquivos[i].mes)
+        achadas = []
+        while i < len(arquivos) and (arquivos[i].ano, arquivos[i].mes) == mes:
+            a = arquivos[i]
+            achadas.extend(l for l in _le(os.path.join(pasta, a.arquivo), a.formato) if filtro(l))
+            i += 1
+        achadas.sort(key=lambda l: l.get('data_venda') or '', reverse=True)
+        out.extend(achadas[:limite - len(out)])
+    return out
+
+@bp.cli.command('vendas-arquivar')
+@click.option('--antes-de', 'antes_de', required=True, help='Corte (YYYY-MM-01): arquiva vendas anteriores.')
+@click.option('--lote', type=int, default=ARQUIVO_LOTE, show_default=True)
+@click.option('--formato', type=click.Choice(sorted(EXTENSOES)), default=None,
+              help='Padrão: parquet se o pyarrow estiver instalado, senão ndjson.')
+def cli_vendas_arquivar(antes_de, lote, formato):
+    """Move vendas antigas para arquivos comprimidos (e as remove de `vendas`)."""
+    try:
+        corte = datetime.strptime(antes_de, '%Y-%m-%d').date()
+    except ValueError:
+        raise click.BadParameter('use YYYY-MM-DD', param_hint='--antes-de')
+    try:
+        n = arquivar_vendas(corte, lote, formato, log=click.echo)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'{n} vendas arquivadas em {pasta_arquivo()}.')
@@ -0,0 +1,170 @@
+"""
+Histórico de alterações das vendas gravado por write-behind.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from extensions import db
+from modelos import VendaAudit
+
+# ===================== AUDITORIA (write-behind) =====================
+# A requisição só enfileira as diferenças (após o commit); uma thread por
+# processo grava em lotes em vendas_audit. Fila cheia, banco fora ou
+# encerramento com pendências: as linhas vão para AUDIT_SPOOL (NDJSON), que é
+# reprocessado no próximo bootstrap. Nada de auditoria se perde nem bloqueia a venda.
+AUDIT_CAMPOS = ('valor', 'status', 'perc_comissao_aplicado', 'banco_id', 'loja_parceira_id')
+AUDIT_FILA_MAX = int(os.getenv('AUDIT_FILA_MAX', '10000'))
+AUDIT_LOTE = 500
+AUDIT_FLUSH_SEG = float(os.getenv('AUDIT_FLUSH_SEG', '1'))
+AUDIT_SPOOL_ARQUIVO = 'vendas_audit.spool.ndjson'  # em app.instance_path, se AUDIT_SPOOL não vier na config
+
+def _audit_str(v):
+    if v is None:
+        return None
+    if isinstance(v, float):
+        return repr(v)
+    return str(v)
+
+def audit_diffs(venda_id: int, antes: dict, depois: dict, usuario_id, origem: str) -> list:
+    agora = datetime.utcnow().isoformat()
+    out = []
+    for campo in AUDIT_CAMPOS:
+        if campo not in antes or campo not in depois:
+            continue
+        a, d = antes[campo], depois[campo]
+        # 1.5 (float do JSON) e Decimal('1.50') do banco são o mesmo valor
+        if a == d or (a is not None and d is not None and _audit_str(a) == _audit_str(d)):
+            continue
+        out.append({'venda_id': venda_id, 'campo': campo, 'valor_antigo': _audit_str(a),
+                    'valor_novo': _audit_str(d), 'alterado_por': usuario_id,
+                    'alterado_em': agora, 'origem': origem})
+    return out
+
+class _AuditoriaWriteBehind:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.fila = None
+        self.thread = None
+        self.parar = None
+        self.app = None
+        self.spool = None
+
+    def _configura(self):
+        # chamado com app context; a thread e o atexit usam o que ficou guardado aqui
+        app = current_app._get_current_object()
+        self.app = app
+        self.spool = app.config.get('AUDIT_SPOOL') or os.path.join(app.instance_path, AUDIT_SPOOL_ARQUIVO)
+
+    def _garante_thread(self, engine):
+        # por processo: após fork (jobs-worker, gunicorn --preload) recria fila e thread
+        with self.lock:
+            if self.pid == os.getpid() and self.thread is not None:
+                return
+            self._configura()
+            self.pid = os.getpid()
+            self.fila = queue.Queue(maxsize=AUDIT_FILA_MAX)
+            self.parar = threading.Event()
+            self.thread = threading.Thread(target=self._loop, args=(engine,), name='audit-writer', daemon=True)
+            self.thread.start()
+
+    def registrar(self, linhas: list):
+        if not linhas:
+            return
+        self._garante_thread(db.engine)
+        transbordo = []
+        for linha in linhas:
+            try:
+                self.fila.put_nowait(linha)
+            except queue.Full:
+                transbordo.append(linha)
+        if transbordo:
+            self._spool(transbordo)
+
+    def _drena(self, bloqueia: bool) -> list:
+        lote = []
+        try:
+            if bloqueia:
+                lote.append(self.fila.get(timeout=AUDIT_FLUSH_SEG))
+            while len(lote) < AUDIT_LOTE:
+                lote.append(self.fila.get_nowait())
+        except queue.Empty:
+            pass
+        return lote
+
+    def _grava(self, engine, lote: list) -> bool:
+        for tentativa in range(3):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(db.insert(VendaAudit), [
+                        {**l, 'alterado_em': datetime.fromisoformat(l['alterado_em'])} for l in lote
+                    ])
+                return True
+            except Exception:
+                self.app.logger.exception('auditoria: falha ao gravar lote (tentativa %s)', tentativa + 1)
+                time.sleep(0.5 * (tentativa + 1))
+        return False
+
+    def _loop(self, engine):
+        while not self.parar.is_set():
+            lote = self._drena(bloqueia=True)
+            if lote and not self._grava(engine, lote):
+                self._spool(lote)
+
+    def encerrar(self):
+        """atexit: grava o que restou na fila; se o banco falhar, vai para o spool."""
+        with self.lock:
+            if self.pid != os.getpid() or self.thread is None:
+                return
+            self.parar.set()
+        self.thread.join(timeout=AUDIT_FLUSH_SEG + 1)
+        engine = None
+        try:
+            with self.app.app_context():
+                engine = db.engine
+        except Exception:
+            pass
+        while True:
+            lote = self._drena(bloqueia=False)
+            if not lote:
+                break
+            if engine is None or not self._grava(engine, lote):
+                self._spool(lote)
+
+    def _spool(self, linhas: list):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.spool) or '.', exist_ok=True)
+            with open(self.spool, 'a', encoding='utf-8') as f:
+                for l in linhas:
+                    f.write(json.dumps(l, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def reprocessa_spool(self) -> int:
+        """Boot: grava no banco as linhas do spool (renomeado antes, então só um processo o pega)."""
+        self._configura()
+        if not os.path.exists(self.spool):
+            return 0
+        tomado = f'{self.spool}.{os.getpid()}'
+        try:
+            os.replace(self.spool, tomado)
+        except FileNotFoundError:
+            return 0
+        with open(tomado, encoding='utf-8') as f:
+            linhas = [json.loads(l) for l in f if l.strip()]
+        for i in range(0, len(linhas), AUDIT_LOTE):
+            if not self._grava(db.engine, linhas[i:i + AUDIT_LOTE]):
+                self._spool(linhas[i:])
+                break
+        os.remove(tomado)
+        return len(linhas)
+
+_auditoria = _AuditoriaWriteBehind()
+atexit.register(_auditoria.encerrar)
@@ -0,0 +1,291 @@
+"""
+Login, logout, reset de senha, helpers de role/vigência e revogação de tokens.
+"""
+import os
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from functools import wraps
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, jwt_required
+from werkzeug.security import check_password_hash, generate_password_hash
+from sqlalchemy import func, text
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from extensions import db, jwt_manager
+from modelos import TokenRevogado, Vendedor
+from limites import limita_tentativas
+
+bp = Blueprint('autenticacao', __name__, cli_group=None)
+
+# ================ HELPERS AUTH/ROLE =================
+def dentro_vigencia(u: Vendedor) -> bool:
+    hoje = date.today()
+    if u.inicio_vigencia and hoje < u.inicio_vigencia: return False
+    if u.fim_vigencia and hoje > u.fim_vigencia: return False
+    return True
+
+def admin_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        claims = get_jwt()
+        if claims.get('role') != 'admin':
+            return jsonify({'msg': 'Acesso restrito a administradores'}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+# ============== REVOGAÇÃO DE TOKENS ==============
+# Cada token leva `gen` (vendedores.token_geracao no login). Trocar a senha,
+# o role ou pedir revogação incrementa a geração e invalida todos os tokens do
+# usuário; logout revoga só o `jti`. A checagem (blocklist do
+# flask_jwt_extended) usa um cache em memória: dicionário por usuário (geração
+# + vigência) e conjunto de jtis revogados. O banco só é consultado a cada
+# TOKENS_CACHE_SEG, e só recarrega quando (max(id), count(*)) de
+# tokens_revogados muda.
+TOKENS_CACHE_SEG = float(os.getenv('TOKENS_CACHE_SEG', '5'))
+
+def _jwt_validade() -> timedelta:
+    exp = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', timedelta(minutes=15))
+    if isinstance(exp, (int, float)) and not isinstance(exp, bool):
+        return timedelta(seconds=exp)
+    return exp if isinstance(exp, timedelta) else timedelta(days=3650)  # False = não expira
+
+class _CacheRevogacao:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versao = None
+        self.usuarios = {}      # id -> (geracao, inicio_vigencia, fim_vigencia)
+        self.jtis = frozenset()
+        self.ausentes = set()   # subs que não estavam em `vendedores` na última recarga
+        self.checado_em = 0.0
+        self.atualizando = False
+
+    def _atualiza(self, forcar_usuarios: bool = False):
+        with db.engine.connect() as conn:
+            if random.random() < 0.01:
+                conn.execute(text("DELETE FROM public.tokens_revogados WHERE expira_em < timezone('utc', now())"))
+                conn.commit()
+            versao = tuple(conn.execute(text(
+                "SELECT coalesce(max(id), 0), count(*) FROM public.tokens_revogados"
+            )).first())
+            if versao == self.versao and not forcar_usuarios:
+                return
+            usuarios = {r[0]: (r[1], r[2], r[3]) for r in conn.execute(text(
+                "SELECT id, token_geracao, inicio_vigencia, fim_vigencia FROM public.vendedores"
+            ))}
+            jtis = frozenset(r[0] for r in conn.execute(text(
+                "SELECT jti FROM public.tokens_revogados "
+                "WHERE jti IS NOT NULL AND expira_em > timezone('utc', now())"
+            )))
+        with self.lock:
+            self.usuarios, self.jtis, self.versao = usuarios, jtis, versao
+            self.ausentes = set()
+
+    def revogado(self, payload: dict) -> bool:
+        agora = time.monotonic()
+        with self.lock:
+            atualizar = (agora - self.checado_em >= TOKENS_CACHE_SEG or self.versao is None) and not self.atualizando
+            if atualizar:
+                self.atualizando = True
+        if atualizar:
+            try:
+                self._atualiza()
+                self.checado_em = agora
+            except Exception:
+                current_app.logger.exception('revogação: falha ao atualizar o cache')
+                if self.versao is None:
+                    raise
+            finally:
+                with self.lock:
+                    self.atualizando = False
+        if payload.get('jti') in self.jtis:
+            return True
+        try:
+            sub = int(payload.get('sub'))
+        except (TypeError, ValueError):
+            return True
+        info = self.usuarios.get(sub)
+        if info is None:
+            # usuário inserido sem evento (seed, migração): recarrega os vendedores
+            # uma vez; se continuar ausente (removido), rejeita sem nova consulta
+            if sub in self.ausentes:
+                return True
+            try:
+                self._atualiza(forcar_usuarios=True)
+            except Exception:
+                current_app.logger.exception('revogação: falha ao recarregar os vendedores')
+                return False
+            info = self.usuarios.get(sub)
+            if info is None:
+                with self.lock:
+                    self.ausentes.add(sub)
+                return True
+        geracao, ini, fim = info
+        if int(payload.get('gen') or 0) != (geracao or 0):
+            return True
+        hoje = date.today()
+        return bool((ini and hoje < ini) or (fim and hoje > fim))
+
+    def invalida(self):
+        self.checado_em = 0.0
+
+_revogacao = _CacheRevogacao()
+
+@jwt_manager.token_in_blocklist_loader
+def _token_revogado(jwt_header, jwt_payload):
+    return _revogacao.revogado(jwt_payload)
+
+@jwt_manager.revoked_token_loader
+def _token_revogado_resposta(jwt_header, jwt_payload):
+    return jsonify({'msg': 'Sessão encerrada; faça login novamente'}), 401
+
+def _tokens_evento(vendedor_id: int = None, jti: str = None, expira_em: datetime = None):
+    """Grava (na transação corrente) o evento que faz os caches recarregarem."""
+    db.session.add(TokenRevogado(
+        jti=jti, vendedor_id=vendedor_id,
+        expira_em=expira_em or (datetime.utcnow() + _jwt_validade()),
+    ))
+
+def revogar_tokens_usuario(vendedor_id: int):
+    """Invalida todos os tokens já emitidos do usuário (na transação corrente)."""
+    db.session.execute(text("UPDATE public.vendedores SET token_geracao = token_geracao + 1 WHERE id = :id"),
+                       {'id': vendedor_id})
+    _tokens_evento(vendedor_id)
+
+def _emitir_token(user: "Vendedor") -> str:
+    return create_access_token(identity=str(user.id),
+                               additional_claims={'role': user.role, 'gen': user.token_geracao or 0})
+
+# ======== TOKEN DE RESET ========
+def _pwd_reset_serializer():
+    secret = current_app.config.get('JWT_SECRET_KEY', 'dev-secret')
+    return URLSafeTimedSerializer(secret_key=secret, salt='pwd-reset')
+
+# ===================== AUTH =====================
+@bp.post('/auth/login')
+@limita_tentativas
+def login():
+    data = request.get_json(silent=True) or {}
+    email = (data.get('email') or '').strip().lower()
+    raw_pwd = data.get('password') if 'password' in data else data.get('senha')
+    senha = raw_pwd.strip() if isinstance(raw_pwd, str) else None
+
+    if not email or not senha:
+        return jsonify({'msg': 'Email e senha são obrigatórios'}), 400
+
+    user = Vendedor.query.filter(func.lower(Vendedor.email) == email).first()
+    if not user or not check_password_hash(user.senha_hash, senha):
+        return jsonify({'msg': 'Credenciais inválidas'}), 401
+
+    if not dentro_vigencia(user):
+        return jsonify({'msg': 'Usuário fora de vigência'}), 403
+
+    token = _emitir_token(user)
+    return jsonify({
+        'access_token': token,
+        'user': {
+            'id': user.id, 'nome': user.nome, 'role': user.role,
+            'loja_parceira': user.loja_parceira, 'tipo': user.tipo,
+            'inicio_vigencia': (user.inicio_vigencia.isoformat() if user.inicio_vigencia else None),
+            'fim_vigencia': (user.fim_vigencia.isoformat() if user.fim_vigencia else None),
+        }
+    })
+
+@bp.post('/auth/logout')
+@jwt_required()
+def logout():
+    claims = get_jwt()
+    exp = claims.get('exp')
+    _tokens_evento(int(get_jwt_identity()), claims.get('jti'),
+                   datetime.utcfromtimestamp(exp) if exp else None)
+    db.session.commit()
+    _revogacao.invalida()
+    return jsonify({'msg': 'Sessão encerrada'}), 200
+
+@bp.post('/sellers/<int:seller_id>/revoke-tokens')
+@jwt_required()
+@admin_required
+def revoke_seller_tokens(seller_id):
+    """Derruba todas as sessões do usuário (ex.: suspeita de vazamento)."""
+    db.get_or_404(Vendedor, seller_id)
+    revogar_tokens_usuario(seller_id)
+    db.session.commit()
+    _revogacao.invalida()
+    return jsonify({'ok': True})
+
+# ======== NOVOS ENDPOINTS AUXILIARES ========
+@bp.post('/auth/check-email')
+@limita_tentativas
+def check_email():
+    data = request.get_json(silent=True) or {}
+    email = (data.get('email') or '').strip().lower()
+    if not email:
+        return jsonify({'exists': False, 'msg': 'E-mail obrigatório'}), 200
+    user = Vendedor.query.filter(func.lower(Vendedor.email) == email).first()
+    return jsonify({'exists': bool(user)}), 200
+
+@bp.post('/auth/reset-password')
+@limita_tentativas
+def reset_password_direct():
+    data = request.get_json(silent=True) or {}
+    email = (data.get('email') or '').strip().lower()
+    nova = (data.get('password') or data.get('nova_senha') or '').strip()
+    if not email or not nova:
+        return jsonify({'msg': 'Email e nova senha são obrigatórios'}), 400
+    if len(nova) < 6:
+        return jsonify({'msg': 'A nova senha deve ter pelo menos 6 caracteres'}), 400
+    user = Vendedor.query.filter(func.lower(Vendedor.email) == email).first()
+    if not user:
+        return jsonify({'msg': 'E-mail não encontrado'}), 404
+    user.senha_hash = generate_password_hash(nova, method='pbkdf2:sha256', salt_length=16)
+    revogar_tokens_usuario(user.id)
+    db.session.commit()
+    _revogacao.invalida()
+    return jsonify({'msg': 'Senha redefinida com sucesso'}), 200
+
+# ======== ESQUECI MINHA SENHA ========
+@bp.post('/auth/forgot')
+def forgot_password():
+    data = request.get_json(silent=True) or {}
+    email = (data.get('email') or '').strip().lower()
+    if not email:
+        return jsonify({'msg': 'Informe um e-mail'}), 400
+    user = Vendedor.query.filter(func.lower(Vendedor.email) == email).first()
+    if not user:
+        return jsonify({'msg': 'E-mail não encontrado'}), 404
+    s = _pwd_reset_serializer()
+    reset_token = s.dumps({'uid': user.id, 'email': user.email})
+    base = os.getenv('FRONTEND_BASE_URL', 'http://localhost:3000')
+    reset_url = f'{base}/reset?token={reset_token}'
+    current_app.logger.info('*** RESET DE SENHA ***')
+    current_app.logger.info('Usuário: %s (%s)', user.nome, user.email)
+    current_app.logger.info('URL: %s', reset_url)
+    return jsonify({'msg': 'OK', 'token': reset_token, 'url': reset_url}), 200
+
+@bp.post('/auth/reset')
+def reset_password():
+    data = request.get_json(silent=True) or {}
+    token = (data.get('token') or '').strip()
+    nova = (data.get('nova_senha') or '').strip()
+    if not token or not nova:
+        return jsonify({'msg': 'Token e nova senha são obrigatórios'}), 400
+    if len(nova) < 6:
+        return jsonify({'msg': 'A nova senha deve ter pelo menos 6 caracteres'}), 400
+    s = _pwd_reset_serializer()
+    try:
+        payload = s.loads(token, max_age=3600)  # 1 hora
+        uid = int(payload.get('uid'))
+    except SignatureExpired:
+        return jsonify({'msg': 'Token expirado. Solicite novamente.'}), 400
+    except (BadSignature, Exception):
+        return jsonify({'msg': 'Token inválido'}), 400
+    user = db.session.get(Vendedor, uid)
+    if not user:
+        return jsonify({'msg': 'Usuário não encontrado'}), 404
+    user.senha_hash = generate_password_hash(nova, method='pbkdf2:sha256', salt_length=16)
+    revogar_tokens_usuario(user.id)
+    db.session.commit()
+    _revogacao.invalida()
+    return jsonify({'msg': 'Senha redefinida com sucesso'}), 200
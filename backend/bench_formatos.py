@@ -0,0 +1,100 @@
+"""
+Tamanho da listagem de vendas: formato atual (lista de objetos) x colunar,
+sem compressão, com gzip e com brotli.
+
+Sem --base, monta N vendas sintéticas com os mesmos campos de GET /sales (os
+geradores do seed_data.py). Com --base, baixa /sales do backend nos dois
+formatos (o servidor aplica o filtro e o limite de 1000 linhas).
+
+Uso:
+    python bench_formatos.py --linhas 1000
+    python bench_formatos.py --base http://127.0.0.1:5000 --email admin@carga.local
+"""
+import argparse
+import gzip
+import json
+import random
+from datetime import datetime, timedelta
+
+from colunar import colunar, linhas as linhas_colunar
+from dinheiro import aplicar_pct, centavos, pct_escala, reais
+from load_test import _login, _request
+from seed_data import BANCOS, COMISSOES_TIPICAS, SENHA_PADRAO, STATUS_PESOS, _nome, gerar_cpf
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def vendas_sinteticas(n: int, rnd: random.Random) -> list:
+    vendedores = [(i + 1, _nome(rnd)) for i in range(40)]
+    lojas = [None] + [(i + 1, f'Loja {i + 1}', rnd.choice([0.0, 10.0, 20.0, 30.0])) for i in range(30)]
+    status, pesos = zip(*STATUS_PESOS)
+    inicio = datetime.now() - timedelta(days=365)
+    out = []
+    for i in range(n):
+        vid, vnome = rnd.choice(vendedores)
+        loja = rnd.choice(lojas)
+        valor_c = centavos(round(rnd.lognormvariate(10.4, 0.8), 2))
+        perc = rnd.choice(COMISSOES_TIPICAS)
+        com_c = aplicar_pct(valor_c, pct_escala(perc))
+        rep_pct = loja[2] if loja else 0.0
+        rep_c = aplicar_pct(com_c, pct_escala(rep_pct))
+        vend_c = aplicar_pct(com_c, pct_escala(30.0))
+        banco_id = rnd.randrange(len(BANCOS))
+        fin = {
+            'comissao_real': reais(com_c), 'loja_repasse_percent': rep_pct,
+            'loja_repasse_valor': reais(rep_c), 'comissao_vendedor': reais(vend_c),
+            'empresa_bruta': reais(com_c - rep_c), 'empresa_liquida': reais(com_c - rep_c - vend_c),
+        }
+        out.append({
+            'id': n - i, 'vendedor_id': vid, 'vendedor_nome': vnome,
+            'cliente_id': rnd.randint(1, 50000), 'cliente_nome': _nome(rnd), 'cliente_documento': gerar_cpf(rnd),
+            'valor': reais(valor_c), 'banco': BANCOS[banco_id], 'status': rnd.choices(status, pesos)[0],
+            'data_venda': (inicio + timedelta(seconds=rnd.randrange(365 * 86400))).isoformat(),
+            'loja_parceira': loja[1] if loja else None, 'banco_id': banco_id + 1,
+            'loja_parceira_id': loja[0] if loja else None, 'perc_comissao_aplicado': perc,
+            'comissao': fin['comissao_real'], **fin,
+        })
+    return out
+
+def _json(obj) -> bytes:
+    # mesmo formato do jsonify fora do modo debug
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def tamanhos(corpo: bytes) -> dict:
+    out = {'json': len(corpo), 'gzip': len(gzip.compress(corpo, compresslevel=6))}
+    if brotli is not None:
+        out['br'] = len(brotli.compress(corpo, quality=5))
+    return out
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Tamanho de GET /sales: linhas x colunar, com e sem compressão.')
+    p.add_argument('--linhas', type=int, default=1000)
+    p.add_argument('--base', default=None, help='backend para medir a resposta real')
+    p.add_argument('--email', default='admin@carga.local')
+    p.add_argument('--senha', default=SENHA_PADRAO)
+    p.add_argument('--seed', type=int, default=7)
+    args = p.parse_args(argv)
+
+    if args.base:
+        base = args.base.rstrip('/')
+        token = _login(base, args.email, args.senha)
+        _, _, corpo_linhas = _request(base, 'GET', '/sales', token=token)
+        _, _, corpo_colunar = _request(base, 'GET', '/sales?format=columnar', token=token)
+        vendas = json.loads(corpo_linhas)
+        assert linhas_colunar(json.loads(corpo_colunar)) == vendas, 'colunar não reconstrói as linhas'
+    else:
+        vendas = vendas_sinteticas(args.linhas, random.Random(args.seed))
+        corpo_linhas, corpo_colunar = _json(vendas), _json(colunar(vendas))
+        assert linhas_colunar(json.loads(corpo_colunar)) == json.loads(corpo_linhas)
+
+    base_bytes = len(corpo_linhas)
+    print(f'{len(vendas)} vendas' + ('' if brotli else ' (brotli não instalado)'))
+    print(f"{'formato':<10}{'codificação':<13}{'bytes':>10}{'x menor':>9}")
+    for nome, corpo in (('linhas', corpo_linhas), ('colunar', corpo_colunar)):
+        for cod, n in tamanhos(corpo).items():
+            print(f'{nome:<10}{cod:<13}{n:>10}{base_bytes / n:>9.1f}')
+
+if __name__ == '__main__':
+    main()
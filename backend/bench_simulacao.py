@@ -0,0 +1,62 @@
+"""
+Tempo do cálculo da simulação (POST /simulations) em N vendas sintéticas:
+vetorizado (NumPy, simulacoes.py) x uma venda por vez com as funções de
+dinheiro.py, como no cálculo por linha. Não usa banco; mede só as contas
+(a leitura das vendas é uma consulta só).
+
+Uso:
+    python bench_simulacao.py --linhas 500000
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from dinheiro import aplicar_pct, centavos, pct_escala
+from seed_data import COMISSOES_TIPICAS
+import simulacoes
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Simulação: NumPy x cálculo por linha.')
+    p.add_argument('--linhas', type=int, default=500000)
+    p.add_argument('--seed', type=int, default=7)
+    args = p.parse_args(argv)
+    try:
+        import numpy as np
+    except ImportError:
+        raise SystemExit('numpy não instalado')
+
+    rnd = random.Random(args.seed)
+    n = args.linhas
+    valor = np.array([centavos(round(rnd.lognormvariate(10.4, 0.8), 2)) for _ in range(n)], dtype=np.int64)
+    vendedor = np.array([rnd.randint(1, 40) for _ in range(n)], dtype=np.int64)
+    perc = np.array([np.nan if rnd.random() < 0.2 else rnd.choice(COMISSOES_TIPICAS) for _ in range(n)])
+    rep = np.array([pct_escala(rnd.choice([0, 0, 10, 20, 30])) for _ in range(n)], dtype=np.int64)
+    inicio = date.today() - timedelta(days=365)
+    dias = np.array([inicio + timedelta(days=rnd.randrange(365)) for _ in range(n)], dtype='datetime64[D]')
+    regras = [(None, centavos(v), None, pct_escala(p)) for v, p in ((0, 2.0), (20000, 2.5), (50000, 3.0))]
+    lista = list(zip(valor.tolist(), perc.tolist(), rep.tolist(), vendedor.tolist()))
+
+    t = time.perf_counter()
+    atual = list(simulacoes._financeiro(valor, vendedor, perc, rep, regras))
+    simulacoes._agrupa(dias.astype('datetime64[M]').astype(np.int64), atual, atual)
+    simulacoes._agrupa(vendedor, atual, atual)
+    vetorizado = time.perf_counter() - t
+
+    t = time.perf_counter()
+    total = 0
+    for vc, p, r, _vid in lista:
+        if p != p:  # NaN: faixas
+            pct = next(pct for _v, vmin, _m, pct in reversed(regras) if vc >= vmin)
+        else:
+            pct = pct_escala(p)
+        com = aplicar_pct(vc, pct)
+        total += com - aplicar_pct(com, r)
+    por_linha = time.perf_counter() - t
+    assert total == int(atual[2].sum()), 'resultados diferentes'
+
+    print(f'{n} vendas: NumPy {vetorizado * 1000:.0f} ms, por linha {por_linha * 1000:.0f} ms '
+          f'({por_linha / vetorizado:.0f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,470 @@
+"""
+Cadastros administrativos: bancos, lojas parceiras, vendedores e regras de
+comissão do vendedor.
+"""
+from datetime import date
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from werkzeug.security import generate_password_hash
+from sqlalchemy import func
+
+from extensions import db, read_only
+from modelos import (
+    Banco, BancoComissaoVersao, LojaParceira, LojaRepasseVersao, RegraComissaoVendedor, Vendedor,
+)
+from util import (
+    normalize_commissions, parse_date, _parse_pct, parse_percent_to_float_or_none, _to_int_or_none,
+    valida_cnpj,
+)
+from comissoes import (
+    _indice_comissoes_banco, _invalida_indice_comissao_vendedor, validar_percentuais_lote,
+    VIGENCIA_INICIAL,
+)
+from autenticacao import admin_required, _revogacao, revogar_tokens_usuario, _tokens_evento
+from idempotencia import idempotente
+from metas import _registra_evento_meta
+
+bp = Blueprint('cadastros', __name__, cli_group=None)
+
+# ===================== BANCOS =====================
+@bp.get('/banks')
+@jwt_required()
+@read_only
+def list_banks():
+    rows = Banco.query.order_by(Banco.nome.asc()).all()
+    # tabela vigente hoje pelo histórico (a mesma que create_sale valida),
+    # inclusive versões agendadas que já entraram em vigor
+    idx, hoje = _indice_comissoes_banco(), date.today()
+    out = []
+    for r in rows:
+        out.append({
+            'id': r.id,
+            'nome': r.nome,
+            'codigo': r.codigo,
+            'ativo': r.ativo,
+            'comissoes': list(idx.tabela(r.id, hoje) or [])
+        })
+    return jsonify(out)
+
+@bp.post('/banks')
+@jwt_required()
+@admin_required
+@idempotente
+def create_bank():
+    data = request.get_json(silent=True) or {}
+    nome = (data.get('nome') or '').strip()
+    if not nome:
+        return jsonify({'msg': 'Nome é obrigatório'}), 400
+
+    coms = normalize_commissions(data)
+    b = Banco(
+        nome=nome,
+        codigo=(data.get('codigo') or '').strip() or None,
+        ativo=bool(data.get('ativo', True)),
+        comissoes=coms or []
+    )
+    db.session.add(b)
+    db.session.flush()
+    db.session.add(BancoComissaoVersao(banco_id=b.id, vigencia_inicio=VIGENCIA_INICIAL,
+                                       comissoes=b.comissoes, criado_por=int(get_jwt_identity())))
+    db.session.commit()
+    return jsonify({'id': b.id}), 201
+
+@bp.put('/banks/<int:bank_id>')
+@jwt_required()
+@admin_required
+def update_bank(bank_id):
+    b = Banco.query.get_or_404(bank_id)
+    data = request.get_json(silent=True) or {}
+
+    if 'nome' in data:
+        nome = (data.get('nome') or '').strip()
+        if not nome:
+            return jsonify({'msg': 'Nome inválido'}), 400
+        b.nome = nome
+
+    if 'codigo' in data:
+        b.codigo = (data.get('codigo') or '').strip() or None
+
+    if 'ativo' in data:
+        b.ativo = bool(data.get('ativo'))
+
+    # comissões: cada alteração vira uma nova versão (vigente a partir de
+    # `vigencia_inicio`, padrão hoje; pode retroagir até a última alteração,
+    # nunca antes dela). A tabela vigente sai sempre do histórico;
+    # `bancos.comissoes` fica só com a lista do cadastro.
+    if any(k in data for k in ('comissoes', 'faixas', 'commission_values')):
+        incoming = normalize_commissions(data)
+        hoje = date.today()
+        vig = parse_date(data.get('vigencia_inicio')) or hoje
+        ultima = (db.session.query(func.max(BancoComissaoVersao.vigencia_inicio))
+                  .filter(BancoComissaoVersao.banco_id == b.id).scalar())
+        if vig > hoje or (ultima and vig < ultima):
+            db.session.rollback()
+            return jsonify({'msg': 'Vigência inválida (entre a última alteração e hoje)'}), 400
+        db.session.add(BancoComissaoVersao(banco_id=b.id, vigencia_inicio=vig, comissoes=incoming,
+                                           criado_por=int(get_jwt_identity())))
+
+    db.session.commit()
+    return jsonify({'ok': True})
+
+@bp.get('/banks/<int:bank_id>/commission-tables')
+@jwt_required()
+@read_only
+def list_bank_commission_tables(bank_id):
+    Banco.query.get_or_404(bank_id)
+    dia = parse_date(request.args.get('date'))
+    if dia:
+        return jsonify({'date': dia.isoformat(), 'comissoes': list(_indice_comissoes_banco().tabela(bank_id, dia) or [])})
+    rows = (BancoComissaoVersao.query.filter_by(banco_id=bank_id)
+            .order_by(BancoComissaoVersao.vigencia_inicio.asc(), BancoComissaoVersao.id.asc()).all())
+    return jsonify([{
+        'id': r.id,
+        'vigencia_inicio': (r.vigencia_inicio.isoformat() if r.vigencia_inicio != VIGENCIA_INICIAL else None),
+        'comissoes': r.comissoes or [],
+        'criado_em': (r.criado_em.isoformat() if r.criado_em else None),
+        'criado_por': r.criado_por,
+    } for r in rows])
+
+@bp.post('/banks/commissions/check')
+@jwt_required()
+@read_only
+def check_bank_commissions():
+    """Validação em lote: [{banco_id, data (YYYY-MM-DD), perc_comissao_aplicado}] -> [bool]."""
+    data = request.get_json(silent=True) or {}
+    itens = data.get('itens') if isinstance(data, dict) else data
+    if not isinstance(itens, list) or len(itens) > 50000:
+        return jsonify({'msg': 'Envie até 50000 itens'}), 400
+    hoje = date.today()
+    parsed, invalidos = [], set()
+    for i, it in enumerate(itens):
+        it = it if isinstance(it, dict) else {}
+        raw = it.get('perc_comissao_aplicado')
+        perc = _parse_pct(raw) if raw not in (None, '') else None
+        if raw not in (None, '') and perc is None:
+            invalidos.add(i)
+        parsed.append((_to_int_or_none(it.get('banco_id')), parse_date(it.get('data')) or hoje, perc))
+    validos = validar_percentuais_lote(parsed)
+    return jsonify({'validos': [ok and i not in invalidos for i, ok in enumerate(validos)]})
+
+# ===================== LOJAS =====================
+@bp.get('/stores')
+@jwt_required()
+@read_only
+def list_stores():
+    rows = LojaParceira.query.order_by(LojaParceira.nome.asc()).all()
+    return jsonify([{
+        'id': r.id,
+        'nome': r.nome,
+        'cnpj': r.cnpj,
+        'cidade': r.cidade,
+        'ativo': r.ativo,
+        'repasse': (float(r.repasse) if r.repasse is not None else None),
+        'data_inicio': (r.data_inicio.isoformat() if r.data_inicio else None),
+        'data_fim': (r.data_fim.isoformat() if r.data_fim else None),
+    } for r in rows])
+
+@bp.post('/stores')
+@jwt_required()
+@admin_required
+@idempotente
+def create_store():
+    data = request.get_json(silent=True) or {}
+    nome = (data.get('nome') or '').strip()
+    if not nome:
+        return jsonify({'msg': 'Nome é obrigatório'}), 400
+
+    repasse = parse_percent_to_float_or_none(data.get('repasse'))
+    dt_inicio = parse_date(data.get('data_inicio'))
+    dt_fim = parse_date(data.get('data_fim'))
+
+    l = LojaParceira(
+        nome=nome,
+        cnpj=(data.get('cnpj') or '').strip() or None,
+        cidade=(data.get('cidade') or '').strip() or None,
+        ativo=bool(data.get('ativo', True)),
+        repasse=repasse,
+        data_inicio=dt_inicio,
+        data_fim=dt_fim
+    )
+    db.session.add(l)
+    db.session.flush()
+    db.session.add(LojaRepasseVersao(
+        loja_parceira_id=l.id, vigencia_inicio=VIGENCIA_INICIAL, repasse=l.repasse, ativo=l.ativo,
+        data_inicio=l.data_inicio, data_fim=l.data_fim, criado_por=int(get_jwt_identity())
+    ))
+    db.session.commit()
+    return jsonify({'id': l.id}), 201
+
+@bp.put('/stores/<int:store_id>')
+@jwt_required()
+@admin_required
+def update_store(store_id):
+    l = LojaParceira.query.get_or_404(store_id)
+    data = request.get_json(silent=True) or {}
+
+    if 'nome' in data:
+        nome = (data.get('nome') or '').strip()
+        if not nome: return jsonify({'msg': 'Nome inválido'}), 400
+        l.nome = nome
+
+    if 'cnpj' in data:
+        cnpj = (data.get('cnpj') or '').strip()
+        if cnpj:
+            if not valida_cnpj(cnpj):
+                return jsonify({'msg': 'CNPJ inválido'}), 400
+            l.cnpj = cnpj
+        else:
+            l.cnpj = None
+
+    if 'cidade' in data:
+        l.cidade = (data.get('cidade') or '').strip() or None
+
+    if 'ativo' in data:
+        l.ativo = bool(data.get('ativo'))
+
+    if 'repasse' in data:
+        l.repasse = parse_percent_to_float_or_none(data.get('repasse'))
+
+    if 'data_inicio' in data:
+        l.data_inicio = parse_date(data.get('data_inicio'))
+
+    if 'data_fim' in data:
+        l.data_fim = parse_date(data.get('data_fim'))
+
+    # mudanças de repasse/vigência valem para vendas a partir de `vigencia_inicio`
+    # (padrão hoje; pode retroagir até a última alteração, nunca antes dela)
+    if any(k in data for k in ('ativo', 'repasse', 'data_inicio', 'data_fim')):
+        hoje = date.today()
+        vig = parse_date(data.get('vigencia_inicio')) or hoje
+        ultima = (db.session.query(func.max(LojaRepasseVersao.vigencia_inicio))
+                  .filter(LojaRepasseVersao.loja_parceira_id == l.id).scalar())
+        if vig > hoje or (ultima and vig < ultima):
+            db.session.rollback()
+            return jsonify({'msg': 'Vigência inválida (entre a última alteração e hoje)'}), 400
+        db.session.add(LojaRepasseVersao(
+            loja_parceira_id=l.id, vigencia_inicio=vig, repasse=l.repasse, ativo=l.ativo,
+            data_inicio=l.data_inicio, data_fim=l.data_fim, criado_por=int(get_jwt_identity())
+        ))
+
+    db.session.commit()
+    return jsonify({'ok': True})
+
+@bp.get('/stores/<int:store_id>/repasse-history')
+@jwt_required()
+@admin_required
+@read_only
+def store_repasse_history(store_id):
+    LojaParceira.query.get_or_404(store_id)
+    rows = (LojaRepasseVersao.query.filter_by(loja_parceira_id=store_id)
+            .order_by(LojaRepasseVersao.vigencia_inicio.asc(), LojaRepasseVersao.id.asc()).all())
+    return jsonify([{
+        'id': r.id,
+        'vigencia_inicio': (r.vigencia_inicio.isoformat() if r.vigencia_inicio != VIGENCIA_INICIAL else None),
+        'repasse': (float(r.repasse) if r.repasse is not None else None),
+        'ativo': r.ativo,
+        'data_inicio': (r.data_inicio.isoformat() if r.data_inicio else None),
+        'data_fim': (r.data_fim.isoformat() if r.data_fim else None),
+        'criado_em': (r.criado_em.isoformat() if r.criado_em else None),
+        'criado_por': r.criado_por,
+    } for r in rows])
+
+# ===================== VENDEDORES (ADMIN) =====================
+@bp.get('/sellers')
+@jwt_required()
+@admin_required
+@read_only
+def list_sellers():
+    rows = Vendedor.query.order_by(Vendedor.nome.asc()).all()
+    return jsonify([{
+        'id': r.id, 'nome': r.nome, 'email': r.email, 'role': r.role,
+        'loja_parceira': r.loja_parceira, 'tipo': r.tipo,
+        'inicio_vigencia': (r.inicio_vigencia.isoformat() if r.inicio_vigencia else None),
+        'fim_vigencia': (r.fim_vigencia.isoformat() if r.fim_vigencia else None),
+    } for r in rows])
+
+@bp.post('/sellers')
+@jwt_required()
+@admin_required
+@idempotente
+def create_seller():
+    data = request.get_json(silent=True) or {}
+    nome = (data.get('nome') or '').strip()
+    email = (data.get('email') or '').strip().lower()
+    senha = (data.get('senha') or '').strip()
+    role = (data.get('role') or 'vendedor').strip()
+    tipo = (data.get('tipo') or 'interno').strip()
+    loja_parceira = (data.get('loja_parceira') or '').strip() or ('AJ8' if tipo == 'interno' else None)
+    inicio = parse_date(data.get('inicio_vigencia'))
+    fim = parse_date(data.get('fim_vigencia'))
+
+    if not nome or not email or not senha:
+        return jsonify({'msg': 'Nome, email e senha são obrigatórios'}), 400
+    if role not in ('vendedor', 'admin'):
+        return jsonify({'msg': 'Role inválida'}), 400
+    if tipo not in ('interno', 'parceiro'):
+        return jsonify({'msg': 'Tipo inválida'}), 400
+    if Vendedor.query.filter(func.lower(Vendedor.email) == email).first():
+        return jsonify({'msg': 'E-mail já cadastrado'}), 409
+
+    u = Vendedor(
+        nome=nome,
+        email=email,
+        senha_hash=generate_password_hash(senha, method='pbkdf2:sha256', salt_length=16),
+        role=role,
+        tipo=tipo,
+        loja_parceira=loja_parceira,
+        inicio_vigencia=inicio,
+        fim_vigencia=fim
+    )
+    db.session.add(u)
+    db.session.flush()
+    _tokens_evento(u.id)  # faz o cache de revogação dos outros processos carregar o novo vendedor
+    _registra_evento_meta()  # novo vendedor entra no atingimento de todos os meses
+    db.session.commit()
+    return jsonify({'id': u.id}), 201
+
+@bp.put('/sellers/<int:seller_id>')
+@jwt_required()
+@admin_required
+def update_seller(seller_id):
+    u = Vendedor.query.get_or_404(seller_id)
+    data = request.get_json(silent=True) or {}
+    if 'nome' in data:
+        n = (data.get('nome') or '').strip()
+        if not n: return jsonify({'msg': 'Nome inválido'}), 400
+        u.nome = n
+    if 'email' in data:
+        e = (data.get('email') or '').strip().lower()
+        if not e: return jsonify({'msg': 'Email inválido'}), 400
+        if Vendedor.query.filter(func.lower(Vendedor.email) == e, Vendedor.id != u.id).first():
+            return jsonify({'msg': 'E-mail já em uso'}), 409
+        u.email = e
+    # tokens antigos carregam senha/role velhos: são invalidados
+    revogar = False
+    if 'senha' in data and (data.get('senha') or '').strip():
+        u.senha_hash = generate_password_hash((data.get('senha') or '').strip(), method='pbkdf2:sha256', salt_length=16)
+        revogar = True
+    if 'role' in data:
+        r = (data.get('role') or '').strip()
+        if r not in ('vendedor', 'admin'): return jsonify({'msg': 'Role inválida'}), 400
+        revogar = revogar or r != u.role
+        u.role = r
+    if 'tipo' in data:
+        t = (data.get('tipo') or '').strip()
+        if t not in ('interno', 'parceiro'): return jsonify({'msg': 'Tipo inválido'}), 400
+        u.tipo = t
+        if t == 'interno' and not data.get('loja_parceira'):
+            u.loja_parceira = 'AJ8'
+    if 'loja_parceira' in data:
+        u.loja_parceira = (data.get('loja_parceira') or '').strip() or None
+    if 'inicio_vigencia' in data:
+        u.inicio_vigencia = parse_date(data.get('inicio_vigencia'))
+    if 'fim_vigencia' in data:
+        u.fim_vigencia = parse_date(data.get('fim_vigencia'))
+
+    if 'nome' in data or 'role' in data:
+        _registra_evento_meta()
+    if revogar:
+        revogar_tokens_usuario(u.id)
+    elif 'inicio_vigencia' in data or 'fim_vigencia' in data:
+        _tokens_evento(u.id)
+    db.session.commit()
+    _revogacao.invalida()
+    return jsonify({'ok': True})
+
+# ============ REGRAS DE COMISSÃO DO VENDEDOR (ADMIN) ============
+def _regra_vendedor_to_dict(r: RegraComissaoVendedor) -> dict:
+    return {
+        'id': r.id, 'vendedor_id': r.vendedor_id, 'tipo': r.tipo,
+        'valor_min': r.valor_min, 'valor_max': r.valor_max,
+        'percentual': r.percentual, 'base': r.base,
+        'inicio_vigencia': (r.inicio_vigencia.isoformat() if r.inicio_vigencia else None),
+        'fim_vigencia': (r.fim_vigencia.isoformat() if r.fim_vigencia else None),
+    }
+
+def _aplica_campos_regra_vendedor(r: RegraComissaoVendedor, data: dict):
+    """Valida e aplica campos; retorna mensagem de erro ou None."""
+    if 'vendedor_id' in data:
+        vid = _to_int_or_none(data.get('vendedor_id'))
+        if vid and not db.session.get(Vendedor, vid):
+            return 'Vendedor não encontrado'
+        r.vendedor_id = vid
+    if 'tipo' in data:
+        t = (data.get('tipo') or '').strip() or None
+        if t not in (None, 'interno', 'parceiro'):
+            return 'Tipo inválido'
+        r.tipo = t
+    if 'percentual' in data:
+        p = _parse_pct(data.get('percentual'))
+        if p is None:
+            return 'Percentual inválido'
+        r.percentual = p
+    if 'base' in data:
+        b = (data.get('base') or 'comissao').strip()
+        if b not in ('comissao', 'valor'):
+            return 'Base inválida'
+        r.base = b
+    try:
+        if 'valor_min' in data:
+            r.valor_min = float(data.get('valor_min') or 0.0)
+        if 'valor_max' in data:
+            raw = data.get('valor_max')
+            r.valor_max = None if raw in (None, '', 'null') else float(raw)
+    except Exception:
+        return 'Faixa de valor inválida'
+    if r.valor_max is not None and r.valor_max < (r.valor_min or 0.0):
+        return 'Faixa de valor inválida'
+    if 'inicio_vigencia' in data:
+        r.inicio_vigencia = parse_date(data.get('inicio_vigencia'))
+    if 'fim_vigencia' in data:
+        r.fim_vigencia = parse_date(data.get('fim_vigencia'))
+    if r.inicio_vigencia and r.fim_vigencia and r.fim_vigencia < r.inicio_vigencia:
+        return 'Vigência inválida'
+    if r.vendedor_id and r.tipo:
+        return 'Informe vendedor OU tipo, não ambos'
+    return None
+
+@bp.get('/seller-commission-rules')
+@jwt_required()
+@admin_required
+@read_only
+def list_seller_commission_rules():
+    rows = (RegraComissaoVendedor.query
+            .order_by(RegraComissaoVendedor.vendedor_id.asc().nullslast(),
+                      RegraComissaoVendedor.tipo.asc().nullslast(),
+                      RegraComissaoVendedor.valor_min.asc())
+            .all())
+    return jsonify([_regra_vendedor_to_dict(r) for r in rows])
+
+@bp.post('/seller-commission-rules')
+@jwt_required()
+@admin_required
+@idempotente
+def create_seller_commission_rule():
+    data = request.get_json(silent=True) or {}
+    if 'percentual' not in data:
+        return jsonify({'msg': 'Percentual é obrigatório'}), 400
+    r = RegraComissaoVendedor(valor_min=0.0, base='comissao')
+    erro = _aplica_campos_regra_vendedor(r, data)
+    if erro:
+        return jsonify({'msg': erro}), 400
+    db.session.add(r)
+    db.session.commit()
+    _invalida_indice_comissao_vendedor()
+    return jsonify({'id': r.id}), 201
+
+@bp.put('/seller-commission-rules/<int:rule_id>')
+@jwt_required()
+@admin_required
+def update_seller_commission_rule(rule_id):
+    r = RegraComissaoVendedor.query.get_or_404(rule_id)
+    data = request.get_json(silent=True) or {}
+    erro = _aplica_campos_regra_vendedor(r, data)
+    if erro:
+        db.session.rollback()
+        return jsonify({'msg': erro}), 400
+    db.session.commit()
+    _invalida_indice_comissao_vendedor()
+    return jsonify({'ok': True})
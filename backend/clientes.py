@@ -0,0 +1,197 @@
+"""
+Dimensão de clientes (upsert/backfill) e autocomplete.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import click
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import func, literal, text
+
+from extensions import db, read_only
+from modelos import Cliente, Venda
+from util import apenas_digitos
+
+bp = Blueprint('clientes', __name__, cli_group=None)
+
+# ============== CLIENTES (dimensão) ==============
+CLIENTES_BACKFILL_LOTE = 10000
+
+def upsert_cliente(documento: str, nome: str) -> int:
+    """Cria/atualiza o cliente pelo documento normalizado e retorna o id (1 ida ao
+    banco; a 2ª só se outra transação inserir o mesmo documento durante o upsert,
+    porque o SELECT do CTE não enxerga a linha dela)."""
+    doc = apenas_digitos(documento)
+    return db.session.execute(text("""
+        WITH novo AS (
+          INSERT INTO public.clientes (documento, nome) VALUES (:d, :n)
+          ON CONFLICT (documento) DO UPDATE
+            SET nome = EXCLUDED.nome, atualizado_em = CURRENT_TIMESTAMP
+            WHERE clientes.nome IS DISTINCT FROM EXCLUDED.nome
+          RETURNING id
+        )
+        SELECT id FROM novo
+        UNION ALL
+        SELECT id FROM public.clientes WHERE documento = :d
+        LIMIT 1
+    """), {'d': doc, 'n': nome}).scalar() or db.session.execute(
+        text("SELECT id FROM public.clientes WHERE documento = :d"), {'d': doc}
+    ).scalar()
+
+def backfill_clientes(lote: int = CLIENTES_BACKFILL_LOTE, log=print, progresso=None) -> int:
+    """Preenche clientes/vendas.cliente_id em lotes (commit por lote, retomável).
+    Nome do cliente = o da venda mais recente do lote. Documentos que não têm 11
+    ou 14 dígitos (legado migrado sem validação) ficam sem cliente e são só
+    contados. `progresso(pct, mensagem)`, se informado, substitui `log` (pct
+    pela faixa de ids já percorrida). Retorna as vendas vinculadas."""
+    total = 0
+    ignoradas = 0
+    ultimo = 0
+    primeiro = None
+    with db.engine.connect() as conn:
+        maior = conn.execute(text("SELECT max(id) FROM public.vendas")).scalar() or 0
+    while True:
+        with db.engine.begin() as conn:
+            faixa = conn.execute(text("""
+                SELECT min(id), max(id), count(*) FROM (
+                  SELECT id FROM public.vendas
+                  WHERE cliente_id IS NULL AND id > :ultimo
+                  ORDER BY id LIMIT :n
+                ) l
+            """), {'ultimo': ultimo, 'n': lote}).first()
+            if not faixa or not faixa[2]:
+                break
+            ini, fim, qtd = faixa
+            conn.execute(text("""
+                INSERT INTO public.clientes (documento, nome)
+                SELECT DISTINCT ON (doc) doc, cliente_nome FROM (
+                  SELECT id, regexp_replace(cliente_documento, '\\D', '', 'g') AS doc, cliente_nome
+                  FROM public.vendas
+                  WHERE cliente_id IS NULL AND id BETWEEN :ini AND :fim
+                ) l
+                WHERE length(doc) IN (11, 14)
+                ORDER BY doc, id DESC
+                ON CONFLICT (documento) DO NOTHING
+            """), {'ini': ini, 'fim': fim})
+            vinculadas = conn.execute(text("""
+                UPDATE public.vendas v SET cliente_id = c.id
+                FROM public.clientes c
+                WHERE v.cliente_id IS NULL AND v.id BETWEEN :ini AND :fim
+                  AND c.documento = regexp_replace(v.cliente_documento, '\\D', '', 'g')
+            """), {'ini': ini, 'fim': fim}).rowcount
+        total += vinculadas
+        ignoradas += qtd - vinculadas
+        ultimo = fim
+        primeiro = ini if primeiro is None else primeiro
+        msg = f'vendas até id {fim}: {total} vinculadas, {ignoradas} sem documento válido'
+        if progresso:
+            progresso(min(100, (fim - primeiro + 1) * 100 // max(maior - primeiro + 1, 1)), msg)
+        else:
+            log(msg)
+    return total
+
+# ===================== CLIENTES (autocomplete) =====================
+# Busca por prefixo de nome ou documento nos índices text_pattern_ops de
+# `clientes`, com varredura limitada (CLIENTES_BUSCA_VARREDURA clientes) e cache LRU
+# por usuário. Se um prefixo mais curto já está em cache com resultado completo,
+# o mais longo é filtrado em memória sem ir ao banco.
+CLIENTES_BUSCA_LIMITE = 10
+CLIENTES_BUSCA_VARREDURA = 200
+CLIENTES_CACHE_TTL_SEG = float(os.getenv('CLIENTES_CACHE_TTL_SEG', '60'))
+CLIENTES_CACHE_MAX = int(os.getenv('CLIENTES_CACHE_MAX', '20000'))
+
+class _LRUCacheTTL:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._d.get(key)
+            if item is None:
+                return None
+            if time.monotonic() - item[0] > self.ttl:
+                del self._d[key]
+                return None
+            self._d.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._d[key] = (time.monotonic(), value)
+            self._d.move_to_end(key)
+            while len(self._d) > self.maxsize:
+                self._d.popitem(last=False)
+
+_clientes_cache = _LRUCacheTTL(CLIENTES_CACHE_MAX, CLIENTES_CACHE_TTL_SEG)
+
+def _like_prefixo(s: str) -> str:
+    return s.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def _normaliza_busca_cliente(q: str):
+    """('doc', dígitos) se a busca é numérica; senão ('nome', texto em minúsculas)."""
+    q = (q or '').strip()
+    digitos = apenas_digitos(q)
+    if digitos and len(digitos) >= len(q.replace('.', '').replace('-', '').replace('/', '').replace(' ', '')):
+        return 'doc', digitos
+    return 'nome', ' '.join(q.lower().split())
+
+def _busca_clientes_db(campo: str, termo: str, vendedor_id=None):
+    """Retorna (itens, completo). Varre a dimensão `clientes` (um registro por
+    documento), então um cliente com muitas vendas ocupa uma entrada só.
+    completo=True se a varredura não atingiu o limite. Para vendedor, a
+    varredura é a mesma e só os clientes com venda dele são devolvidos."""
+    col = Cliente.documento if campo == 'doc' else func.lower(Cliente.nome)
+    inner = (db.session.query(Cliente.id, Cliente.nome, Cliente.documento, col.label('k'))
+             .filter(col.like(_like_prefixo(termo), escape='\\'))
+             .order_by(col).limit(CLIENTES_BUSCA_VARREDURA).subquery())
+    if vendedor_id is None:
+        visivel = literal(True)
+    else:
+        visivel = (db.session.query(Venda.id)
+                   .filter(Venda.cliente_id == inner.c.id, Venda.vendedor_id == vendedor_id).exists())
+    rows = (db.session.query(inner.c.nome, inner.c.documento, visivel)
+            .order_by(inner.c.k, inner.c.documento).all())
+    itens = [{'cliente_nome': n, 'cliente_documento': d} for n, d, ok in rows if ok]
+    return itens, len(rows) < CLIENTES_BUSCA_VARREDURA
+
+def _filtra_clientes(itens, campo: str, termo: str):
+    """Mesmo critério do LIKE de _busca_clientes_db, para o cache não achar o que o banco não acha."""
+    if campo == 'doc':
+        return [i for i in itens if (i['cliente_documento'] or '').startswith(termo)]
+    return [i for i in itens if (i['cliente_nome'] or '').lower().startswith(termo)]
+
+@bp.get('/clients/search')
+@jwt_required()
+@read_only
+def search_clients():
+    claims = get_jwt(); role = claims.get('role')
+    uid = int(get_jwt_identity())
+    campo, termo = _normaliza_busca_cliente(request.args.get('q'))
+    if len(termo) < 2:
+        return jsonify([])
+    escopo = None if role == 'admin' else uid
+
+    hit = _clientes_cache.get((uid, campo, termo))
+    if hit is None:
+        # prefixo mais curto com resultado completo já em cache?
+        for n in range(len(termo) - 1, 1, -1):
+            base = _clientes_cache.get((uid, campo, termo[:n]))
+            if base is not None and base[1]:
+                hit = (_filtra_clientes(base[0], campo, termo), True)
+                break
+    if hit is None:
+        hit = _busca_clientes_db(campo, termo, escopo)
+    _clientes_cache.set((uid, campo, termo), hit)
+    return jsonify(hit[0][:CLIENTES_BUSCA_LIMITE])
+
+@bp.cli.command('clientes-backfill')
+@click.option('--lote', type=int, default=CLIENTES_BACKFILL_LOTE, show_default=True)
+def cli_clientes_backfill(lote):
+    """Deduplica clientes das vendas existentes e preenche vendas.cliente_id."""
+    n = backfill_clientes(lote, log=click.echo)
+    click.echo(f'{n} vendas vinculadas a clientes.')
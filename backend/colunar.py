@@ -0,0 +1,35 @@
+"""
+Formato colunar das listagens (`?format=columnar`).
+
+Em vez de repetir as ~20 chaves em cada linha, a resposta traz uma lista por
+coluna. Colunas de texto muito repetido (banco, loja, status, vendedor) vêm
+codificadas em dicionário: a coluna guarda o índice e `dicionarios[coluna]`
+os valores distintos, na ordem da primeira ocorrência. None continua None.
+
+    {"formato": "colunar", "linhas": 2,
+     "colunas": {"id": [7, 6], "banco": [0, 0], "valor": [1500.0, 820.5], ...},
+     "dicionarios": {"banco": ["Itaú"], ...}}
+"""
+COLUNAS_DICIONARIO = ('banco', 'loja_parceira', 'status', 'vendedor_nome')
+
+def colunar(linhas: list, dicionario=COLUNAS_DICIONARIO) -> dict:
+    """[{coluna: valor}] (todas com as mesmas chaves) -> payload colunar."""
+    chaves = list(linhas[0]) if linhas else []
+    colunas = {k: [l.get(k) for l in linhas] for k in chaves}
+    dicionarios = {}
+    for k in dicionario:
+        if k not in colunas:
+            continue
+        indice = {}
+        colunas[k] = [None if v is None else indice.setdefault(v, len(indice)) for v in colunas[k]]
+        dicionarios[k] = list(indice)
+    return {'formato': 'colunar', 'linhas': len(linhas), 'colunas': colunas, 'dicionarios': dicionarios}
+
+def linhas(payload: dict) -> list:
+    """Inverso de colunar()."""
+    colunas = dict(payload.get('colunas') or {})
+    for k, valores in (payload.get('dicionarios') or {}).items():
+        if k in colunas:
+            colunas[k] = [None if i is None else valores[i] for i in colunas[k]]
+    chaves = list(colunas)
+    return [dict(zip(chaves, t)) for t in zip(*(colunas[k] for k in chaves))]
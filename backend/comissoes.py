@@ -0,0 +1,369 @@
+"""
+Cálculo de comissões: tabelas dos bancos (vigência), faixas legadas, regras
+do vendedor, repasse das lojas e o financeiro por venda em lote.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from sqlalchemy import func, text
+
+from dinheiro import aplicar_pct, centavos, decimal_reais, pct_escala, reais
+from extensions import db
+from modelos import (
+    BancoComissaoVersao, LojaParceira, LojaRepasseVersao, RegraComissao, RegraComissaoVendedor,
+    Venda, VendaFechada, Vendedor,
+)
+
+# ======= Tabelas de comissão por banco (vigência) =======
+# Índice por processo: {banco_id: ([inícios ordenados], [tabelas ordenadas])}.
+# Achar a tabela vigente numa data e checar um percentual são buscas binárias.
+# O índice é reconstruído quando (max(id), count) das versões muda (1 consulta
+# por lote); o count pega uma versão que commitou depois de um id maior.
+VIGENCIA_INICIAL = date(1900, 1, 1)
+
+class _IndiceComissoesBanco:
+    def __init__(self, rows):
+        self.inicios = {}
+        self.tabelas = {}
+        for banco_id, ini, coms in rows:  # ordenado por banco, vigência, id
+            starts = self.inicios.setdefault(banco_id, [])
+            tabs = self.tabelas.setdefault(banco_id, [])
+            tab = tuple(sorted({float(c) for c in (coms or [])}))
+            if starts and starts[-1] == ini:
+                tabs[-1] = tab
+            else:
+                starts.append(ini)
+                tabs.append(tab)
+
+    def tabela(self, banco_id, dia: date):
+        starts = self.inicios.get(banco_id)
+        if not starts:
+            return None
+        i = bisect_right(starts, dia) - 1
+        return self.tabelas[banco_id][i] if i >= 0 else None
+
+    def permitido(self, banco_id, dia: date, perc: float) -> bool:
+        """Banco sem tabela (ou tabela vazia) não restringe o percentual."""
+        tab = self.tabela(banco_id, dia)
+        if not tab:
+            return True
+        i = bisect_left(tab, perc - 1e-4)
+        return i < len(tab) and abs(tab[i] - perc) <= 1e-4
+
+_indice_bancos_lock = threading.Lock()
+_indice_bancos = (None, None)  # (versão, índice)
+
+def _indice_comissoes_banco() -> _IndiceComissoesBanco:
+    global _indice_bancos
+    versao = tuple(db.session.query(func.coalesce(func.max(BancoComissaoVersao.id), 0),
+                                    func.count(BancoComissaoVersao.id)).one())
+    with _indice_bancos_lock:
+        if _indice_bancos[0] == versao:
+            return _indice_bancos[1]
+    rows = (db.session.query(BancoComissaoVersao.banco_id, BancoComissaoVersao.vigencia_inicio,
+                             BancoComissaoVersao.comissoes)
+            .order_by(BancoComissaoVersao.banco_id, BancoComissaoVersao.vigencia_inicio, BancoComissaoVersao.id)
+            .all())
+    idx = _IndiceComissoesBanco(rows)
+    with _indice_bancos_lock:
+        _indice_bancos = (versao, idx)
+    return idx
+
+def validar_percentuais_lote(itens) -> list:
+    """itens: [(banco_id, dia, perc)] -> [bool]; sem consulta por linha.
+    Itens sem banco ou sem percentual são considerados válidos."""
+    idx = _indice_comissoes_banco()
+    return [
+        True if (banco_id is None or perc is None) else idx.permitido(banco_id, dia, float(perc))
+        for banco_id, dia, perc in itens
+    ]
+
+# ============ COMISSÃO POR FAIXAS (legacy) ============
+def calcular_comissao(vendedor_id: int, valor_c: int) -> int:
+    """Comissão (centavos) pela faixa de valor da venda (centavos)."""
+    return comissoes_faixa_lote([(vendedor_id, valor_c)])[0]
+
+def comissoes_faixa_lote(itens) -> list:
+    """calcular_comissao() para [(vendedor_id, valor_c)] com uma consulta só às
+    regras; vale a última faixa (em ordem de valor_min) que casa."""
+    if not itens:
+        return []
+    vids = {vid for vid, _ in itens if vid is not None}
+    regras = (RegraComissao.query
+              .filter(RegraComissao.vendedor_id.in_(vids) | RegraComissao.vendedor_id.is_(None))
+              .order_by(RegraComissao.valor_min.asc())
+              .all())
+    faixas = [(r.vendedor_id, centavos(r.valor_min), (centavos(r.valor_max) if r.valor_max is not None else None),
+               pct_escala(r.percentual)) for r in regras]
+    por_vendedor = {vid: [f[1:] for f in faixas if f[0] is None or f[0] == vid] for vid in vids | {None}}
+    out = []
+    for vid, valor_c in itens:
+        pct = None
+        for vmin, vmax, p in por_vendedor.get(vid, por_vendedor[None]):
+            if valor_c >= vmin and (vmax is None or valor_c <= vmax):
+                pct = p
+        out.append(aplicar_pct(valor_c, pct) if pct is not None else 0)
+    return out
+
+def _calc_commission_value(valor_c: int, perc) -> int:
+    if perc is None:
+        return 0
+    try:
+        p = pct_escala(perc)
+        if p < 0 or p > pct_escala(100):
+            return 0
+        return aplicar_pct(valor_c, p)
+    except Exception:
+        return 0
+
+def _comissoes_reais(vendas, valores) -> list:
+    """Comissão real (centavos) de cada venda: % aplicado ou, sem ele, a faixa
+    de regras_comissao (resolvida em lote)."""
+    sem_perc = [i for i, v in enumerate(vendas) if v.perc_comissao_aplicado is None]
+    por_faixa = dict(zip(sem_perc, comissoes_faixa_lote([(vendas[i].vendedor_id, valores[i]) for i in sem_perc])))
+    return [por_faixa[i] if i in por_faixa else _calc_commission_value(vc, v.perc_comissao_aplicado)
+            for i, (v, vc) in enumerate(zip(vendas, valores))]
+
+def _valor_c(v: "Venda") -> int:
+    # valor_centavos é gerado no banco; após alterar `valor` em memória ele fica velho
+    if v.valor_centavos is not None and 'valor' not in db.inspect(v).committed_state:
+        return int(v.valor_centavos)
+    return centavos(v.valor)
+
+# ============ COMISSÃO DO VENDEDOR (engine) ============
+# As regras são compiladas num índice em memória (recarregado a cada
+# COMISSAO_VENDEDOR_CACHE_SEG ou quando alteradas neste processo) e aplicadas
+# a uma página inteira de vendas sem nenhuma consulta por linha.
+COMISSAO_VENDEDOR_CACHE_SEG = float(os.getenv('COMISSAO_VENDEDOR_CACHE_SEG', '60'))
+
+class _IndiceComissaoVendedor:
+    def __init__(self, regras):
+        self.por_vendedor = {}
+        self.por_tipo = {}
+        self.globais = []
+        for r in regras:
+            item = (r.inicio_vigencia or date.min, r.fim_vigencia or date.max,
+                    centavos(r.valor_min or 0), centavos(r.valor_max),
+                    pct_escala(r.percentual), (r.base or 'comissao'))
+            if r.vendedor_id is not None:
+                self.por_vendedor.setdefault(r.vendedor_id, []).append(item)
+            elif r.tipo:
+                self.por_tipo.setdefault(r.tipo, []).append(item)
+            else:
+                self.globais.append(item)
+        # vigência mais recente primeiro
+        for lst in list(self.por_vendedor.values()) + list(self.por_tipo.values()) + [self.globais]:
+            lst.sort(key=lambda it: it[0], reverse=True)
+
+    def regra(self, vendedor_id, tipo, valor_c: int, dia: date):
+        for lst in (self.por_vendedor.get(vendedor_id), self.por_tipo.get(tipo), self.globais):
+            if not lst:
+                continue
+            for ini, fim, vmin, vmax, pct, base in lst:
+                if ini <= dia <= fim and valor_c >= vmin and (vmax is None or valor_c <= vmax):
+                    return pct, base
+        return None
+
+_indice_vendedor_lock = threading.Lock()
+_indice_vendedor = None
+_indice_vendedor_ts = 0.0
+
+def _indice_comissao_vendedor() -> _IndiceComissaoVendedor:
+    global _indice_vendedor, _indice_vendedor_ts
+    agora = time.monotonic()
+    with _indice_vendedor_lock:
+        if _indice_vendedor is not None and agora - _indice_vendedor_ts < COMISSAO_VENDEDOR_CACHE_SEG:
+            return _indice_vendedor
+    idx = _IndiceComissaoVendedor(RegraComissaoVendedor.query.all())
+    with _indice_vendedor_lock:
+        _indice_vendedor, _indice_vendedor_ts = idx, agora
+    return idx
+
+def _invalida_indice_comissao_vendedor():
+    global _indice_vendedor
+    with _indice_vendedor_lock:
+        _indice_vendedor = None
+
+def comissoes_vendedor_lote(itens):
+    """itens: [(vendedor_id, tipo, valor_c, dia, comissao_real_c)] -> [comissao_vendedor_c | None],
+    tudo em centavos. None quando nenhuma regra se aplica (comissão do vendedor indefinida)."""
+    idx = _indice_comissao_vendedor()
+    out = []
+    for vendedor_id, tipo, valor_c, dia, comissao_c in itens:
+        r = idx.regra(vendedor_id, tipo, valor_c or 0, dia)
+        if r is None:
+            out.append(None)
+            continue
+        pct, base = r
+        out.append(aplicar_pct((valor_c if base == 'valor' else comissao_c) or 0, pct))
+    return out
+
+def _store_repasse_percent(loja: "LojaParceira", on_date: date) -> float:
+    """
+    `loja` pode ser a LojaParceira ou uma LojaRepasseVersao.
+    Retorna o % de repasse aplicável (0..100) considerando:
+      - loja ativa
+      - vigência (data_inicio/data_fim)
+    """
+    if not loja or not loja.ativo:
+        return 0.0
+    if loja.data_inicio and on_date < loja.data_inicio:
+        return 0.0
+    if loja.data_fim and on_date > loja.data_fim:
+        return 0.0
+    try:
+        return float(loja.repasse or 0.0)
+    except Exception:
+        return 0.0
+
+# ======= Histórico de repasse das lojas (índice de intervalos) =======
+# {loja_id: ([inícios de vigência ordenados], [configurações])}: a configuração
+# aplicável a uma venda é a da última versão com início <= data da venda (bisect).
+# Reconstruído quando (max(id), count) das versões muda (1 consulta por lote).
+class _IndiceRepasseLojas:
+    def __init__(self, rows):
+        self.inicios = {}
+        self.versoes = {}
+        for r in rows:  # ordenado por loja, vigência, id
+            starts = self.inicios.setdefault(r.loja_parceira_id, [])
+            vers = self.versoes.setdefault(r.loja_parceira_id, [])
+            if starts and starts[-1] == r.vigencia_inicio:
+                vers[-1] = r
+            else:
+                starts.append(r.vigencia_inicio)
+                vers.append(r)
+
+    def versao(self, loja_id, dia: date):
+        starts = self.inicios.get(loja_id)
+        if not starts:
+            return None
+        i = bisect_right(starts, dia) - 1
+        return self.versoes[loja_id][i] if i >= 0 else None
+
+_indice_lojas_lock = threading.Lock()
+_indice_lojas = (None, None)  # (versão, índice)
+
+def _indice_repasse_lojas() -> _IndiceRepasseLojas:
+    global _indice_lojas
+    versao = tuple(db.session.query(func.coalesce(func.max(LojaRepasseVersao.id), 0),
+                                    func.count(LojaRepasseVersao.id)).one())
+    with _indice_lojas_lock:
+        if _indice_lojas[0] == versao:
+            return _indice_lojas[1]
+    rows = (db.session.query(LojaRepasseVersao.loja_parceira_id, LojaRepasseVersao.vigencia_inicio,
+                             LojaRepasseVersao.repasse, LojaRepasseVersao.ativo,
+                             LojaRepasseVersao.data_inicio, LojaRepasseVersao.data_fim)
+            .order_by(LojaRepasseVersao.loja_parceira_id, LojaRepasseVersao.vigencia_inicio, LojaRepasseVersao.id)
+            .all())
+    idx = _IndiceRepasseLojas(rows)
+    with _indice_lojas_lock:
+        _indice_lojas = (versao, idx)
+    return idx
+
+def repasse_percent_lote(itens) -> list:
+    """itens: [(loja_parceira_id, data_venda)] -> [% repasse], sem consulta por linha."""
+    idx = _indice_repasse_lojas()
+    out = []
+    for loja_id, dia in itens:
+        ver = idx.versao(loja_id, dia) if loja_id else None
+        out.append(_store_repasse_percent(ver, dia) if ver else 0.0)
+    return out
+
+# ============ FINANCEIRO POR VENDA (lote) ============
+def _vendedores_info(vids) -> dict:
+    """{vendedor_id: (nome, tipo)} numa consulta."""
+    if not vids:
+        return {}
+    rows = db.session.query(Vendedor.id, Vendedor.nome, Vendedor.tipo).filter(Vendedor.id.in_(vids)).all()
+    return {r.id: (r.nome, r.tipo) for r in rows}
+
+def calcular_financeiro_lote(vendas, vendedores=None, usar_fechamento=True) -> list:
+    """
+    Financeiro de uma lista de Venda, na mesma ordem, sem consulta por linha:
+      comissao_real, loja_repasse_percent, loja_repasse_valor,
+      comissao_vendedor, empresa_bruta, empresa_liquida
+    Vendas de meses fechados vêm do snapshot (vendas_fechadas).
+    """
+    if not vendas:
+        return []
+    if vendedores is None:
+        vendedores = _vendedores_info({v.vendedor_id for v in vendas})
+
+    congelados = {}
+    if usar_fechamento:
+        ids = [v.id for v in vendas]
+        for f in VendaFechada.query.filter(VendaFechada.venda_id.in_(ids)).all():
+            congelados[f.venda_id] = f.to_financeiro()
+
+    abertas = [v for v in vendas if v.id not in congelados]
+    valores = [_valor_c(v) for v in abertas]
+    # comissão "real" (valor * % escolhido na venda, ou legacy por faixa), em centavos
+    comissoes = _comissoes_reais(abertas, valores)
+    datas = [(v.data_venda.date() if v.data_venda else date.today()) for v in abertas]
+    # comissão do vendedor em lote (índice em memória, sem consulta por linha)
+    com_vendedor = comissoes_vendedor_lote([
+        (v.vendedor_id, vendedores.get(v.vendedor_id, (None, None))[1], vc, d, c)
+        for v, vc, d, c in zip(abertas, valores, datas, comissoes)
+    ])
+    # repasse da loja vigente NA DATA DA VENDA (histórico, não a configuração atual)
+    repasses = repasse_percent_lote([(v.loja_parceira_id, d) for v, d in zip(abertas, datas)])
+
+    calculados = {}
+    for v, comissao_c, vendedor_c, rep_pct in zip(abertas, comissoes, com_vendedor, repasses):
+        calculados[v.id] = financeiro_centavos(comissao_c, rep_pct, vendedor_c)
+    return [congelados.get(v.id) or calculados[v.id] for v in vendas]
+
+def financeiro_centavos(comissao_c: int, rep_pct, vendedor_c) -> dict:
+    """Repasse e resultado da empresa em centavos inteiros; devolve reais (float) para o JSON."""
+    # repasse para a loja (se houver e estiver vigente)
+    rep_c = aplicar_pct(comissao_c, pct_escala(rep_pct or 0))
+    bruta_c = comissao_c - rep_c
+    return {
+        'comissao_real': reais(comissao_c),
+        'loja_repasse_percent': rep_pct,
+        'loja_repasse_valor': reais(rep_c),
+        'comissao_vendedor': reais(vendedor_c),
+        'empresa_bruta': reais(bruta_c),
+        'empresa_liquida': (reais(bruta_c - vendedor_c) if vendedor_c is not None else None),
+    }
+
+def _venda_to_dict(v: Venda, fin: dict, vendedor_nome=None) -> dict:
+    return {
+        'id': v.id,
+        'vendedor_id': v.vendedor_id,
+        'vendedor_nome': vendedor_nome,
+        'cliente_id': v.cliente_id,
+        'cliente_nome': v.cliente_nome,
+        'cliente_documento': v.cliente_documento,
+        'valor': float(v.valor),
+        'banco': v.banco,
+        'status': v.status,
+        'data_venda': v.data_venda.isoformat() if v.data_venda else None,
+        'loja_parceira': v.loja_parceira,
+        'banco_id': v.banco_id,
+        'loja_parceira_id': v.loja_parceira_id,
+        'perc_comissao_aplicado': (float(v.perc_comissao_aplicado) if v.perc_comissao_aplicado is not None else None),
+        'comissao': fin['comissao_real'],      # compat
+        **fin,
+    }
+
+def _valor_comissao_gerado() -> bool:
+    return bool(db.session.execute(text("""
+        SELECT is_generated = 'ALWAYS' FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'vendas' AND column_name = 'valor_comissao'
+    """)).scalar())
+
+def _regrava_valor_comissao(ids) -> None:
+    """Recalcula vendas.valor_comissao das vendas (um UPDATE via unnest), se a coluna não for gerada."""
+    if not ids or _valor_comissao_gerado():
+        return
+    vendas = Venda.query.filter(Venda.id.in_(list(ids))).all()
+    comissoes = _comissoes_reais(vendas, [_valor_c(v) for v in vendas])
+    db.session.execute(text("""
+        UPDATE public.vendas v SET valor_comissao = n.vc
+        FROM unnest(CAST(:ids AS integer[]), CAST(:vcs AS numeric[])) AS n(id, vc)
+        WHERE v.id = n.id AND v.valor_comissao IS DISTINCT FROM n.vc
+    """), {'ids': [v.id for v in vendas], 'vcs': [decimal_reais(c) for c in comissoes]})
@@ -0,0 +1,43 @@
+"""
+Compressão das respostas negociada por Accept-Encoding (brotli ou gzip).
+
+Registrado como after_request em create_app(). Só comprime corpos textuais
+acima de COMPRESSAO_MIN_BYTES; streams (SSE) e respostas já codificadas
+passam direto. brotli é opcional: sem o pacote, só gzip é oferecido.
+"""
+import gzip
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # pip install brotli
+    brotli = None
+
+COMPRIMIVEIS = frozenset({'application/json', 'text/csv', 'text/plain', 'text/html'})
+
+def codificacoes() -> list:
+    """Em ordem de preferência do servidor (desempate do Accept-Encoding)."""
+    return (['br'] if brotli is not None else []) + ['gzip']
+
+def comprimir(corpo: bytes, codificacao: str) -> bytes:
+    cfg = current_app.config
+    if codificacao == 'br':
+        return brotli.compress(corpo, quality=cfg['COMPRESSAO_NIVEL_BR'])
+    return gzip.compress(corpo, compresslevel=cfg['COMPRESSAO_NIVEL_GZIP'])
+
+def comprime_resposta(resp):
+    if (resp.direct_passthrough or resp.is_streamed or resp.status_code in (204, 206, 304)
+            or resp.status_code < 200 or 'Content-Encoding' in resp.headers
+            or resp.mimetype not in COMPRIMIVEIS):
+        return resp
+    resp.vary.add('Accept-Encoding')
+    codificacao = request.accept_encodings.best_match(codificacoes())
+    if codificacao is None:
+        return resp
+    corpo = resp.get_data()
+    if len(corpo) < current_app.config['COMPRESSAO_MIN_BYTES']:
+        return resp
+    resp.set_data(comprimir(corpo, codificacao))
+    resp.headers['Content-Encoding'] = codificacao
+    return resp
@@ -0,0 +1,80 @@
+"""
+Health check e endpoints de diagnóstico.
+"""
+import os
+
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import text
+
+from extensions import db
+from limites import metricas as metricas_limite_login
+
+bp = Blueprint('debug', __name__, cli_group=None)
+
+# ---------- HEALTH & DEBUG ----------
+@bp.get('/ping')
+def ping():
+    return jsonify(status="ok"), 200
+
+@bp.get('/_debug/db')
+def _debug_db():
+    try:
+        with db.engine.connect() as conn:
+            dbname = conn.execute(text("SELECT current_database()")).scalar()
+            schema = conn.execute(text("SELECT current_schema()")).scalar()
+            spath  = conn.execute(text("SHOW search_path")).scalar()
+            tables = conn.execute(text("""
+                SELECT table_schema || '.' || table_name
+                FROM information_schema.tables
+                WHERE table_type = 'BASE TABLE'
+                  AND table_schema NOT IN ('pg_catalog','information_schema')
+                ORDER BY 1
+            """)).fetchall()
+
+        return jsonify({
+            "DATABASE_URL_present": bool(os.environ.get("DATABASE_URL")),
+            "current_database": dbname,
+            "current_schema": schema,
+            "search_path": spath,
+            "first_tables": [t[0] for t in tables[:40]]
+        }), 200
+    except Exception as e:
+        current_app.logger.exception("debug_db failed")
+        return jsonify(error=str(e)), 500
+
+@bp.get('/_debug/metrics')
+def _debug_metrics():
+    """Contadores do processo que atendeu (com vários workers, cada um tem os seus)."""
+    return jsonify(pid=os.getpid(), limite_login=metricas_limite_login())
+
+APP_DEBUG_VERSION = "v2"
+
+@bp.get("/_debug/version")
+def _debug_version():
+    return jsonify(version=APP_DEBUG_VERSION)
+
+@bp.get("/_debug/db2")
+def _debug_db2():
+    try:
+        with db.engine.connect() as conn:
+            dbname = conn.execute(text("SELECT current_database()")).scalar()
+            schema = conn.execute(text("SELECT current_schema()")).scalar()
+            spath  = conn.execute(text("SHOW search_path")).scalar()
+            tables = conn.execute(text("""
+                SELECT table_schema || '.' || table_name
+                FROM information_schema.tables
+                WHERE table_type = 'BASE TABLE'
+                  AND table_schema NOT IN ('pg_catalog','information_schema')
+                ORDER BY 1
+            """)).fetchall()
+
+        return jsonify({
+            "DATABASE_URL_present": bool(os.environ.get("DATABASE_URL")),
+            "current_database": dbname,
+            "current_schema": schema,
+            "search_path": spath,
+            "first_tables": [t[0] for t in tables[:40]]
+        }), 200
+    except Exception as e:
+        current_app.logger.exception("debug_db2 failed")
+        return jsonify(error=str(e)), 500
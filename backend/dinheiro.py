@@ -0,0 +1,51 @@
+"""
+Aritmética de dinheiro em centavos inteiros.
+
+Valores são int em centavos; percentuais são int em décimos de milésimo de
+ponto percentual (1,5% -> 15000). Toda conta é feita com inteiros e o
+arredondamento é sempre "meio para longe do zero" (ROUND_HALF_UP), o mesmo do
+round() de numeric no Postgres, então Python e SQL chegam ao mesmo centavo.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+ESCALA_PCT = 10000               # 4 casas no percentual
+_DIVISOR = 100 * ESCALA_PCT      # centavos * pct / _DIVISOR
+_CENTAVO = Decimal('0.01')
+_PCT = Decimal('0.0001')
+
+def _decimal(v) -> Decimal:
+    # str() evita trazer o erro binário do float (0.1 -> '0.1')
+    return v if isinstance(v, Decimal) else Decimal(str(v))
+
+def centavos(v) -> int:
+    """Reais (float/str/Decimal/int) -> centavos. None -> None."""
+    if v is None:
+        return None
+    return int(_decimal(v).quantize(_CENTAVO, rounding=ROUND_HALF_UP) * 100)
+
+def pct_escala(p) -> int:
+    """Percentual (ex.: 1.5) -> inteiro em ESCALA_PCT. None -> None."""
+    if p is None:
+        return None
+    return int(_decimal(p).quantize(_PCT, rounding=ROUND_HALF_UP) * ESCALA_PCT)
+
+def dividir(n: int, d: int) -> int:
+    """n / d em inteiros, meio para longe do zero."""
+    q, r = divmod(abs(n), abs(d))
+    if 2 * r >= abs(d):
+        q += 1
+    return q if (n >= 0) == (d > 0) else -q
+
+def aplicar_pct(valor_c: int, pct: int) -> int:
+    """Centavos * percentual (em ESCALA_PCT), arredondado ao centavo."""
+    if not valor_c or not pct:
+        return 0
+    return dividir(valor_c * pct, _DIVISOR)
+
+def reais(c) -> float:
+    """Centavos -> float para JSON (sempre o float mais próximo de 2 casas)."""
+    return None if c is None else c / 100
+
+def decimal_reais(c) -> Decimal:
+    """Centavos -> Decimal exato para colunas NUMERIC."""
+    return None if c is None else Decimal(c).scaleb(-2)
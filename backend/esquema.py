@@ -0,0 +1,469 @@
+"""
+DDL idempotente de inicialização, particionamento mensal de `vendas` e o
+comando `flask --app app bootstrap`.
+"""
+import os
+import re
+import threading
+from datetime import date, datetime
+
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import text
+
+from extensions import db
+from util import _add_months
+from auditoria import _auditoria
+
+bp = Blueprint('esquema', __name__, cli_group=None)
+
+# ========= DDL de inicialização (idempotente) =========
+def _ensure_columns():
+    with db.engine.begin() as conn:
+        conn.execute(text("""
+            DO $$
+            BEGIN
+              IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name='bancos' AND column_name='comissoes'
+              ) THEN
+                ALTER TABLE public.bancos ADD COLUMN comissoes JSONB;
+              END IF;
+            END$$;
+        """))
+
+        conn.execute(text("""
+            ALTER TABLE public.vendedores ADD COLUMN IF NOT EXISTS token_geracao INTEGER NOT NULL DEFAULT 0
+        """))
+
+        # versão do cache de metas: transação que gravou o evento (ids saem fora de ordem de commit)
+        conn.execute(text("""
+            ALTER TABLE public.metas_eventos
+              ADD COLUMN IF NOT EXISTS xid BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text)::bigint
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_metas_eventos_mes_xid ON public.metas_eventos (ano, mes, xid)
+        """))
+
+        conn.execute(text("""
+            DO $$
+            BEGIN
+              IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name='vendas' AND column_name='perc_comissao_aplicado'
+              ) THEN
+                ALTER TABLE public.vendas
+                  ADD COLUMN perc_comissao_aplicado NUMERIC(5,2);
+              END IF;
+            END$$;
+        """))
+
+        conn.execute(text("""
+            DO $$
+            BEGIN
+              IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name='vendas' AND column_name='valor_comissao'
+              ) THEN
+                BEGIN
+                  EXECUTE '
+                    ALTER TABLE public.vendas
+                      ADD COLUMN valor_comissao NUMERIC(12,2)
+                      GENERATED ALWAYS AS (
+                        ROUND(COALESCE(valor,0) * COALESCE(perc_comissao_aplicado,0) / 100.0, 2)
+                      ) STORED
+                  ';
+                EXCEPTION
+                  WHEN others THEN
+                    EXECUTE 'ALTER TABLE public.vendas ADD COLUMN valor_comissao NUMERIC(12,2)';
+                END;
+              END IF;
+            END$$;
+        """))
+
+        conn.execute(text("""
+            DO $$
+            BEGIN
+              IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name='lojas_parceiras' AND column_name='repasse'
+              ) THEN
+                ALTER TABLE public.lojas_parceiras ADD COLUMN repasse NUMERIC(10,2);
+              END IF;
+
+              IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name='lojas_parceiras' AND column_name='data_inicio'
+              ) THEN
+                ALTER TABLE public.lojas_parceiras ADD COLUMN data_inicio DATE;
+              END IF;
+
+              IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name='lojas_parceiras' AND column_name='data_fim'
+              ) THEN
+                ALTER TABLE public.lojas_parceiras ADD COLUMN data_fim DATE;
+              END IF;
+            END$$;
+        """))
+
+        # valor: float -> numeric(14,2) exato + valor_centavos (bigint gerado).
+        # Reescreve a tabela uma única vez; valor_comissao gerada depende de
+        # valor e vira coluna simples (mantida pelo app, como no fallback).
+        conn.execute(text("""
+            DO $$
+            BEGIN
+              IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema='public' AND table_name='vendas'
+                  AND column_name='valor' AND data_type='double precision'
+              ) THEN
+                IF EXISTS (
+                  SELECT 1 FROM information_schema.columns
+                  WHERE table_schema='public' AND table_name='vendas'
+                    AND column_name='valor_comissao' AND is_generated='ALWAYS'
+                ) THEN
+                  ALTER TABLE public.vendas ALTER COLUMN valor_comissao DROP EXPRESSION;
+                END IF;
+                ALTER TABLE public.vendas ALTER COLUMN valor TYPE NUMERIC(14,2) USING round(valor::numeric, 2);
+              END IF;
+              IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema='public' AND table_name='vendas' AND column_name='valor_centavos'
+              ) THEN
+                ALTER TABLE public.vendas
+                  ADD COLUMN valor_centavos BIGINT GENERATED ALWAYS AS ((valor * 100)::bigint) STORED;
+              END IF;
+            END$$;
+        """))
+
+        conn.execute(text("""
+            DO $$
+            BEGIN
+              IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name='vendas' AND column_name='cliente_id'
+              ) THEN
+                ALTER TABLE public.vendas ADD COLUMN cliente_id INTEGER REFERENCES public.clientes(id);
+              END IF;
+            END$$;
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_vendas_cliente_data ON public.vendas (cliente_id, data_venda)
+        """))
+
+        # bancos sem histórico: a lista atual vale desde sempre
+        conn.execute(text("""
+            INSERT INTO public.bancos_comissoes_versoes (banco_id, vigencia_inicio, comissoes)
+            SELECT b.id, DATE '1900-01-01', COALESCE(b.comissoes, '[]'::jsonb)
+            FROM public.bancos b
+            WHERE NOT EXISTS (
+              SELECT 1 FROM public.bancos_comissoes_versoes v WHERE v.banco_id = b.id
+            )
+        """))
+
+        # lojas sem histórico: a configuração atual vale desde sempre
+        conn.execute(text("""
+            INSERT INTO public.lojas_repasse_versoes
+              (loja_parceira_id, vigencia_inicio, repasse, ativo, data_inicio, data_fim)
+            SELECT l.id, DATE '1900-01-01', l.repasse, l.ativo, l.data_inicio, l.data_fim
+            FROM public.lojas_parceiras l
+            WHERE NOT EXISTS (
+              SELECT 1 FROM public.lojas_repasse_versoes v WHERE v.loja_parceira_id = l.id
+            )
+        """))
+
+        # detector de quase-duplicatas (mesmo cliente, banco, valor e dia)
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_vendas_quase_duplicada
+              ON public.vendas (cliente_documento, banco_id, valor, (CAST(data_venda AS DATE)))
+        """))
+
+        # autocomplete de clientes por prefixo (nome em minúsculas / documento)
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_vendas_cliente_nome_prefixo
+              ON public.vendas (lower(cliente_nome) text_pattern_ops)
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_vendas_vendedor_cliente_nome_prefixo
+              ON public.vendas (vendedor_id, lower(cliente_nome) text_pattern_ops)
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_vendas_cliente_documento_prefixo
+              ON public.vendas (cliente_documento text_pattern_ops)
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_vendas_vendedor_cliente_documento_prefixo
+              ON public.vendas (vendedor_id, cliente_documento text_pattern_ops)
+        """))
+        # autocomplete lê a dimensão clientes (um registro por documento)
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_clientes_documento_prefixo
+              ON public.clientes (documento text_pattern_ops)
+        """))
+
+        # snapshot de meses fechados é somente-inserção
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION public.vendas_fechadas_imutavel() RETURNS trigger AS $$
+            BEGIN
+              RAISE EXCEPTION 'vendas_fechadas é imutável (mês fechado)';
+            END;
+            $$ LANGUAGE plpgsql;
+        """))
+        conn.execute(text("""
+            DO $$
+            BEGIN
+              IF NOT EXISTS (
+                SELECT 1 FROM pg_trigger WHERE tgname = 'trg_vendas_fechadas_imutavel'
+              ) THEN
+                CREATE TRIGGER trg_vendas_fechadas_imutavel
+                  BEFORE UPDATE OR DELETE ON public.vendas_fechadas
+                  FOR EACH ROW EXECUTE FUNCTION public.vendas_fechadas_imutavel();
+              END IF;
+            END$$;
+        """))
+
+        # histórico de alterações é somente-inserção
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION public.vendas_audit_imutavel() RETURNS trigger AS $$
+            BEGIN
+              RAISE EXCEPTION 'vendas_audit é somente-inserção';
+            END;
+            $$ LANGUAGE plpgsql;
+        """))
+        conn.execute(text("""
+            DO $$
+            BEGIN
+              IF NOT EXISTS (
+                SELECT 1 FROM pg_trigger WHERE tgname = 'trg_vendas_audit_imutavel'
+              ) THEN
+                CREATE TRIGGER trg_vendas_audit_imutavel
+                  BEFORE UPDATE OR DELETE ON public.vendas_audit
+                  FOR EACH ROW EXECUTE FUNCTION public.vendas_audit_imutavel();
+              END IF;
+            END$$;
+        """))
+
+# ========= PARTICIONAMENTO MENSAL (vendas) =========
+# Opcional: a tabela só vira particionada via `flask --app app vendas-particionar`.
+# Depois disso, o bootstrap (e `flask --app app vendas-particoes`) garante as partições
+# dos próximos meses. Consultas devem filtrar `data_venda` cru (>= / <) para o
+# Postgres podar partições.
+VENDAS_PARTICOES_MESES_FUTUROS = int(os.getenv('VENDAS_PARTICOES_MESES_FUTUROS', '3'))
+
+def _vendas_particionada(conn) -> bool:
+    return bool(conn.execute(text("""
+        SELECT 1 FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname = 'vendas'
+    """)).scalar())
+
+def _vendas_colunas_gravaveis(conn, tabela: str = 'vendas'):
+    rows = conn.execute(text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = :t AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """), {'t': tabela}).fetchall()
+    return [r[0] for r in rows]
+
+def _criar_particao_mes(conn, y: int, m: int) -> bool:
+    """Cria vendas_AAAA_MM se não existir. Linhas do mês que caíram na
+    partição default são movidas para a nova partição."""
+    nome = f'vendas_{y:04d}_{m:02d}'
+    existe = conn.execute(text("SELECT to_regclass(:n)"), {'n': f'public.{nome}'}).scalar()
+    if existe:
+        return False
+    ny, nm = _add_months(y, m, 1)
+    ini, fim = f'{y:04d}-{m:02d}-01', f'{ny:04d}-{nm:02d}-01'
+    tem_default = conn.execute(text("SELECT to_regclass('public.vendas_default')")).scalar()
+    pendentes = 0
+    if tem_default:
+        pendentes = conn.execute(text(
+            "SELECT count(*) FROM public.vendas_default WHERE data_venda >= :a AND data_venda < :b"
+        ), {'a': ini, 'b': fim}).scalar()
+    if pendentes:
+        cols = ', '.join(_vendas_colunas_gravaveis(conn))
+        conn.execute(text("ALTER TABLE public.vendas DETACH PARTITION public.vendas_default"))
+        conn.execute(text(
+            f"CREATE TABLE public.{nome} PARTITION OF public.vendas FOR VALUES FROM ('{ini}') TO ('{fim}')"
+        ))
+        conn.execute(text(
+            f"INSERT INTO public.vendas ({cols}) SELECT {cols} FROM public.vendas_default "
+            f"WHERE data_venda >= :a AND data_venda < :b"
+        ), {'a': ini, 'b': fim})
+        conn.execute(text(
+            "DELETE FROM public.vendas_default WHERE data_venda >= :a AND data_venda < :b"
+        ), {'a': ini, 'b': fim})
+        conn.execute(text("ALTER TABLE public.vendas ATTACH PARTITION public.vendas_default DEFAULT"))
+    else:
+        conn.execute(text(
+            f"CREATE TABLE public.{nome} PARTITION OF public.vendas FOR VALUES FROM ('{ini}') TO ('{fim}')"
+        ))
+    return True
+
+def _ensure_vendas_partitions(meses_futuros: int = None) -> list:
+    """Garante partições do mês corrente até N meses à frente (no-op se não particionada)."""
+    meses_futuros = VENDAS_PARTICOES_MESES_FUTUROS if meses_futuros is None else meses_futuros
+    criadas = []
+    with db.engine.begin() as conn:
+        if not _vendas_particionada(conn):
+            return criadas
+        hoje = date.today()
+        for k in range(0, meses_futuros + 1):
+            y, m = _add_months(hoje.year, hoje.month, k)
+            if _criar_particao_mes(conn, y, m):
+                criadas.append(f'{y:04d}-{m:02d}')
+    return criadas
+
+_RE_INDICE_TABELA_ANTIGA = re.compile(r' ON (?:ONLY )?(?:public\.)?vendas_nao_particionada ')
+
+def migrar_vendas_para_particionada(drop_antiga: bool = False, log=print):
+    """
+    Converte `vendas` em tabela particionada por mês de `data_venda`:
+      1. renomeia a tabela atual (e seus índices, com sufixo _nao_particionada)
+         para vendas_nao_particionada
+      2. cria `vendas` PARTITION BY RANGE (data_venda) com a mesma estrutura
+         e recria nela os índices da tabela antiga
+      3. cria partições do mês mais antigo até N meses à frente + default
+      4. copia os dados mês a mês (sequence de id é reaproveitada)
+      5. recria as FKs (vendedor_id, cliente_id, ...) da tabela antiga
+    """
+    with db.engine.begin() as conn:
+        if _vendas_particionada(conn):
+            log('vendas já é particionada; nada a fazer.')
+            return False
+        conn.execute(text("LOCK TABLE public.vendas IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text("ALTER TABLE public.vendas RENAME TO vendas_nao_particionada"))
+        conn.execute(text("""
+            DO $$
+            DECLARE pk text;
+            BEGIN
+              SELECT conname INTO pk FROM pg_constraint
+              WHERE conrelid = 'public.vendas_nao_particionada'::regclass AND contype = 'p';
+              IF pk IS NOT NULL THEN
+                EXECUTE format('ALTER TABLE public.vendas_nao_particionada RENAME CONSTRAINT %I TO vendas_nao_particionada_pkey', pk);
+              END IF;
+            END$$;
+        """))
+        # os índices mantêm o nome no rename; sem o sufixo, o CREATE INDEX IF NOT EXISTS
+        # do bootstrap acharia os da tabela antiga e não criaria os da particionada
+        indices = conn.execute(text("""
+            SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indisunique
+            FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = 'public.vendas_nao_particionada'::regclass AND NOT i.indisprimary
+            ORDER BY c.relname
+        """)).fetchall()
+        fks = conn.execute(text("""
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = 'public.vendas_nao_particionada'::regclass AND contype = 'f'
+            ORDER BY conname
+        """)).fetchall()
+        for nome, _, _ in indices:
+            conn.execute(text(f'ALTER INDEX public."{nome}" RENAME TO "{nome[:46]}_nao_particionada"'))
+        conn.execute(text("""
+            CREATE TABLE public.vendas (
+              LIKE public.vendas_nao_particionada INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS
+            ) PARTITION BY RANGE (data_venda)
+        """))
+        # chave de partição precisa fazer parte da PK
+        conn.execute(text("ALTER TABLE public.vendas ADD CONSTRAINT vendas_pkey PRIMARY KEY (id, data_venda)"))
+        for nome, ddl, unico in indices:
+            if unico:
+                # UNIQUE em tabela particionada exige a chave de partição; não dá para recriar igual
+                log(f'índice único {nome} não recriado (não inclui data_venda).')
+                continue
+            conn.execute(text(_RE_INDICE_TABELA_ANTIGA.sub(' ON public.vendas ', ddl, count=1)))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_vendas_data_venda ON public.vendas (data_venda)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_vendas_vendedor_data ON public.vendas (vendedor_id, data_venda)"))
+        seq = conn.execute(text("SELECT pg_get_serial_sequence('public.vendas_nao_particionada', 'id')")).scalar()
+        if seq:
+            conn.execute(text(f"ALTER SEQUENCE {seq} OWNED BY public.vendas.id"))
+
+        lo = conn.execute(text("SELECT min(data_venda) FROM public.vendas_nao_particionada")).scalar()
+        hoje = date.today()
+        y, m = (lo.year, lo.month) if lo else (hoje.year, hoje.month)
+        fy, fm = _add_months(hoje.year, hoje.month, VENDAS_PARTICOES_MESES_FUTUROS)
+        conn.execute(text("CREATE TABLE public.vendas_default PARTITION OF public.vendas DEFAULT"))
+        while (y, m) <= (fy, fm):
+            _criar_particao_mes(conn, y, m)
+            y, m = _add_months(y, m, 1)
+
+        cols = ', '.join(_vendas_colunas_gravaveis(conn, 'vendas_nao_particionada'))
+        meses = conn.execute(text("""
+            SELECT DISTINCT date_trunc('month', data_venda) AS mes
+            FROM public.vendas_nao_particionada ORDER BY 1
+        """)).fetchall()
+        for (mes,) in meses:
+            ny, nm = _add_months(mes.year, mes.month, 1)
+            n = conn.execute(text(
+                f"INSERT INTO public.vendas ({cols}) SELECT {cols} FROM public.vendas_nao_particionada "
+                f"WHERE data_venda >= :a AND data_venda < :b"
+            ), {'a': mes, 'b': datetime(ny, nm, 1)}).rowcount
+            log(f'{mes:%Y-%m}: {n} vendas copiadas')
+
+        # depois da cópia: a validação das FKs é uma passada só
+        for nome, definicao in fks:
+            conn.execute(text(f'ALTER TABLE public.vendas ADD CONSTRAINT "{nome}" {definicao}'))
+
+        if drop_antiga:
+            conn.execute(text("DROP TABLE public.vendas_nao_particionada"))
+            log('tabela antiga removida.')
+        else:
+            log('tabela antiga mantida como vendas_nao_particionada (remova após conferir).')
+    return True
+
+@bp.cli.command('vendas-particionar')
+@click.option('--drop-antiga', is_flag=True, help='Remove vendas_nao_particionada ao final.')
+def cli_vendas_particionar(drop_antiga):
+    """Migra `vendas` para particionamento mensal por data_venda."""
+    migrar_vendas_para_particionada(drop_antiga=drop_antiga, log=click.echo)
+
+@bp.cli.command('vendas-particoes')
+@click.option('--meses', type=int, default=None, help='Meses à frente (padrão: VENDAS_PARTICOES_MESES_FUTUROS).')
+def cli_vendas_particoes(meses):
+    """Cria as partições mensais dos próximos meses (agendar via cron)."""
+    criadas = _ensure_vendas_partitions(meses)
+    click.echo('Partições criadas: ' + (', '.join(criadas) if criadas else 'nenhuma'))
+
+# ========= BOOTSTRAP =========
+# Importar o módulo ou chamar create_app() não abre conexão. O DDL acima roda
+# aqui: no deploy via `flask --app app bootstrap` ou, com AUTO_BOOTSTRAP,
+# uma vez por processo antes do primeiro request. O advisory lock serializa
+# workers que sobem juntos (gunicorn -w N) para não disputarem o mesmo ALTER.
+BOOTSTRAP_LOCK_ID = 734100
+
+_bootstrap_lock = threading.Lock()
+
+def bootstrap() -> dict:
+    """create_all + colunas/índices/triggers + partições + spool da auditoria (idempotente)."""
+    with db.engine.connect() as trava:
+        pg = trava.dialect.name == 'postgresql'
+        if pg:
+            trava.execute(text("SELECT pg_advisory_lock(:k)"), {'k': BOOTSTRAP_LOCK_ID})
+        try:
+            db.create_all(bind_key=None)  # só cria tabelas ausentes, e só no primário
+            _ensure_columns()
+            particoes = _ensure_vendas_partitions()
+            spool = _auditoria.reprocessa_spool()
+        finally:
+            if pg:
+                trava.execute(text("SELECT pg_advisory_unlock(:k)"), {'k': BOOTSTRAP_LOCK_ID})
+    return {'particoes_criadas': particoes, 'auditoria_reprocessada': spool}
+
+def bootstrap_uma_vez():
+    """before_request com AUTO_BOOTSTRAP: roda bootstrap() no primeiro request do processo."""
+    ext = current_app.extensions
+    if ext.get('bootstrap_feito'):
+        return
+    with _bootstrap_lock:
+        if not ext.get('bootstrap_feito'):
+            bootstrap()
+            ext['bootstrap_feito'] = True
+
+@bp.cli.command('bootstrap')
+def cli_bootstrap():
+    """Cria/atualiza o schema e reprocessa o spool da auditoria (rodar no deploy)."""
+    r = bootstrap()
+    click.echo('Schema ok. Partições criadas: ' + (', '.join(r['particoes_criadas']) or 'nenhuma') +
+               f"; auditoria reprocessada: {r['auditoria_reprocessada']} linhas.")
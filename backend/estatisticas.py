@@ -0,0 +1,113 @@
+"""
+Resumo do dashboard (/stats/summary).
+"""
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import func
+
+from dinheiro import reais
+from extensions import db, read_only
+from modelos import Venda, Vendedor
+from util import parse_month
+
+bp = Blueprint('estatisticas', __name__, cli_group=None)
+
+# ===================== STATS / DASHBOARD =====================
+@bp.get('/stats/summary')
+@jwt_required()
+@read_only
+def stats_summary():
+    claims = get_jwt()
+    role = claims.get('role')
+    uid = int(get_jwt_identity())
+
+    start = request.args.get('start')
+    end = request.args.get('end')
+    status = request.args.get('status', type=str)
+    banco_id = request.args.get('banco_id', type=int)
+    loja_id = request.args.get('loja_id', type=int)
+    vendedor_id = request.args.get('vendedor_id', type=int) if role == 'admin' else None
+
+    today = datetime.utcnow().date()
+    if not end:
+        end_year, end_month = today.year, today.month
+    else:
+        y, m = parse_month(end) or (today.year, today.month)
+        end_year, end_month = y, m
+    if not start:
+        mspan = (end_year*12 + end_month) - 5
+        start_year, start_month = divmod(mspan-1, 12); start_year += 1; start_month += 1
+    else:
+        y, m = parse_month(start) or (today.year, today.month)
+        start_year, start_month = y, m
+
+    start_dt = datetime(start_year, start_month, 1)
+    next_y = end_year + (1 if end_month == 12 else 0)
+    next_m = 1 if end_month == 12 else end_month + 1
+    end_dt = datetime(next_y, next_m, 1)
+
+    # faixa semiaberta sobre data_venda cru: permite poda de partições
+    q = db.session.query(Venda).filter(Venda.data_venda >= start_dt, Venda.data_venda < end_dt)
+    if role != 'admin':
+        q = q.filter(Venda.vendedor_id == uid)
+    if status:
+        q = q.filter(Venda.status == status)
+    if banco_id:
+        q = q.filter(Venda.banco_id == banco_id)
+    if loja_id:
+        q = q.filter(Venda.loja_parceira_id == loja_id)
+    if vendedor_id:
+        q = q.filter(Venda.vendedor_id == vendedor_id)
+
+    total_count = q.count()
+    # somas em centavos (bigint): exatas e sem aritmética de numeric
+    soma_c = func.coalesce(func.sum(Venda.valor_centavos), 0)
+    total_sum = q.with_entities(soma_c).scalar() or 0
+
+    q_aceitas = q.filter(Venda.status == 'aceita')
+    aceitas_count = q_aceitas.count()
+    conversion_rate = (aceitas_count / total_count) * 100.0 if total_count else 0.0
+
+    month_col = func.date_trunc('month', Venda.data_venda).label('mes')
+    by_month_rows = (
+        q.with_entities(month_col, func.count(), soma_c)
+         .group_by(month_col).order_by(month_col).all()
+    )
+    by_month = [{'month': r[0].date().isoformat()[:7], 'count': int(r[1]), 'sum': reais(int(r[2] or 0))} for r in by_month_rows]
+
+    by_status_rows = q.with_entities(Venda.status, func.count(), soma_c).group_by(Venda.status).all()
+    by_status = [{'status': s or '', 'count': int(c), 'sum': reais(int(v or 0))} for (s,c,v) in by_status_rows]
+
+    by_bank_rows = q.with_entities(Venda.banco, func.count(), soma_c).group_by(Venda.banco).order_by(func.count().desc()).limit(10).all()
+    by_bank = [{'banco': b or '', 'count': int(c), 'sum': reais(int(v or 0))} for (b,c,v) in by_bank_rows]
+
+    by_store_rows = q.with_entities(Venda.loja_parceira, func.count(), soma_c).group_by(Venda.loja_parceira).order_by(func.count().desc()).limit(10).all()
+    by_store = [{'loja': l or '', 'count': int(c), 'sum': reais(int(v or 0))} for (l,c,v) in by_store_rows]
+
+    by_seller = []
+    if role == 'admin':
+        by_seller_rows = (
+            q.join(Vendedor, Vendedor.id == Venda.vendedor_id)
+             .with_entities(Venda.vendedor_id, Vendedor.nome, func.count(), soma_c)
+             .group_by(Venda.vendedor_id, Vendedor.nome)
+             .order_by(func.count().desc()).limit(20).all()
+        )
+        by_seller = [{'vendedor_id': int(vid), 'vendedor_nome': (vnome or ''), 'count': int(c), 'sum': reais(int(v or 0))}
+                     for (vid, vnome, c, v) in by_seller_rows]
+
+    return jsonify({
+        'range': {'start': start_dt.date().isoformat(), 'end_exclusive': end_dt.date().isoformat()},
+        'filters_echo': {
+            'status': status, 'banco_id': banco_id, 'loja_id': loja_id,
+            'vendedor_id': vendedor_id if role=='admin' else None
+        },
+        'totals': {'count': int(total_count), 'sum': reais(int(total_sum))},
+        'conversion': {'accepted': int(aceitas_count), 'rate': round(conversion_rate, 2)},
+        'by_month': by_month,
+        'by_status': by_status,
+        'by_bank': by_bank,
+        'by_store': by_store,
+        'by_seller': by_seller
+    })
@@ -0,0 +1,173 @@
+"""
+Eventos ao vivo das vendas (LISTEN/NOTIFY -> Server-Sent Events).
+"""
+import json
+import os
+import queue
+import select
+import threading
+import time
+
+from flask import Blueprint, Response, current_app, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import text
+
+from extensions import db
+
+bp = Blueprint('eventos', __name__, cli_group=None)
+
+# ===================== EVENTOS (SSE) =====================
+# create_sale/update_sale fazem NOTIFY no canal SSE_CANAL dentro da própria
+# transação (o Postgres só entrega após o COMMIT). Cada processo web mantém uma
+# única conexão em LISTEN, aberta enquanto houver cliente conectado, e repassa
+# os eventos às filas dos clientes de GET /events: admin recebe tudo, vendedor
+# só as próprias vendas. Cliente lento ou reconexão ao banco gera `resync`
+# (o cliente recarrega tudo, pois eventos podem ter se perdido).
+SSE_CANAL = 'vendas_eventos'
+SSE_KEEPALIVE_SEG = 15
+SSE_FILA_MAX = 500
+SSE_MAX_CLIENTES = int(os.getenv('SSE_MAX_CLIENTES', '200'))
+
+def _notifica_vendas(evento: str, ids):
+    ids = [ids] if isinstance(ids, int) else list(ids)
+    if not ids:
+        return
+    db.session.execute(text("""
+        SELECT pg_notify(:canal, json_build_object(
+                 'evento', CAST(:ev AS text), 'id', id, 'vendedor_id', vendedor_id,
+                 'mes', to_char(data_venda, 'YYYY-MM'), 'status', status)::text)
+        FROM public.vendas WHERE id = ANY(:ids)
+    """), {'canal': SSE_CANAL, 'ev': evento, 'ids': ids})
+
+class _ClienteSSE:
+    def __init__(self, uid: int, role: str):
+        self.uid, self.role = uid, role
+        self.fila = queue.Queue(maxsize=SSE_FILA_MAX)
+        self.resync = False
+
+    def quer(self, ev: dict) -> bool:
+        return self.role == 'admin' or ev.get('vendedor_id') == self.uid
+
+    def entrega(self, item):
+        try:
+            self.fila.put_nowait(item)
+        except queue.Full:
+            self.resync = True
+
+class _HubEventos:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clientes = set()
+        self.thread = None
+        self.seq = 0
+
+    def inscrever(self, uid: int, role: str):
+        c = _ClienteSSE(uid, role)
+        with self.lock:
+            if len(self.clientes) >= SSE_MAX_CLIENTES:
+                return None
+            self.clientes.add(c)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._escuta,
+                                               args=(current_app._get_current_object(), db.engine),
+                                               name='sse-listen', daemon=True)
+                self.thread.start()
+        return c
+
+    def sair(self, c: _ClienteSSE):
+        with self.lock:
+            self.clientes.discard(c)
+
+    def _ativos(self):
+        with self.lock:
+            if not self.clientes:
+                self.thread = None
+            return list(self.clientes)
+
+    def _publica(self, payload: str):
+        try:
+            ev = json.loads(payload)
+        except ValueError:
+            return
+        with self.lock:
+            self.seq += 1
+            seq, alvos = self.seq, list(self.clientes)
+        for c in alvos:
+            if c.quer(ev):
+                c.entrega((seq, ev))
+
+    def _escuta(self, app, engine):
+        # termina assim que _ativos() zera self.thread: um novo inscrito abre outra
+        espera, reconectou = 1, False
+        while True:
+            if not self._ativos():
+                return
+            try:
+                raw = engine.raw_connection()
+            except Exception:
+                app.logger.warning('SSE: sem conexão com o banco; nova tentativa em %ss', espera)
+                time.sleep(espera)
+                espera = min(espera * 2, 30)
+                continue
+            try:
+                pg = raw.driver_connection
+                pg.autocommit = True
+                pg.cursor().execute(f'LISTEN {SSE_CANAL}')
+                espera = 1
+                while True:
+                    ativos = self._ativos()
+                    if not ativos:
+                        return
+                    if reconectou:
+                        for c in ativos:
+                            c.resync = True
+                        reconectou = False
+                    if select.select([pg], [], [], 5.0)[0]:
+                        pg.poll()
+                        while pg.notifies:
+                            self._publica(pg.notifies.pop(0).payload)
+            except Exception:
+                app.logger.exception('SSE: conexão de LISTEN caiu')
+                time.sleep(espera)
+            finally:
+                raw.invalidate()  # conexão em LISTEN/autocommit não volta para o pool
+                reconectou = True
+
+_hub_eventos = _HubEventos()
+
+@bp.get('/events')
+@jwt_required(locations=['headers', 'query_string'])  # EventSource não envia headers: ?jwt=<token>
+def sales_events():
+    claims = get_jwt()
+    cliente = _hub_eventos.inscrever(int(get_jwt_identity()), claims.get('role'))
+    if cliente is None:
+        return jsonify({'msg': 'Muitas conexões de eventos; tente mais tarde'}), 503
+    exp = claims.get('exp')
+
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                if exp and time.time() >= exp:
+                    yield 'event: expired\ndata: {}\n\n'
+                    return
+                try:
+                    seq, ev = cliente.fila.get(timeout=SSE_KEEPALIVE_SEG)
+                except queue.Empty:
+                    seq = ev = None
+                if cliente.resync:
+                    cliente.resync = False
+                    while not cliente.fila.empty():
+                        cliente.fila.get_nowait()
+                    yield 'event: resync\ndata: {}\n\n'
+                elif ev is not None:
+                    yield f'id: {seq}\nevent: venda\ndata: {json.dumps(ev, separators=(",", ":"))}\n\n'
+                else:
+                    yield ': ping\n\n'
+        finally:
+            _hub_eventos.sair(cliente)
+
+    resp = Response(stream(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'  # nginx: não bufferizar o stream
+    return resp
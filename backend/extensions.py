@@ -0,0 +1,131 @@
+"""
+Extensões compartilhadas (sem app): db, CORS e JWT são ligados à aplicação em
+create_app(). Aqui também fica o roteamento de leituras para a réplica.
+"""
+import os
+import threading
+import time
+import weakref
+from functools import wraps
+
+from flask import current_app, request, g, has_request_context
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FsaSession
+from flask_cors import CORS
+from flask_jwt_extended import JWTManager
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+class RoutingSession(FsaSession):
+    """Sessão que envia leituras de endpoints @read_only para a réplica.
+    Flush (escrita) e todo o resto continuam no primário."""
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _usar_replica():
+            return db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+cors = CORS(expose_headers=['X-Escrita-LSN'])
+jwt_manager = JWTManager()
+
+def descarta_pools_apos_fork(app):
+    """gunicorn --preload: o filho não pode reusar conexões abertas no master.
+    dispose(close=False) só abandona o pool herdado (o pai continua com o dele)."""
+    ref = weakref.ref(app)
+
+    def no_filho():
+        a = ref()
+        if a is None:
+            return
+        with a.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+    os.register_at_fork(after_in_child=no_filho)
+
+# ============== ROTEAMENTO PRIMÁRIO / RÉPLICA ==============
+# - @read_only marca o request como leitura (vai para a réplica se houver)
+# - read-your-writes: toda escrita devolve o LSN do primário no header X-Escrita-LSN;
+#   o cliente o reenvia e a leitura só vai para a réplica se ela já reproduziu esse
+#   LSN. O estado fica com o cliente, então vale entre workers e máquinas.
+# - réplica fora do ar: fica marcada como indisponível por DB_REPLICA_RETRY_SEG e o
+#   request é refeito no primário
+DB_REPLICA_RETRY_SEG = float(os.getenv('DB_REPLICA_RETRY_SEG', '30'))
+HEADER_LSN = 'X-Escrita-LSN'
+
+_replica_lock = threading.Lock()
+_replica_down_ate = 0.0
+_replica_lsn = 0  # último pg_last_wal_replay_lsn() lido (só cresce)
+
+def _replica_configurada() -> bool:
+    return 'replica' in (current_app.config.get('SQLALCHEMY_BINDS') or {})
+
+def _replica_disponivel() -> bool:
+    return _replica_configurada() and time.monotonic() >= _replica_down_ate
+
+def _marca_replica_fora(exc=None):
+    global _replica_down_ate
+    with _replica_lock:
+        _replica_down_ate = time.monotonic() + DB_REPLICA_RETRY_SEG
+    current_app.logger.warning('Réplica indisponível (%s); usando primário por %.0fs', exc, DB_REPLICA_RETRY_SEG)
+
+def _usar_replica() -> bool:
+    return has_request_context() and bool(g.get('db_replica')) and _replica_disponivel()
+
+def _lsn(valor):
+    """'16/B374D848' -> int (None se inválido)."""
+    try:
+        alto, baixo = str(valor).split('/')
+        return (int(alto, 16) << 32) + int(baixo, 16)
+    except (TypeError, ValueError):
+        return None
+
+def _replica_atrasada() -> bool:
+    """True se a réplica ainda não reproduziu a última escrita do cliente.
+    Só consulta a réplica quando o LSN já conhecido dela é menor que o pedido."""
+    global _replica_lsn
+    pedido = _lsn(request.headers.get(HEADER_LSN))
+    if pedido is None or pedido <= _replica_lsn:
+        return False
+    try:
+        with db.engines['replica'].connect() as conn:
+            # réplica que não é standby (ex.: o próprio primário em dev) não tem replay
+            atual = _lsn(conn.execute(text(
+                "SELECT COALESCE(pg_last_wal_replay_lsn(), pg_current_wal_lsn())::text"
+            )).scalar())
+    except OperationalError as e:
+        _marca_replica_fora(e)
+        return True
+    if atual is None:
+        return True
+    with _replica_lock:
+        _replica_lsn = max(_replica_lsn, atual)
+    return atual < pedido
+
+def read_only(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _replica_disponivel() or _replica_atrasada():
+            return fn(*args, **kwargs)
+        g.db_replica = True
+        try:
+            return fn(*args, **kwargs)
+        except OperationalError as e:
+            # réplica caiu no meio do request: refaz no primário
+            db.session.rollback()
+            _marca_replica_fora(e)
+            g.db_replica = False
+            return fn(*args, **kwargs)
+        finally:
+            g.db_replica = False
+    return wrapper
+
+def registra_escrita(resp):
+    """after_request: devolve o LSN do primário após a escrita (read-your-writes)."""
+    if _replica_configurada() and request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and resp.status_code < 400:
+        try:
+            with db.engine.connect() as conn:
+                resp.headers[HEADER_LSN] = conn.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+        except Exception:
+            # sem o header, a próxima leitura pode vir da réplica atrasada; não falha a escrita
+            current_app.logger.exception('read-your-writes: falha ao ler o LSN do primário')
+    return resp
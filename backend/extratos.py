@@ -0,0 +1,75 @@
+"""
+Geração de extratos (CSV) por vendedor e por loja parceira.
+
+Funções puras, sem Flask/SQLAlchemy: o processo principal lê o snapshot do
+mês fechado e distribui um grupo de linhas por extrato para um pool de
+processos, que formata e grava cada arquivo em paralelo.
+"""
+import csv
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from dinheiro import centavos, reais
+
+COLUNAS = (
+    ('venda_id', 'Venda'),
+    ('data_venda', 'Data'),
+    ('vendedor_nome', 'Vendedor'),
+    ('cliente_nome', 'Cliente'),
+    ('cliente_documento', 'CPF/CNPJ'),
+    ('banco', 'Banco'),
+    ('loja_parceira', 'Loja'),
+    ('status', 'Status'),
+    ('valor', 'Valor'),
+    ('perc_comissao_aplicado', '% Comissão'),
+    ('comissao_real', 'Comissão'),
+    ('loja_repasse_percent', '% Repasse'),
+    ('loja_repasse_valor', 'Repasse'),
+    ('comissao_vendedor', 'Comissão vendedor'),
+    ('empresa_bruta', 'Empresa bruta'),
+    ('empresa_liquida', 'Empresa líquida'),
+)
+TOTAIS = ('valor', 'comissao_real', 'loja_repasse_valor', 'comissao_vendedor', 'empresa_bruta', 'empresa_liquida')
+
+def slug(s: str) -> str:
+    s = unicodedata.normalize('NFKD', s or '').encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^A-Za-z0-9]+', '_', s).strip('_').lower() or 'sem_nome'
+
+def _fmt(v) -> str:
+    # CSV para Excel pt-BR: ';' como separador e vírgula decimal
+    if v is None:
+        return ''
+    if isinstance(v, float):
+        return f'{v:.2f}'.replace('.', ',')
+    return str(v)
+
+def escrever_extrato(caminho: str, linhas: list) -> dict:
+    """Grava um extrato; `linhas` são dicts com as chaves de COLUNAS."""
+    totais = {k: 0 for k in TOTAIS}   # centavos
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    tmp = caminho + '.tmp'
+    with open(tmp, 'w', newline='', encoding='utf-8-sig') as f:
+        w = csv.writer(f, delimiter=';')
+        w.writerow([titulo for _, titulo in COLUNAS])
+        for r in linhas:
+            w.writerow([_fmt(r.get(k)) for k, _ in COLUNAS])
+            if r.get('status') == 'aceita':
+                for k in TOTAIS:
+                    totais[k] += centavos(r.get(k) or 0)
+        w.writerow([])
+        w.writerow(['Totais (vendas aceitas)'] + [''] * 7 +
+                   [_fmt(reais(totais[k])) if k in TOTAIS else '' for k, _ in COLUNAS[8:]])
+    os.replace(tmp, caminho)
+    return {'arquivo': caminho, 'linhas': len(linhas), 'totais': {k: reais(v) for k, v in totais.items()}}
+
+def gerar_extratos(grupos, pasta: str, workers: int = None) -> list:
+    """grupos: [(nome_arquivo, linhas)] -> resumo de cada arquivo gravado."""
+    os.makedirs(pasta, exist_ok=True)
+    workers = workers or min(8, os.cpu_count() or 1)
+    if workers <= 1 or len(grupos) <= 1:
+        return [escrever_extrato(os.path.join(pasta, nome), linhas) for nome, linhas in grupos]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futs = [ex.submit(escrever_extrato, os.path.join(pasta, nome), linhas) for nome, linhas in grupos]
+        return [f.result() for f in futs]
@@ -0,0 +1,187 @@
+"""
+Fechamento mensal (snapshot das vendas) e extratos.
+"""
+import os
+from datetime import date, datetime
+
+import click
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy import func, text
+
+from extensions import db, read_only
+from modelos import FechamentoMes, Venda, VendaFechada
+from util import _add_months, parse_month
+from comissoes import calcular_financeiro_lote, _regrava_valor_comissao, _valor_comissao_gerado, _vendedores_info
+from autenticacao import admin_required
+
+bp = Blueprint('fechamento', __name__, cli_group=None)
+
+# ===================== FECHAMENTO MENSAL =====================
+# "Fechar o mês" congela o financeiro de cada venda em vendas_fechadas; depois
+# disso as leituras do mês vêm do snapshot e a venda não pode mais ser editada.
+FECHAMENTO_LOTE = 5000
+
+def mes_fechado(ano: int, mes: int) -> bool:
+    return db.session.query(FechamentoMes.id).filter_by(ano=ano, mes=mes).first() is not None
+
+def _chave_fechamento(ano: int, mes: int) -> int:
+    return 731000000 + ano * 100 + mes
+
+def trava_mes_aberto(ano: int, mes: int):
+    """Lock compartilhado do mês até o fim da transação: quem altera venda chama
+    antes de checar `mes_fechado`, e o fechamento (lock exclusivo) espera o commit."""
+    db.session.execute(text("SELECT pg_advisory_xact_lock_shared(:k)"), {'k': _chave_fechamento(ano, mes)})
+
+def fechar_mes(ano: int, mes: int, fechado_por: int = None, lote: int = FECHAMENTO_LOTE, log=None,
+               progresso=None) -> int:
+    """Grava o snapshot do mês (numa transação) e retorna a quantidade de vendas.
+    `progresso(pct, mensagem)`, se informado, substitui `log`."""
+    # serializa fechamentos concorrentes do mesmo mês
+    db.session.execute(text("SELECT pg_advisory_xact_lock(:k)"), {'k': _chave_fechamento(ano, mes)})
+    if mes_fechado(ano, mes):
+        raise ValueError('Mês já fechado')
+    ny, nm = _add_months(ano, mes, 1)
+    ini, fim = datetime(ano, mes, 1), datetime(ny, nm, 1)
+    previstas = _conta_mes(ini, fim) if progresso else 0
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        vendas = (Venda.query
+                  .filter(Venda.data_venda >= ini, Venda.data_venda < fim, Venda.id > ultimo_id)
+                  .order_by(Venda.id.asc()).limit(lote).all())
+        if not vendas:
+            break
+        financeiro = calcular_financeiro_lote(vendas, usar_fechamento=False)
+        db.session.execute(db.insert(VendaFechada), [{
+            'venda_id': v.id, 'ano': ano, 'mes': mes,
+            'vendedor_id': v.vendedor_id, 'loja_parceira_id': v.loja_parceira_id, 'banco_id': v.banco_id,
+            'data_venda': v.data_venda, 'cliente_nome': v.cliente_nome,
+            'cliente_documento': v.cliente_documento, 'banco': v.banco,
+            'loja_parceira': v.loja_parceira, 'status': v.status, 'valor': v.valor,
+            'perc_comissao_aplicado': v.perc_comissao_aplicado, **fin,
+        } for v, fin in zip(vendas, financeiro)])
+        total += len(vendas)
+        ultimo_id = vendas[-1].id
+        db.session.expunge_all()
+        if progresso:
+            progresso(min(100, total * 100 // max(previstas, 1)), f'{total} vendas congeladas')
+        elif log:
+            log(f'{total} vendas congeladas')
+
+    db.session.add(FechamentoMes(ano=ano, mes=mes, fechado_por=fechado_por, qtd_vendas=total))
+    db.session.commit()
+    return total
+
+def gerar_extratos_mes(ano: int, mes: int, pasta: str, workers: int = None) -> list:
+    """Extratos CSV por vendedor e por loja do mês fechado, gerados em paralelo."""
+    from extratos import gerar_extratos, slug
+
+    if not mes_fechado(ano, mes):
+        raise ValueError('Mês não está fechado')
+    rows = (VendaFechada.query.filter_by(ano=ano, mes=mes)
+            .order_by(VendaFechada.data_venda.asc(), VendaFechada.venda_id.asc()).all())
+    nomes = {k: v[0] for k, v in _vendedores_info({r.vendedor_id for r in rows}).items()}
+
+    por_vendedor, por_loja, nomes_loja = {}, {}, {}
+    for r in rows:
+        linha = {
+            'venda_id': r.venda_id, 'data_venda': r.data_venda.strftime('%d/%m/%Y'),
+            'vendedor_nome': nomes.get(r.vendedor_id), 'cliente_nome': r.cliente_nome,
+            'cliente_documento': r.cliente_documento, 'banco': r.banco,
+            'loja_parceira': r.loja_parceira, 'status': r.status, 'valor': float(r.valor),
+            'perc_comissao_aplicado': (float(r.perc_comissao_aplicado) if r.perc_comissao_aplicado is not None else None),
+            **r.to_financeiro(),
+        }
+        por_vendedor.setdefault(r.vendedor_id, []).append(linha)
+        if r.loja_parceira_id:
+            por_loja.setdefault(r.loja_parceira_id, []).append(linha)
+            nomes_loja.setdefault(r.loja_parceira_id, r.loja_parceira)
+
+    grupos = [(f'vendedor_{vid}_{slug(nomes.get(vid))}.csv', linhas) for vid, linhas in por_vendedor.items()]
+    grupos += [(f'loja_{lid}_{slug(nomes_loja.get(lid))}.csv', linhas) for lid, linhas in por_loja.items()]
+    return gerar_extratos(grupos, os.path.join(pasta, f'{ano:04d}-{mes:02d}'), workers)
+
+@bp.get('/closings')
+@jwt_required()
+@admin_required
+@read_only
+def list_closings():
+    rows = FechamentoMes.query.order_by(FechamentoMes.ano.desc(), FechamentoMes.mes.desc()).all()
+    return jsonify([{
+        'month': f'{r.ano:04d}-{r.mes:02d}', 'fechado_em': r.fechado_em.isoformat(),
+        'fechado_por': r.fechado_por, 'qtd_vendas': r.qtd_vendas,
+    } for r in rows])
+
+@bp.post('/closings')
+@jwt_required()
+@admin_required
+def create_closing():
+    data = request.get_json(silent=True) or {}
+    ym = parse_month(data.get('month'))
+    if not ym or not (1 <= ym[1] <= 12):
+        return jsonify({'msg': 'Mês (YYYY-MM) é obrigatório'}), 400
+    today = date.today()
+    if (ym[0], ym[1]) >= (today.year, today.month):
+        return jsonify({'msg': 'Só é possível fechar meses anteriores ao atual'}), 400
+    try:
+        n = fechar_mes(ym[0], ym[1], int(get_jwt_identity()))
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'msg': str(e)}), 409
+    return jsonify({'month': f'{ym[0]:04d}-{ym[1]:02d}', 'qtd_vendas': n}), 201
+
+@bp.cli.command('fechar-mes')
+@click.argument('month')
+def cli_fechar_mes(month):
+    """Fecha o mês (YYYY-MM), congelando o financeiro das vendas."""
+    ym = parse_month(month)
+    if not ym:
+        raise click.BadParameter('use YYYY-MM')
+    click.echo(f'{fechar_mes(*ym)} vendas congeladas em {month}.')
+
+@bp.cli.command('extratos')
+@click.argument('month')
+@click.option('--pasta', default='extratos', show_default=True)
+@click.option('--workers', type=int, default=None, help='Processos em paralelo (padrão: nº de CPUs, máx. 8).')
+def cli_extratos(month, pasta, workers):
+    """Gera extratos CSV por vendedor e por loja de um mês fechado."""
+    ym = parse_month(month)
+    if not ym:
+        raise click.BadParameter('use YYYY-MM')
+    for r in gerar_extratos_mes(ym[0], ym[1], pasta, workers):
+        click.echo(f"{r['arquivo']}: {r['linhas']} vendas, empresa líquida {r['totais']['empresa_liquida']:.2f}")
+
+def _conta_mes(ini: datetime, fim: datetime) -> int:
+    return (db.session.query(func.count(Venda.id))
+            .filter(Venda.data_venda >= ini, Venda.data_venda < fim).scalar())
+
+def recalcular_valor_comissao(ano: int, mes: int, lote: int = FECHAMENTO_LOTE, log=print,
+                              progresso=None) -> int:
+    """Regrava vendas.valor_comissao do mês em lotes (coluna não gerada; commit por lote).
+    `progresso(pct, mensagem)`, se informado, substitui `log` a cada lote."""
+    if _valor_comissao_gerado():
+        log('valor_comissao é coluna gerada; nada a recalcular.')
+        return 0
+    ny, nm = _add_months(ano, mes, 1)
+    ini, fim = datetime(ano, mes, 1), datetime(ny, nm, 1)
+    previstas = _conta_mes(ini, fim) if progresso else 0
+    total = 0
+    ultimo_id = 0
+    while True:
+        ids = [r[0] for r in db.session.query(Venda.id)
+               .filter(Venda.data_venda >= ini, Venda.data_venda < fim, Venda.id > ultimo_id)
+               .order_by(Venda.id.asc()).limit(lote).all()]
+        if not ids:
+            break
+        _regrava_valor_comissao(ids)
+        db.session.commit()
+        total += len(ids)
+        ultimo_id = ids[-1]
+        db.session.expunge_all()
+        if progresso:
+            progresso(min(100, total * 100 // max(previstas, 1)), f'{total} vendas recalculadas')
+        else:
+            log(f'{total} vendas recalculadas')
+    return total
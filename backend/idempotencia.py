@@ -0,0 +1,91 @@
+"""
+Decorator @idempotente (header Idempotency-Key) dos endpoints de criação.
+"""
+import hashlib
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import text
+
+from extensions import db
+
+# ================ IDEMPOTÊNCIA (Idempotency-Key) =================
+# Endpoints de criação aceitam o header Idempotency-Key: a primeira resposta
+# (exceto 5xx) fica gravada por IDEMPOTENCIA_TTL_HORAS e é devolvida nas
+# repetições sem executar o endpoint de novo.
+IDEMPOTENCIA_TTL_HORAS = float(os.getenv('IDEMPOTENCIA_TTL_HORAS', '24'))
+IDEMPOTENCIA_EM_ANDAMENTO_SEG = 60
+
+def _purga_idempotencia(conn):
+    conn.execute(text("DELETE FROM public.idempotencia WHERE expira_em < CURRENT_TIMESTAMP"))
+
+def idempotente(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        chave = (request.headers.get('Idempotency-Key') or '').strip()
+        if not chave:
+            return fn(*args, **kwargs)
+        if len(chave) > 255:
+            return jsonify({'msg': 'Idempotency-Key muito longa'}), 400
+        uid = int(get_jwt_identity())
+        corpo_hash = hashlib.sha256(request.get_data() or b'').digest()
+        agora = datetime.utcnow()
+
+        # reserva a chave numa transação própria (visível para retries concorrentes)
+        with db.engine.begin() as conn:
+            if random.random() < 0.01:
+                _purga_idempotencia(conn)
+            conn.execute(text("""
+                DELETE FROM public.idempotencia
+                WHERE usuario_id = :u AND chave = :k
+                  AND (expira_em < :agora OR (status_code IS NULL AND expira_em < :andamento))
+            """), {'u': uid, 'k': chave, 'agora': agora,
+                     'andamento': agora + timedelta(hours=IDEMPOTENCIA_TTL_HORAS, seconds=-IDEMPOTENCIA_EM_ANDAMENTO_SEG)})
+            reservou = conn.execute(text("""
+                INSERT INTO public.idempotencia (usuario_id, chave, rota, corpo_hash, expira_em)
+                VALUES (:u, :k, :r, :h, :exp)
+                ON CONFLICT (usuario_id, chave) DO NOTHING
+            """), {'u': uid, 'k': chave, 'r': request.path[:120], 'h': corpo_hash,
+                     'exp': agora + timedelta(hours=IDEMPOTENCIA_TTL_HORAS)}).rowcount
+            if not reservou:
+                row = conn.execute(text("""
+                    SELECT rota, corpo_hash, status_code, resposta FROM public.idempotencia
+                    WHERE usuario_id = :u AND chave = :k
+                """), {'u': uid, 'k': chave}).first()
+
+        if not reservou:
+            if row is None:
+                return jsonify({'msg': 'Tente novamente'}), 409
+            if row.rota != request.path[:120] or bytes(row.corpo_hash) != corpo_hash:
+                return jsonify({'msg': 'Idempotency-Key já usada com outra requisição'}), 422
+            if row.status_code is None:
+                return jsonify({'msg': 'Requisição original ainda em processamento'}), 409
+            resp = jsonify(row.resposta)
+            resp.status_code = row.status_code
+            resp.headers['Idempotent-Replayed'] = 'true'
+            return resp
+
+        try:
+            resp = current_app.make_response(fn(*args, **kwargs))
+        except Exception:
+            with db.engine.begin() as conn:
+                conn.execute(text("DELETE FROM public.idempotencia WHERE usuario_id = :u AND chave = :k"),
+                             {'u': uid, 'k': chave})
+            raise
+        with db.engine.begin() as conn:
+            if resp.status_code >= 500:
+                conn.execute(text("DELETE FROM public.idempotencia WHERE usuario_id = :u AND chave = :k"),
+                             {'u': uid, 'k': chave})
+            else:
+                conn.execute(text("""
+                    UPDATE public.idempotencia SET status_code = :s, resposta = CAST(:r AS JSONB)
+                    WHERE usuario_id = :u AND chave = :k
+                """), {'s': resp.status_code, 'r': json.dumps(resp.get_json(silent=True)),
+                         'u': uid, 'k': chave})
+        return resp
+    return wrapper
@@ -0,0 +1,339 @@
+"""
+Fila de jobs em segundo plano (tabela `jobs`) e o `flask jobs-worker`.
+"""
+import json
+import multiprocessing
+import os
+import random
+import signal
+import threading
+from datetime import date, datetime
+
+import click
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy import text
+
+from extensions import db
+from modelos import Job
+from util import parse_month, _to_int_or_none
+from esquema import _ensure_vendas_partitions
+from autenticacao import admin_required
+from idempotencia import idempotente
+from clientes import backfill_clientes, CLIENTES_BACKFILL_LOTE
+from fechamento import fechar_mes, gerar_extratos_mes, recalcular_valor_comissao
+from arquivo import ARQUIVO_LOTE, EXTENSOES, arquivar_vendas, corte_maximo, formato_padrao
+
+bp = Blueprint('jobs', __name__, cli_group=None)
+
+# ===================== JOBS (segundo plano) =====================
+# Operações pesadas não rodam na thread da requisição: POST /jobs grava a linha
+# em `jobs` e `flask jobs-worker` (processos separados do gunicorn) consome a
+# fila com SELECT ... FOR UPDATE SKIP LOCKED. Falha transitória volta para a
+# fila com backoff exponencial; ValueError é definitiva (parâmetro/estado
+# inválido). O cancelamento é cooperativo: checado a cada progresso reportado.
+JOBS_PROCESSOS = int(os.getenv('JOBS_PROCESSOS', '2'))
+JOBS_POLL_SEG = float(os.getenv('JOBS_POLL_SEG', '2'))
+JOBS_BACKOFF_SEG = float(os.getenv('JOBS_BACKOFF_SEG', '30'))
+JOBS_HEARTBEAT_SEG = 15
+JOBS_ORFAO_SEG = int(os.getenv('JOBS_ORFAO_SEG', '120'))  # sem heartbeat: worker morreu
+JOBS_PASTA_EXTRATOS = os.getenv('JOBS_PASTA_EXTRATOS', 'extratos')
+
+_JOB_TIPOS = {}
+
+class JobCancelado(Exception):
+    pass
+
+def job_tipo(nome: str, validar=None):
+    """Registra o executor de um tipo de job. `validar(params)` roda no POST
+    /jobs, devolve os params normalizados e levanta ValueError se inválidos."""
+    def deco(fn):
+        _JOB_TIPOS[nome] = (fn, validar or (lambda p: p))
+        return fn
+    return deco
+
+class _JobCtx:
+    def __init__(self, job_id: int, criado_por):
+        self.job_id, self.criado_por = job_id, criado_por
+
+    def progresso(self, pct: int = None, mensagem: str = None):
+        """Grava o progresso (transação própria) e interrompe se pediram cancelamento."""
+        with db.engine.begin() as conn:
+            cancelar = conn.execute(text("""
+                UPDATE public.jobs
+                SET progresso = COALESCE(:p, progresso), mensagem = COALESCE(:m, mensagem),
+                    heartbeat_em = CURRENT_TIMESTAMP
+                WHERE id = :id RETURNING cancelar
+            """), {'p': pct, 'm': mensagem, 'id': self.job_id}).scalar()
+        if cancelar:
+            raise JobCancelado()
+
+def _job_to_dict(j: Job) -> dict:
+    iso = lambda d: d.isoformat() if d else None
+    return {
+        'id': j.id, 'tipo': j.tipo, 'params': j.params, 'status': j.status,
+        'tentativas': j.tentativas, 'max_tentativas': j.max_tentativas,
+        'progresso': j.progresso, 'mensagem': j.mensagem,
+        'resultado': j.resultado, 'erro': j.erro, 'cancelar': j.cancelar,
+        'criado_por': j.criado_por, 'criado_em': iso(j.criado_em),
+        'executar_em': iso(j.executar_em), 'iniciado_em': iso(j.iniciado_em),
+        'finalizado_em': iso(j.finalizado_em),
+    }
+
+def _job_pega():
+    """Reserva o próximo job pendente (ou None). Antes, devolve à fila os
+    órfãos: 'executando' sem heartbeat há JOBS_ORFAO_SEG."""
+    with db.engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE public.jobs
+            SET status = CASE WHEN cancelar THEN 'cancelado'
+                              WHEN tentativas < max_tentativas THEN 'pendente' ELSE 'falhou' END,
+                erro = 'worker interrompido', executar_em = CURRENT_TIMESTAMP,
+                finalizado_em = CASE WHEN NOT cancelar AND tentativas < max_tentativas THEN NULL
+                                     ELSE CURRENT_TIMESTAMP END
+            WHERE status = 'executando'
+              AND heartbeat_em < CURRENT_TIMESTAMP - make_interval(secs => :s)
+        """), {'s': JOBS_ORFAO_SEG})
+        return conn.execute(text("""
+            UPDATE public.jobs j
+            SET status = 'executando', tentativas = j.tentativas + 1,
+                iniciado_em = CURRENT_TIMESTAMP, heartbeat_em = CURRENT_TIMESTAMP, erro = NULL
+            FROM (
+              SELECT id FROM public.jobs
+              WHERE status = 'pendente' AND executar_em <= CURRENT_TIMESTAMP
+              ORDER BY executar_em, id
+              FOR UPDATE SKIP LOCKED
+              LIMIT 1
+            ) prox
+            WHERE j.id = prox.id
+            RETURNING j.id, j.tipo, j.params, j.tentativas, j.max_tentativas, j.criado_por
+        """)).first()
+
+def _job_heartbeat(app, engine, job_id: int, parar: threading.Event):
+    # mantém o job vivo mesmo quando o executor não reporta progresso
+    while not parar.wait(JOBS_HEARTBEAT_SEG):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("UPDATE public.jobs SET heartbeat_em = CURRENT_TIMESTAMP WHERE id = :id"),
+                             {'id': job_id})
+        except Exception:
+            app.logger.exception('heartbeat do job %s falhou', job_id)
+
+def _job_finaliza(job_id: int, status: str, resultado=None, erro: str = None, atraso_seg: float = None):
+    with db.engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE public.jobs
+            SET status = :st, resultado = CAST(:r AS JSONB), erro = :e,
+                progresso = CASE WHEN :st = 'concluido' THEN 100 ELSE progresso END,
+                executar_em = CASE WHEN :st = 'pendente'
+                                   THEN CURRENT_TIMESTAMP + make_interval(secs => :atraso)
+                                   ELSE executar_em END,
+                finalizado_em = CASE WHEN :st = 'pendente' THEN NULL ELSE CURRENT_TIMESTAMP END
+            WHERE id = :id
+        """), {'st': status, 'r': (json.dumps(resultado, default=str) if resultado is not None else None),
+                 'e': (erro or '')[:4000] or None, 'atraso': atraso_seg or 0, 'id': job_id})
+
+def _job_executa(row):
+    job_id, tipo, params, tentativas, max_tentativas, criado_por = row
+    parar = threading.Event()
+    hb = threading.Thread(target=_job_heartbeat, daemon=True,
+                          args=(current_app._get_current_object(), db.engine, job_id, parar))
+    hb.start()
+    try:
+        if tipo not in _JOB_TIPOS:
+            raise ValueError(f'Tipo de job desconhecido: {tipo}')
+        resultado = _JOB_TIPOS[tipo][0](params or {}, _JobCtx(job_id, criado_por))
+        db.session.commit()
+        _job_finaliza(job_id, 'concluido', resultado)
+    except JobCancelado:
+        db.session.rollback()
+        _job_finaliza(job_id, 'cancelado', erro='cancelado a pedido')
+    except ValueError as e:
+        db.session.rollback()
+        _job_finaliza(job_id, 'falhou', erro=str(e))
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('job %s (%s) falhou na tentativa %s', job_id, tipo, tentativas)
+        if tentativas < max_tentativas:
+            atraso = JOBS_BACKOFF_SEG * (2 ** (tentativas - 1)) * random.uniform(1.0, 1.25)
+            _job_finaliza(job_id, 'pendente', erro=f'{type(e).__name__}: {e}', atraso_seg=atraso)
+        else:
+            _job_finaliza(job_id, 'falhou', erro=f'{type(e).__name__}: {e}')
+    finally:
+        parar.set()
+        db.session.remove()
+
+def _jobs_worker_loop(app, parar):
+    # SIGINT (Ctrl+C) fica com o processo pai; SIGTERM termina o job atual e sai
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)  # não reutiliza conexões herdadas do fork
+        while not parar.is_set():
+            row = _job_pega()
+            if row is None:
+                parar.wait(JOBS_POLL_SEG)
+                continue
+            _job_executa(row)
+
+# ---- tipos de job ----
+def _valida_mes_fechavel(params):
+    ym = parse_month(params.get('month'))
+    if not ym or not (1 <= ym[1] <= 12):
+        raise ValueError('Mês (YYYY-MM) é obrigatório')
+    today = date.today()
+    if (ym[0], ym[1]) >= (today.year, today.month):
+        raise ValueError('Só é possível fechar meses anteriores ao atual')
+    return {'month': f'{ym[0]:04d}-{ym[1]:02d}'}
+
+def _valida_mes(params):
+    ym = parse_month(params.get('month'))
+    if not ym or not (1 <= ym[1] <= 12):
+        raise ValueError('Mês (YYYY-MM) é obrigatório')
+    return {'month': f'{ym[0]:04d}-{ym[1]:02d}'}
+
+def _valida_lote(params):
+    lote = _to_int_or_none(params.get('lote')) or CLIENTES_BACKFILL_LOTE
+    if not (100 <= lote <= 100000):
+        raise ValueError('lote deve estar entre 100 e 100000')
+    return {'lote': lote}
+
+@job_tipo('fechar_mes', _valida_mes_fechavel)
+def _job_fechar_mes(params, ctx):
+    ano, mes = parse_month(params['month'])
+    n = fechar_mes(ano, mes, ctx.criado_por, progresso=ctx.progresso)
+    return {'month': params['month'], 'qtd_vendas': n}
+
+@job_tipo('extratos', _valida_mes)
+def _job_extratos(params, ctx):
+    ano, mes = parse_month(params['month'])
+    ctx.progresso(mensagem='gerando arquivos')
+    arquivos = gerar_extratos_mes(ano, mes, JOBS_PASTA_EXTRATOS)
+    return {'month': params['month'], 'arquivos': arquivos}
+
+@job_tipo('clientes_backfill', _valida_lote)
+def _job_clientes_backfill(params, ctx):
+    n = backfill_clientes(params['lote'], progresso=ctx.progresso)
+    return {'vendas': n}
+
+@job_tipo('comissoes_recalcular', _valida_mes)
+def _job_comissoes_recalcular(params, ctx):
+    ano, mes = parse_month(params['month'])
+    n = recalcular_valor_comissao(ano, mes, log=lambda m: ctx.progresso(mensagem=m), progresso=ctx.progresso)
+    return {'month': params['month'], 'vendas': n}
+
+def _valida_arquivamento(params):
+    try:
+        corte = datetime.strptime(str(params.get('antes_de') or ''), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError('antes_de (YYYY-MM-01) é obrigatório')
+    if corte.day != 1 or corte > corte_maximo():
+        raise ValueError(f'antes_de deve ser o 1º dia de um mês até {corte_maximo().isoformat()}')
+    lote = _to_int_or_none(params.get('lote')) or ARQUIVO_LOTE
+    if not (100 <= lote <= 100000):
+        raise ValueError('lote deve estar entre 100 e 100000')
+    formato = params.get('formato') or formato_padrao()
+    if formato not in EXTENSOES:
+        raise ValueError(f'formato deve ser um de: {", ".join(sorted(EXTENSOES))}')
+    return {'antes_de': corte.isoformat(), 'lote': lote, 'formato': formato}
+
+@job_tipo('vendas_arquivar', _valida_arquivamento)
+def _job_vendas_arquivar(params, ctx):
+    corte = datetime.strptime(params['antes_de'], '%Y-%m-%d').date()
+    n = arquivar_vendas(corte, params['lote'], params['formato'], progresso=ctx.progresso)
+    return {'antes_de': params['antes_de'], 'vendas': n}
+
+@job_tipo('vendas_particoes')
+def _job_vendas_particoes(params, ctx):
+    return {'criadas': _ensure_vendas_partitions(_to_int_or_none(params.get('meses')))}
+
+# ---- API ----
+@bp.post('/jobs')
+@jwt_required()
+@admin_required
+@idempotente
+def create_job():
+    data = request.get_json(silent=True) or {}
+    tipo = (data.get('tipo') or '').strip()
+    if tipo not in _JOB_TIPOS:
+        return jsonify({'msg': 'Tipo de job inválido', 'tipos': sorted(_JOB_TIPOS)}), 400
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'msg': 'params deve ser um objeto'}), 400
+    try:
+        params = _JOB_TIPOS[tipo][1](params)
+    except ValueError as e:
+        return jsonify({'msg': str(e)}), 400
+    max_tentativas = _to_int_or_none(data.get('max_tentativas')) or 3
+    if not (1 <= max_tentativas <= 10):
+        return jsonify({'msg': 'max_tentativas deve estar entre 1 e 10'}), 400
+    j = Job(tipo=tipo, params=params, max_tentativas=max_tentativas,
+            criado_por=int(get_jwt_identity()))
+    db.session.add(j)
+    db.session.commit()
+    resp = jsonify(_job_to_dict(j))
+    resp.status_code = 202
+    resp.headers['Location'] = f'/jobs/{j.id}'
+    return resp
+
+@bp.get('/jobs')
+@jwt_required()
+@admin_required
+def list_jobs():
+    q = Job.query
+    status = request.args.get('status', type=str)
+    if status:
+        q = q.filter(Job.status == status)
+    limite = min(max(request.args.get('limit', default=50, type=int), 1), 500)
+    return jsonify([_job_to_dict(j) for j in q.order_by(Job.id.desc()).limit(limite).all()])
+
+@bp.get('/jobs/<int:job_id>')
+@jwt_required()
+@admin_required
+def get_job(job_id):
+    return jsonify(_job_to_dict(Job.query.get_or_404(job_id)))
+
+@bp.post('/jobs/<int:job_id>/cancel')
+@jwt_required()
+@admin_required
+def cancel_job(job_id):
+    """Pendente é cancelado na hora; em execução para no próximo progresso reportado."""
+    row = db.session.execute(text("""
+        UPDATE public.jobs
+        SET cancelar = true,
+            status = CASE WHEN status = 'pendente' THEN 'cancelado' ELSE status END,
+            finalizado_em = CASE WHEN status = 'pendente' THEN CURRENT_TIMESTAMP ELSE finalizado_em END
+        WHERE id = :id AND status IN ('pendente', 'executando')
+        RETURNING id
+    """), {'id': job_id}).first()
+    db.session.commit()
+    j = Job.query.get_or_404(job_id)
+    if row is None:
+        return jsonify({'msg': f'Job já finalizado ({j.status})', 'job': _job_to_dict(j)}), 409
+    return jsonify(_job_to_dict(j))
+
+@bp.cli.command('jobs-worker')
+@click.option('--processos', type=int, default=JOBS_PROCESSOS, show_default=True)
+def cli_jobs_worker(processos):
+    """Consome a fila de jobs com N processos (Ctrl+C/SIGTERM: termina o job atual e sai)."""
+    mp = multiprocessing.get_context('fork')
+    parar = mp.Event()
+    for engine in db.engines.values():
+        engine.dispose()
+    # não-daemon: executores podem abrir o próprio pool (ex.: extratos)
+    app = current_app._get_current_object()
+    procs = [mp.Process(target=_jobs_worker_loop, args=(app, parar), name=f'jobs-{i + 1}')
+             for i in range(max(1, processos))]
+    for p in procs:
+        p.start()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    click.echo(f'{len(procs)} processos consumindo a fila de jobs.')
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        click.echo('encerrando após os jobs em andamento...')
+        parar.set()
+        for p in procs:
+            p.join()
@@ -0,0 +1,298 @@
+"""
+Migração do schema legado (SQLite de models.py/auth.py: user, commission_rule,
+goal, sale) para vendedores, regras_comissao, metas e vendas no Postgres.
+
+    flask --app app legado-migrar [--sqlite instance/comissoes.db] [--lote 5000] [--dry-run]
+
+Cada tabela é lida em blocos por id (keyset, sem carregar tudo em memória) e
+gravada com INSERTs em lote. O checkpoint de cada etapa (`legado_migracao`)
+é gravado na mesma transação do lote: interrompida, a migração continua de
+onde parou sem duplicar nada. --dry-run só lê e imprime o relatório.
+"""
+import os
+import sqlite3
+from collections import Counter
+from datetime import datetime
+
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from dinheiro import aplicar_pct, centavos, decimal_reais, pct_escala
+from extensions import db
+from modelos import Banco, LegadoMigracao, LegadoVendedor, LojaParceira, Meta, RegraComissao, Venda, Vendedor
+from util import apenas_digitos, valida_documento
+from esquema import _criar_particao_mes, _vendas_particionada
+from comissoes import _regrava_valor_comissao, _valor_comissao_gerado
+from clientes import backfill_clientes
+from metas import _registra_evento_meta
+
+bp = Blueprint('legado', __name__, cli_group=None)
+
+LEGADO_LOTE = 5000
+ROLES = {'admin': 'admin', 'administrador': 'admin'}
+STATUS = {
+    'enviada': 'enviada', 'enviado': 'enviada', 'pendente': 'enviada', 'sent': 'enviada', 'pending': 'enviada',
+    'aceita': 'aceita', 'aceito': 'aceita', 'aprovada': 'aceita', 'accepted': 'aceita', 'approved': 'aceita',
+    'recusada': 'recusada', 'recusado': 'recusada', 'rejeitada': 'recusada',
+    'rejected': 'recusada', 'refused': 'recusada',
+}
+BONUS = {'fixed': 'fixo', 'fixo': 'fixo', 'percent': 'percentual', 'percentual': 'percentual'}
+
+class _Contexto:
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.rel = {}                 # etapa -> Counter
+        self.vendedores = {}          # user.id legado -> vendedores.id (0: seria criado no dry-run)
+        self.lojas_usuario = {}       # user.id legado -> loja_parceira
+        self.bancos = {b.nome.strip().lower(): b.id for b in Banco.query.all()}
+        self.lojas = {l.nome.strip().lower(): l.id for l in LojaParceira.query.all()}
+        self.valor_comissao_gerado = _valor_comissao_gerado()
+
+    def conta(self, etapa: str, chave: str, n: int = 1):
+        self.rel.setdefault(etapa, Counter())[chave] += n
+
+def _blocos(con, tabela: str, desde: int, lote: int):
+    """SELECT * em blocos de `lote` linhas com id > desde (ordem de id)."""
+    ultimo = desde
+    while True:
+        rows = con.execute(f'SELECT * FROM "{tabela}" WHERE id > ? ORDER BY id LIMIT ?', (ultimo, lote)).fetchall()
+        if not rows:
+            return
+        yield rows
+        ultimo = rows[-1]['id']
+
+def _tem_tabela(con, nome: str) -> bool:
+    return con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (nome,)).fetchone() is not None
+
+def _checkpoint(etapa: str, ultimo_id: int, linhas: int):
+    db.session.execute(text("""
+        INSERT INTO public.legado_migracao (etapa, ultimo_id, linhas, atualizado_em)
+        VALUES (:e, :u, :n, CURRENT_TIMESTAMP)
+        ON CONFLICT (etapa) DO UPDATE
+        SET ultimo_id = EXCLUDED.ultimo_id, linhas = legado_migracao.linhas + EXCLUDED.linhas,
+            atualizado_em = CURRENT_TIMESTAMP
+    """), {'e': etapa, 'u': ultimo_id, 'n': linhas})
+
+def _data(v):
+    if v is None or isinstance(v, datetime):
+        return v
+    try:
+        return datetime.fromisoformat(str(v))
+    except ValueError:
+        return None
+
+# ---- etapas: recebem um bloco do SQLite, gravam (ou só contam) e devolvem quantas linhas gravaram ----
+def _etapa_vendedores(rows, ctx) -> int:
+    novos = {}
+    for r in rows:
+        email = (r['email'] or '').strip().lower()
+        if not email or not r['password_hash']:
+            ctx.conta('vendedores', 'ignorado_sem_email_ou_senha')
+            continue
+        role = ROLES.get((r['role'] or '').strip().lower(), 'vendedor')
+        ctx.conta('vendedores', f'role_{role}')
+        novos[email] = {
+            'legado_id': r['id'], 'nome': (r['name'] or email).strip(), 'email': email,
+            'senha_hash': r['password_hash'],  # mesmo formato do werkzeug: o login continua valendo
+            'loja_parceira': r['loja_parceira'], 'role': role,
+            'tipo': 'parceiro' if (r['loja_parceira'] or '').strip() else 'interno',
+        }
+    existentes = dict(db.session.execute(
+        text("SELECT lower(email), id FROM public.vendedores WHERE lower(email) = ANY(:e)"),
+        {'e': list(novos)}).all()) if novos else {}
+    ctx.conta('vendedores', 'ja_existia_pelo_email', len(existentes))
+    ctx.conta('vendedores', 'criado', len(novos) - len(existentes))
+    if ctx.dry_run:
+        for email, n in novos.items():
+            ctx.vendedores[n['legado_id']] = existentes.get(email, 0)
+        return len(novos)
+    criar = [{k: v for k, v in n.items() if k != 'legado_id'} for e, n in novos.items() if e not in existentes]
+    if criar:
+        t = Vendedor.__table__
+        existentes.update(db.session.execute(t.insert().returning(t.c.email, t.c.id), criar).all())
+    mapa = [{'legado_id': n['legado_id'], 'vendedor_id': existentes[e]} for e, n in novos.items()]
+    if mapa:
+        db.session.execute(pg_insert(LegadoVendedor.__table__).values(mapa).on_conflict_do_nothing())
+        ctx.vendedores.update((m['legado_id'], m['vendedor_id']) for m in mapa)
+    return len(mapa)
+
+def _etapa_regras(rows, ctx) -> int:
+    regras = []
+    for r in rows:
+        vid = None
+        if r['user_id'] is not None:
+            vid = ctx.vendedores.get(r['user_id'])
+            if vid is None:
+                ctx.conta('regras_comissao', 'ignorada_vendedor_nao_migrado')
+                continue
+        ctx.conta('regras_comissao', 'global' if vid is None else 'por_vendedor')
+        regras.append({'vendedor_id': vid, 'valor_min': r['min_value'], 'valor_max': r['max_value'],
+                       'percentual': r['percent']})
+    if regras and not ctx.dry_run:
+        db.session.execute(RegraComissao.__table__.insert(), regras)
+    return len(regras)
+
+def _etapa_metas(rows, ctx) -> int:
+    metas = []
+    for r in rows:
+        vid = ctx.vendedores.get(r['user_id'])
+        if vid is None:
+            ctx.conta('metas', 'ignorada_vendedor_nao_migrado')
+            continue
+        if not (1 <= (r['month'] or 0) <= 12):
+            ctx.conta('metas', 'ignorada_mes_invalido')
+            continue
+        tipo = BONUS.get((r['bonus_type'] or '').strip().lower())
+        if r['bonus_type'] and tipo is None:
+            ctx.conta('metas', 'bonus_tipo_desconhecido')
+        metas.append({'vendedor_id': vid, 'ano': r['year'], 'mes': r['month'],
+                      'valor_alvo': decimal_reais(centavos(r['target_value'])), 'tipo_bonus': tipo,
+                      'valor_bonus': decimal_reais(centavos(r['bonus_amount'])) if tipo else None})
+    if metas and not ctx.dry_run:
+        # a meta já cadastrada no sistema novo (mesmo vendedor/mês) prevalece
+        n = db.session.execute(pg_insert(Meta.__table__).values(metas)
+                               .on_conflict_do_nothing(constraint='uq_metas_vendedor_mes')).rowcount
+        ctx.conta('metas', 'ja_existia', len(metas) - n)
+        return n
+    return len(metas)
+
+def _etapa_vendas(rows, ctx) -> int:
+    vendas = []
+    for r in rows:
+        vid = ctx.vendedores.get(r['user_id'])
+        if vid is None:
+            ctx.conta('vendas', 'ignorada_vendedor_nao_migrado')
+            continue
+        valor_c = centavos(r['value'] or 0)
+        if valor_c <= 0:
+            ctx.conta('vendas', 'ignorada_valor_invalido')
+            continue
+        bruto = (r['status'] or '').strip().lower()
+        status = STATUS.get(bruto)
+        if status is None:
+            ctx.conta('vendas', f'status_desconhecido_{bruto or "vazio"}->enviada')
+            status = 'enviada'
+        ctx.conta('vendas', f'status_{status}')
+        doc = apenas_digitos(r['client_document'])
+        if not valida_documento(doc):
+            ctx.conta('vendas', 'documento_invalido_migrado')
+        data = _data(r['created_at'])
+        if data is None:
+            ctx.conta('vendas', 'sem_data_usou_agora')
+            data = datetime.utcnow()
+        # commission legado (R$) -> percentual aplicado; valor_comissao sai dele
+        perc = None
+        if r['commission'] is not None:
+            perc = round(float(r['commission']) / (valor_c / 100) * 100, 4)
+            if aplicar_pct(valor_c, pct_escala(perc)) != centavos(r['commission']):
+                ctx.conta('vendas', 'comissao_difere_do_percentual')
+        else:
+            ctx.conta('vendas', 'sem_comissao_usa_faixas')
+        obs = r['notes']
+        if r['awarded_bonus']:
+            ctx.conta('vendas', 'bonus_legado_em_observacoes')
+            obs = ((obs + '\n') if obs else '') + f'[legado] bônus concedido: {r["awarded_bonus"]:.2f}'
+        loja = ctx.lojas_usuario.get(r['user_id'])
+        banco = (r['bank'] or '').strip()
+        if banco.lower() not in ctx.bancos:
+            ctx.conta('vendas', 'banco_sem_cadastro')
+        venda = {
+            'vendedor_id': vid, 'cliente_nome': (r['client_name'] or '').strip(), 'cliente_documento': doc,
+            'valor': decimal_reais(valor_c), 'banco': banco, 'status': status, 'data_venda': data,
+            'loja_parceira': loja, 'observacoes': obs, 'perc_comissao_aplicado': perc,
+            'banco_id': ctx.bancos.get(banco.lower()),
+            'loja_parceira_id': ctx.lojas.get((loja or '').strip().lower()),
+        }
+        vendas.append(venda)
+    if vendas and not ctx.dry_run:
+        t = Venda.__table__
+        ids = db.session.execute(t.insert().returning(t.c.id), vendas).scalars().all()
+        if not ctx.valor_comissao_gerado:
+            _regrava_valor_comissao(ids)
+    return len(vendas)
+
+ETAPAS = (
+    ('vendedores', 'user', _etapa_vendedores),
+    ('regras_comissao', 'commission_rule', _etapa_regras),
+    ('metas', 'goal', _etapa_metas),
+    ('vendas', 'sale', _etapa_vendas),
+)
+
+def _garante_particoes(con, ctx):
+    """vendas particionada: cria as partições dos meses do legado antes de inserir."""
+    if not _tem_tabela(con, 'sale'):
+        return
+    ini, fim = (_data(v) for v in con.execute('SELECT min(created_at), max(created_at) FROM sale').fetchone())
+    if ini is None or fim is None:
+        return
+    with db.engine.begin() as conn:
+        if not _vendas_particionada(conn):
+            return
+        y, m = ini.year, ini.month
+        while (y, m) <= (fim.year, fim.month):
+            if _criar_particao_mes(conn, y, m):
+                ctx.conta('vendas', 'particao_criada')
+            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+
+def migrar_legado(caminho: str, lote: int = LEGADO_LOTE, dry_run: bool = False, log=print) -> dict:
+    """Migra o SQLite legado; devolve o relatório {etapa: {chave: n}}."""
+    if not os.path.exists(caminho):
+        raise ValueError(f'SQLite legado não encontrado: {caminho}')
+    for modelo in (LegadoMigracao, LegadoVendedor):
+        modelo.__table__.create(db.engine, checkfirst=True)
+    con = sqlite3.connect(f'file:{caminho}?mode=ro', uri=True)
+    con.row_factory = sqlite3.Row
+    ctx = _Contexto(dry_run)
+    ctx.vendedores.update(db.session.query(LegadoVendedor.legado_id, LegadoVendedor.vendedor_id).all())
+    checkpoints = {c.etapa: c.ultimo_id for c in LegadoMigracao.query.all()}
+    try:
+        if _tem_tabela(con, 'user'):
+            ctx.lojas_usuario.update(con.execute('SELECT id, loja_parceira FROM "user"').fetchall())
+        if not dry_run:
+            _garante_particoes(con, ctx)
+        for etapa, tabela, fn in ETAPAS:
+            if not _tem_tabela(con, tabela):
+                ctx.conta(etapa, f'tabela_{tabela}_ausente')
+                continue
+            desde = checkpoints.get(etapa, 0)
+            if desde:
+                ctx.conta(etapa, 'checkpoint_ultimo_id', desde)
+            for rows in _blocos(con, tabela, desde, lote):
+                ctx.conta(etapa, 'lidas', len(rows))
+                n = fn(rows, ctx)
+                if dry_run:
+                    db.session.rollback()
+                    continue
+                _checkpoint(etapa, rows[-1]['id'], n)
+                db.session.commit()
+                ctx.conta(etapa, 'gravadas', n)
+                log(f'{etapa}: até id {rows[-1]["id"]} ({ctx.rel[etapa]["gravadas"]} gravadas)')
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        con.close()
+    if not dry_run and ctx.rel.get('vendas', {}).get('gravadas'):
+        log('vinculando clientes...')
+        backfill_clientes(log=log)
+        _registra_evento_meta()  # invalida o cache de atingimento de todos os meses
+        db.session.commit()
+    return {etapa: dict(c) for etapa, c in ctx.rel.items()}
+
+@bp.cli.command('legado-migrar')
+@click.option('--sqlite', 'caminho', default=None, help='Padrão: instance/comissoes.db')
+@click.option('--lote', type=int, default=LEGADO_LOTE, show_default=True)
+@click.option('--dry-run', is_flag=True, help='Só lê e mostra o que seria migrado.')
+def cli_legado_migrar(caminho, lote, dry_run):
+    """Migra user/commission_rule/goal/sale do SQLite legado (retomável)."""
+    caminho = caminho or os.path.join(current_app.instance_path, 'comissoes.db')
+    try:
+        rel = migrar_legado(caminho, lote, dry_run, log=click.echo)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(('[dry-run] ' if dry_run else '') + f'Relatório de {caminho}:')
+    for etapa, _tabela, _fn in ETAPAS:
+        contagem = rel.get(etapa) or {}
+        click.echo(f'  {etapa}: ' + (', '.join(f'{k}={v}' for k, v in sorted(contagem.items())) or 'nada a migrar'))
@@ -0,0 +1,150 @@
+"""
+Limite de tentativas nas rotas de login sem autenticação.
+
+/auth/login, /auth/reset-password e /auth/check-email consomem uma ficha do
+balde do IP e uma do balde do e-mail antes de qualquer consulta ou hash
+pbkdf2. Balde vazio -> 429 com Retry-After. Cada balde guarda só o instante
+em que volta a ficar cheio (token bucket na forma GCRA): RAJADA tentativas
+seguidas e depois POR_MIN por minuto.
+
+LOGIN_LIMITE_MODO: `memoria` (padrão, por processo), `postgres` (tabela
+`limites_login`, compartilhada entre workers e máquinas) ou `desligado`.
+"""
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from sqlalchemy import text
+
+from extensions import db
+
+LOGIN_LIMITE_MODO = os.getenv('LOGIN_LIMITE_MODO', 'memoria')
+BALDES = {
+    # dimensão: (rajada, fichas por minuto)
+    'ip': (int(os.getenv('LOGIN_LIMITE_IP_RAJADA', '20')), float(os.getenv('LOGIN_LIMITE_IP_POR_MIN', '10'))),
+    'email': (int(os.getenv('LOGIN_LIMITE_EMAIL_RAJADA', '6')), float(os.getenv('LOGIN_LIMITE_EMAIL_POR_MIN', '3'))),
+}
+LOGIN_LIMITE_MAX_CHAVES = 100000  # modo memoria: acima disso, descarta baldes já cheios
+
+def _parametros(dimensao: str):
+    """(intervalo entre fichas, tolerância) em segundos."""
+    rajada, por_min = BALDES[dimensao]
+    intervalo = 60.0 / por_min
+    return intervalo, rajada * intervalo
+
+class _BaldesMemoria:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cheio_em = {}  # chave -> time.monotonic() em que o balde volta a ficar cheio
+        self.podado_em = 0.0
+
+    def consome(self, chave: str, dimensao: str) -> float:
+        """0 se consumiu a ficha; senão, segundos até a próxima."""
+        intervalo, tolerancia = _parametros(dimensao)
+        agora = time.monotonic()
+        with self.lock:
+            novo = max(self.cheio_em.get(chave, agora), agora) + intervalo
+            espera = novo - agora - tolerancia
+            if espera > 0:
+                return espera
+            self.cheio_em[chave] = novo
+            if len(self.cheio_em) > LOGIN_LIMITE_MAX_CHAVES and agora - self.podado_em >= 1:
+                self.cheio_em = {k: t for k, t in self.cheio_em.items() if t > agora}
+                self.podado_em = agora
+        return 0.0
+
+_SQL_CONSOME = text("""
+    INSERT INTO public.limites_login AS l (chave, liberado_em)
+    VALUES (:k, LOCALTIMESTAMP + make_interval(secs => :i))
+    ON CONFLICT (chave) DO UPDATE
+    SET liberado_em = GREATEST(l.liberado_em, LOCALTIMESTAMP) + make_interval(secs => :i)
+    WHERE GREATEST(l.liberado_em, LOCALTIMESTAMP) + make_interval(secs => :i)
+          <= LOCALTIMESTAMP + make_interval(secs => :t)
+    RETURNING 1
+""")
+_SQL_ESPERA = text("""
+    SELECT EXTRACT(EPOCH FROM liberado_em - LOCALTIMESTAMP) + :i - :t
+    FROM public.limites_login WHERE chave = :k
+""")
+
+def _consome_postgres(conn, chave: str, dimensao: str) -> float:
+    """Mesmo cálculo do modo memoria, num UPSERT atômico (a linha só muda se houver ficha)."""
+    intervalo, tolerancia = _parametros(dimensao)
+    p = {'k': chave, 'i': intervalo, 't': tolerancia}
+    if conn.execute(_SQL_CONSOME, p).first() is not None:
+        return 0.0
+    return max(float(conn.execute(_SQL_ESPERA, p).scalar() or 0), 0.001)
+
+_memoria = _BaldesMemoria()
+_metricas_lock = threading.Lock()
+_verificadas = Counter()  # rota -> tentativas checadas
+_rejeitadas = Counter()   # (rota, dimensão) -> 429
+_falhas = Counter()       # modo postgres: erros do banco (a tentativa passa)
+
+def _consome(chaves: list):
+    """chaves: [(dimensão, chave)] em ordem; para no primeiro balde vazio. -> (espera, dimensão)."""
+    if LOGIN_LIMITE_MODO != 'postgres':
+        for dimensao, chave in chaves:
+            espera = _memoria.consome(chave, dimensao)
+            if espera:
+                return espera, dimensao
+        return 0.0, None
+    with db.engine.begin() as conn:
+        if random.random() < 0.01:
+            conn.execute(text("DELETE FROM public.limites_login WHERE liberado_em < LOCALTIMESTAMP"))
+        for dimensao, chave in chaves:
+            espera = _consome_postgres(conn, chave, dimensao)
+            if espera:
+                return espera, dimensao
+    return 0.0, None
+
+def limita_tentativas(fn):
+    """429 quando o IP ou o e-mail do corpo esgotou o balde (antes de tocar no banco da aplicação)."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if LOGIN_LIMITE_MODO == 'desligado':
+            return fn(*args, **kwargs)
+        data = request.get_json(silent=True)
+        email = str((data.get('email') if isinstance(data, dict) else None) or '').strip().lower()
+        chaves = [('ip', f'ip:{request.remote_addr or "-"}')]
+        if email:
+            chaves.append(('email', f'email:{email}'))
+        rota = request.path
+        try:
+            espera, dimensao = _consome(chaves)
+        except Exception:
+            # banco fora: não bloqueia o login por causa do limite
+            current_app.logger.exception('limite de login: falha no modo postgres')
+            espera, dimensao = 0.0, None
+            with _metricas_lock:
+                _falhas[rota] += 1
+        with _metricas_lock:
+            _verificadas[rota] += 1
+            if espera:
+                _rejeitadas[(rota, dimensao)] += 1
+        if espera:
+            resp = jsonify({'msg': 'Muitas tentativas. Aguarde alguns instantes e tente novamente.'})
+            resp.headers['Retry-After'] = str(math.ceil(espera))
+            return resp, 429
+        return fn(*args, **kwargs)
+    return wrapper
+
+def metricas() -> dict:
+    """Contadores deste processo desde o início."""
+    with _metricas_lock:
+        rejeitadas = {}
+        for (rota, dimensao), n in _rejeitadas.items():
+            rejeitadas.setdefault(rota, {})[dimensao] = n
+        return {
+            'modo': LOGIN_LIMITE_MODO,
+            'baldes': {d: {'rajada': r, 'por_min': m} for d, (r, m) in BALDES.items()},
+            'verificadas': dict(_verificadas),
+            'rejeitadas': rejeitadas,
+            'rejeitadas_total': sum(_rejeitadas.values()),
+            'falhas_postgres': dict(_falhas),
+        }
@@ -0,0 +1,168 @@
+"""
+Harness de carga dos endpoints principais.
+
+Dispara /auth/login, GET /sales, GET /stats/summary e POST /sales com a
+concorrência pedida e reporta p50/p95/p99 de latência e throughput por
+endpoint. Usa só a stdlib (urllib + threads), então roda em qualquer
+máquina sem dependências extras.
+
+O backend precisa subir com LOGIN_LIMITE_MODO=desligado: todos os logins saem
+do mesmo IP e esgotam o balde de /auth/login (429, contados à parte).
+
+Uso (contra um backend populado por seed_data.py):
+    python load_test.py --base http://127.0.0.1:5000 --concorrencia 20 --duracao 60
+    python load_test.py --mix "sales=6,stats=2,create=1,login=1"
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from seed_data import SENHA_PADRAO, gerar_cpf
+
+ENDPOINTS = ('login', 'sales', 'stats', 'create')
+
+def _request(base, method, path, body=None, token=None, timeout=30.0):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method)
+    req.add_header('Content-Type', 'application/json')
+    if token:
+        req.add_header('Authorization', f'Bearer {token}')
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            payload = resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        payload = e.read()
+        status = e.code
+    except Exception:
+        payload = b''
+        status = 0
+    return status, time.perf_counter() - t0, payload
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    s = sorted(valores)
+    k = (len(s) - 1) * (p / 100.0)
+    lo = int(k)
+    hi = min(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (k - lo)
+
+class Coletor:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lat = defaultdict(list)
+        self.erros = defaultdict(int)
+        self.limitadas = defaultdict(int)  # 429 do limite de tentativas
+
+    def registra(self, nome, status, dt):
+        with self.lock:
+            if 200 <= status < 300:
+                self.lat[nome].append(dt)
+            elif status == 429:
+                self.limitadas[nome] += 1
+            else:
+                self.erros[nome] += 1
+
+def _parse_mix(s):
+    out = {}
+    for parte in (s or '').split(','):
+        if '=' not in parte:
+            continue
+        k, v = parte.split('=', 1)
+        k = k.strip()
+        if k in ENDPOINTS:
+            out[k] = max(0, int(v))
+    return out or {'sales': 6, 'stats': 2, 'create': 1, 'login': 1}
+
+def _login(base, email, senha):
+    st, _, payload = _request(base, 'POST', '/auth/login', {'email': email, 'password': senha})
+    if st == 429:
+        raise SystemExit(f'Login de {email} barrado pelo limite de tentativas (HTTP 429); '
+                         'suba o backend com LOGIN_LIMITE_MODO=desligado')
+    if st != 200:
+        raise SystemExit(f'Falha no login de {email}: HTTP {st} {payload[:200]!r}')
+    return json.loads(payload)['access_token']
+
+def worker(args, tokens, bancos, mix, coletor, fim, rnd):
+    nomes = list(mix.keys())
+    pesos = [mix[n] for n in nomes]
+    while time.perf_counter() < fim:
+        nome = rnd.choices(nomes, weights=pesos, k=1)[0]
+        email, token = rnd.choice(tokens)
+        if nome == 'login':
+            st, dt, _ = _request(args.base, 'POST', '/auth/login', {'email': email, 'password': args.senha})
+        elif nome == 'sales':
+            path = '/sales'
+            if rnd.random() < 0.3 and bancos:
+                path += f'?banco_id={rnd.choice(bancos)}'
+            st, dt, _ = _request(args.base, 'GET', path, token=token)
+        elif nome == 'stats':
+            st, dt, _ = _request(args.base, 'GET', '/stats/summary', token=token)
+        else:
+            body = {
+                'cliente_nome': 'Cliente Carga',
+                'cliente_documento': gerar_cpf(rnd),
+                'valor': round(rnd.lognormvariate(10.4, 0.8), 2),
+                'status': 'enviada',
+                'banco_id': (rnd.choice(bancos) if bancos else None),
+                'perc_comissao_aplicado': rnd.choice([1.0, 1.5, 2.0]),
+            }
+            st, dt, _ = _request(args.base, 'POST', '/sales', body, token=token)
+        coletor.registra(nome, st, dt)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Teste de carga dos endpoints do backend.')
+    p.add_argument('--base', default='http://127.0.0.1:5000')
+    p.add_argument('--concorrencia', type=int, default=10)
+    p.add_argument('--duracao', type=float, default=30.0, help='segundos')
+    p.add_argument('--usuarios', type=int, default=20, help='quantos vendedor<N>@carga.local logar')
+    p.add_argument('--admin', action='store_true', help='inclui o admin@carga.local entre os usuários')
+    p.add_argument('--senha', default=SENHA_PADRAO)
+    p.add_argument('--mix', default='', help='pesos, ex.: "sales=6,stats=2,create=1,login=1"')
+    p.add_argument('--seed', type=int, default=7)
+    args = p.parse_args(argv)
+    args.base = args.base.rstrip('/')
+
+    emails = [f'vendedor{i + 1}@carga.local' for i in range(args.usuarios)]
+    if args.admin:
+        emails.append('admin@carga.local')
+    tokens = [(e, _login(args.base, e, args.senha)) for e in emails]
+
+    st, _, payload = _request(args.base, 'GET', '/banks', token=tokens[0][1])
+    bancos = [b['id'] for b in json.loads(payload) if b.get('ativo')] if st == 200 else []
+
+    mix = _parse_mix(args.mix)
+    coletor = Coletor()
+    inicio = time.perf_counter()
+    fim = inicio + args.duracao
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as ex:
+        for i in range(args.concorrencia):
+            ex.submit(worker, args, tokens, bancos, mix, coletor, fim, random.Random(args.seed + i))
+    total_s = time.perf_counter() - inicio
+
+    print(f'concorrência={args.concorrencia} duração={total_s:.1f}s mix={mix}')
+    print(f"{'endpoint':<10}{'ok':>8}{'erros':>8}{'429':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    tot_ok = 0
+    for nome in ENDPOINTS:
+        lat = coletor.lat.get(nome, [])
+        err = coletor.erros.get(nome, 0)
+        lim = coletor.limitadas.get(nome, 0)
+        if not lat and not err and not lim:
+            continue
+        tot_ok += len(lat)
+        print(f'{nome:<10}{len(lat):>8}{err:>8}{lim:>8}{len(lat) / total_s:>9.1f}'
+              f'{percentil(lat, 50) * 1000:>9.1f}{percentil(lat, 95) * 1000:>9.1f}{percentil(lat, 99) * 1000:>9.1f}')
+    print(f'throughput total: {tot_ok / total_s:.1f} req/s')
+    if sum(coletor.limitadas.values()):
+        print('atenção: houve 429 do limite de login; rode o backend com LOGIN_LIMITE_MODO=desligado')
+
+if __name__ == '__main__':
+    main()
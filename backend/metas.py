@@ -0,0 +1,258 @@
+"""
+Metas mensais, atingimento e bônus.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import func, text
+
+from dinheiro import aplicar_pct, centavos, pct_escala, reais
+from extensions import db, read_only
+from modelos import Meta, MetaEvento, Venda, Vendedor
+from util import _add_months, parse_month, _to_int_or_none
+from autenticacao import admin_required
+from idempotencia import idempotente
+
+bp = Blueprint('metas', __name__, cli_group=None)
+
+# ===================== METAS / BÔNUS =====================
+# Atingimento de todos os vendedores num mês sai de UMA consulta agregada sobre
+# vendas aceitas. Alterações de vendas/metas gravam eventos e, na próxima
+# leitura, só os vendedores afetados são recalculados. A versão do cache não é
+# o maior id (ids saem na ordem do INSERT, não do COMMIT, e um evento que
+# commita atrasado seria pulado): é o xmin do snapshot, abaixo do qual toda
+# transação já terminou. A cada leitura relemos os eventos com xid >= xmin
+# anterior, ignorando os já aplicados (`vistos`).
+METAS_CACHE_MESES = 24
+_metas_cache_lock = threading.Lock()
+_metas_cache = OrderedDict()  # (ano, mes) -> (xmin, vistos, {vendedor_id: linha})
+
+def _registra_evento_meta_venda(sale_ids):
+    """Grava (na transação corrente) um evento por venda alterada, no mês da venda."""
+    ids = [sale_ids] if isinstance(sale_ids, int) else list(sale_ids)
+    if not ids:
+        return
+    db.session.execute(text("""
+        INSERT INTO public.metas_eventos (ano, mes, vendedor_id)
+        SELECT DISTINCT EXTRACT(YEAR FROM data_venda)::int, EXTRACT(MONTH FROM data_venda)::int, vendedor_id
+        FROM public.vendas WHERE id = ANY(:ids)
+    """), {'ids': ids})
+
+def _registra_evento_meta(ano: int = 0, mes: int = 0, vendedor_id: int = None):
+    db.session.add(MetaEvento(ano=ano, mes=mes, vendedor_id=vendedor_id))
+
+def _calc_bonus(total_c: int, alvo, tipo, valor_bonus) -> float:
+    if alvo is None or total_c < centavos(alvo) or valor_bonus is None:
+        return 0.0
+    if tipo == 'fixo':
+        return reais(centavos(valor_bonus))
+    if tipo == 'percentual':
+        return reais(aplicar_pct(total_c, pct_escala(valor_bonus)))
+    return 0.0
+
+def _metas_agregar(ano: int, mes: int, vendedor_ids=None) -> dict:
+    """Atingimento/bônus por vendedor no mês (uma consulta). Se vendedor_ids vier,
+    restringe a esses vendedores (recálculo incremental)."""
+    ny, nm = _add_months(ano, mes, 1)
+    ini, fim = datetime(ano, mes, 1), datetime(ny, nm, 1)
+    vendas_mes = (
+        db.session.query(
+            Venda.vendedor_id.label('vendedor_id'),
+            func.count().label('qtd'),
+            func.coalesce(func.sum(Venda.valor_centavos), 0).label('total'),
+        )
+        .filter(Venda.status == 'aceita', Venda.data_venda >= ini, Venda.data_venda < fim)
+    )
+    if vendedor_ids is not None:
+        vendas_mes = vendas_mes.filter(Venda.vendedor_id.in_(vendedor_ids))
+    vendas_mes = vendas_mes.group_by(Venda.vendedor_id).subquery()
+
+    q = (
+        db.session.query(
+            Vendedor.id, Vendedor.nome, Vendedor.role,
+            Meta.id, Meta.valor_alvo, Meta.tipo_bonus, Meta.valor_bonus,
+            vendas_mes.c.qtd, vendas_mes.c.total,
+        )
+        .outerjoin(Meta, (Meta.vendedor_id == Vendedor.id) & (Meta.ano == ano) & (Meta.mes == mes))
+        .outerjoin(vendas_mes, vendas_mes.c.vendedor_id == Vendedor.id)
+        .filter((Vendedor.role == 'vendedor') | Meta.id.isnot(None) | vendas_mes.c.vendedor_id.isnot(None))
+    )
+    if vendedor_ids is not None:
+        q = q.filter(Vendedor.id.in_(vendedor_ids))
+
+    out = {}
+    for vid, nome, _role, meta_id, alvo, tipo, vbonus, qtd, total in q.all():
+        total_c = int(total or 0)
+        alvo_c = centavos(alvo)
+        out[vid] = {
+            'vendedor_id': vid,
+            'vendedor_nome': nome,
+            'meta_id': meta_id,
+            'valor_alvo': reais(alvo_c),
+            'tipo_bonus': tipo,
+            'valor_bonus': (float(vbonus) if vbonus is not None else None),
+            'vendas_aceitas': int(qtd or 0),
+            'total_aceito': reais(total_c),
+            'atingimento_percent': (round(total_c / alvo_c * 100.0, 2) if alvo_c else None),
+            'atingiu': bool(alvo_c is not None and total_c >= alvo_c),
+            'bonus': _calc_bonus(total_c, alvo, tipo, vbonus),
+        }
+    return out
+
+def metas_atingimento(ano: int, mes: int) -> dict:
+    """Retorna {vendedor_id: linha} do mês, usando/atualizando o cache."""
+    key = (ano, mes)
+    with _metas_cache_lock:
+        cached = _metas_cache.get(key)
+        if cached:
+            _metas_cache.move_to_end(key)
+    # xmin antes dos eventos, eventos antes das vendas: toda transação < xmin
+    # está visível nas duas leituras, e `vistos` só tem eventos já refletidos
+    xmin = db.session.execute(text("SELECT (pg_snapshot_xmin(pg_current_snapshot())::text)::bigint")).scalar()
+    q = db.session.query(MetaEvento.id, MetaEvento.ano, MetaEvento.vendedor_id, MetaEvento.xid).filter(
+        ((MetaEvento.ano == ano) & (MetaEvento.mes == mes)) | ((MetaEvento.ano == 0) & (MetaEvento.mes == 0))
+    )
+    if cached:
+        xmin_cache, vistos_cache, linhas_cache = cached
+        recentes = q.filter(MetaEvento.xid >= xmin_cache).all()
+        vistos = frozenset(e[0] for e in recentes if e[3] >= xmin)
+        eventos = [e for e in recentes if e[0] not in vistos_cache]
+        if not eventos:
+            linhas = linhas_cache
+        elif any(e[1] == 0 or e[2] is None for e in eventos):
+            linhas = _metas_agregar(ano, mes)
+        else:
+            afetados = sorted({e[2] for e in eventos})
+            linhas = dict(linhas_cache)
+            for vid in afetados:
+                linhas.pop(vid, None)
+            linhas.update(_metas_agregar(ano, mes, afetados))
+    else:
+        vistos = frozenset(e[0] for e in q.filter(MetaEvento.xid >= xmin).all())
+        linhas = _metas_agregar(ano, mes)
+
+    with _metas_cache_lock:
+        atual = _metas_cache.get(key)
+        if not atual or atual[0] <= xmin:
+            _metas_cache[key] = (xmin, vistos, linhas)
+            _metas_cache.move_to_end(key)
+        while len(_metas_cache) > METAS_CACHE_MESES:
+            _metas_cache.popitem(last=False)
+    return linhas
+
+def _meta_to_dict(m: Meta) -> dict:
+    return {
+        'id': m.id, 'vendedor_id': m.vendedor_id, 'month': f'{m.ano:04d}-{m.mes:02d}',
+        'valor_alvo': float(m.valor_alvo) if m.valor_alvo is not None else None,
+        'tipo_bonus': m.tipo_bonus,
+        'valor_bonus': float(m.valor_bonus) if m.valor_bonus is not None else None,
+    }
+
+def _aplica_campos_meta(m: Meta, data: dict):
+    """Valida e aplica campos editáveis; retorna mensagem de erro ou None."""
+    if 'valor_alvo' in data:
+        try:
+            alvo = float(data.get('valor_alvo'))
+            if alvo <= 0:
+                raise ValueError()
+            m.valor_alvo = alvo
+        except Exception:
+            return 'Valor alvo inválido'
+    if 'tipo_bonus' in data:
+        tipo = (data.get('tipo_bonus') or '').strip() or None
+        if tipo not in (None, 'fixo', 'percentual'):
+            return 'Tipo de bônus inválido'
+        m.tipo_bonus = tipo
+    if 'valor_bonus' in data:
+        raw = data.get('valor_bonus')
+        if raw in (None, '', 'null'):
+            m.valor_bonus = None
+        else:
+            try:
+                vb = float(raw)
+                if vb < 0 or (m.tipo_bonus == 'percentual' and vb > 100):
+                    raise ValueError()
+                m.valor_bonus = vb
+            except Exception:
+                return 'Valor de bônus inválido'
+    return None
+
+@bp.get('/goals')
+@jwt_required()
+@admin_required
+@read_only
+def list_goals():
+    ym = parse_month(request.args.get('month'))
+    q = Meta.query
+    if ym:
+        q = q.filter(Meta.ano == ym[0], Meta.mes == ym[1])
+    rows = q.order_by(Meta.ano.desc(), Meta.mes.desc(), Meta.vendedor_id.asc()).all()
+    return jsonify([_meta_to_dict(m) for m in rows])
+
+@bp.post('/goals')
+@jwt_required()
+@admin_required
+@idempotente
+def create_goal():
+    data = request.get_json(silent=True) or {}
+    vid = _to_int_or_none(data.get('vendedor_id'))
+    ym = parse_month(data.get('month'))
+    if not vid or not ym or not (1 <= ym[1] <= 12):
+        return jsonify({'msg': 'Vendedor e mês (YYYY-MM) são obrigatórios'}), 400
+    if not db.session.get(Vendedor, vid):
+        return jsonify({'msg': 'Vendedor não encontrado'}), 404
+    if 'valor_alvo' not in data:
+        return jsonify({'msg': 'Valor alvo é obrigatório'}), 400
+    if Meta.query.filter_by(vendedor_id=vid, ano=ym[0], mes=ym[1]).first():
+        return jsonify({'msg': 'Já existe meta para este vendedor no mês'}), 409
+
+    m = Meta(vendedor_id=vid, ano=ym[0], mes=ym[1])
+    erro = _aplica_campos_meta(m, data)
+    if erro:
+        return jsonify({'msg': erro}), 400
+    db.session.add(m)
+    _registra_evento_meta(ym[0], ym[1], vid)
+    db.session.commit()
+    return jsonify({'id': m.id}), 201
+
+@bp.put('/goals/<int:goal_id>')
+@jwt_required()
+@admin_required
+def update_goal(goal_id):
+    m = Meta.query.get_or_404(goal_id)
+    data = request.get_json(silent=True) or {}
+    erro = _aplica_campos_meta(m, data)
+    if erro:
+        return jsonify({'msg': erro}), 400
+    _registra_evento_meta(m.ano, m.mes, m.vendedor_id)
+    db.session.commit()
+    return jsonify({'ok': True})
+
+@bp.get('/goals/attainment')
+@jwt_required()
+@read_only
+def goals_attainment():
+    claims = get_jwt(); role = claims.get('role')
+    uid = int(get_jwt_identity())
+    today = date.today()
+    ano, mes = parse_month(request.args.get('month')) or (today.year, today.month)
+    if not (1 <= mes <= 12):
+        return jsonify({'msg': 'Mês inválido'}), 400
+
+    linhas = metas_atingimento(ano, mes)
+    if role == 'admin':
+        items = sorted(linhas.values(), key=lambda r: (r['vendedor_nome'] or '').lower())
+    else:
+        items = [linhas[uid]] if uid in linhas else []
+    return jsonify({
+        'month': f'{ano:04d}-{mes:02d}',
+        'items': items,
+        'totals': {
+            'bonus': reais(sum(centavos(r['bonus']) for r in items)),
+            'atingiram': sum(1 for r in items if r['atingiu']),
+            'com_meta': sum(1 for r in items if r['meta_id'] is not None),
+        },
+    })
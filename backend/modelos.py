@@ -0,0 +1,307 @@
+"""
+Modelos SQLAlchemy (tabelas do schema public).
+"""
+from sqlalchemy import Computed, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from extensions import db
+
+# ===================== MODELOS =====================
+class Vendedor(db.Model):
+    __tablename__ = 'vendedores'
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(255), nullable=False)
+    email = db.Column(db.String(255), unique=True, nullable=False)
+    senha_hash = db.Column(db.String(255), nullable=False)
+    loja_parceira = db.Column(db.String(255))
+    role = db.Column(db.String(20), nullable=False, default='vendedor')  # vendedor | admin
+    tipo = db.Column(db.String(20), nullable=True)  # interno | parceiro
+    inicio_vigencia = db.Column(db.Date, nullable=True)
+    fim_vigencia = db.Column(db.Date, nullable=True)
+    token_geracao = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+class RegraComissao(db.Model):
+    __tablename__ = 'regras_comissao'
+    id = db.Column(db.Integer, primary_key=True)
+    vendedor_id = db.Column(db.Integer, db.ForeignKey('vendedores.id'), nullable=True)  # nulo = global
+    valor_min = db.Column(db.Float, nullable=False)
+    valor_max = db.Column(db.Float, nullable=True)
+    percentual = db.Column(db.Float, nullable=False)
+
+class Cliente(db.Model):
+    """Dimensão de clientes, chaveada pelo documento normalizado (só dígitos)."""
+    __tablename__ = 'clientes'
+    __table_args__ = (
+        db.Index('ix_clientes_nome_prefixo', db.text('lower(nome) text_pattern_ops')),
+        db.Index('ix_clientes_documento_prefixo', db.text('documento text_pattern_ops')),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    documento = db.Column(db.String(14), unique=True, nullable=False)
+    nome = db.Column(db.String(255), nullable=False)
+    criado_em = db.Column(db.DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+    atualizado_em = db.Column(db.DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+
+class RegraComissaoVendedor(db.Model):
+    """Repasse ao vendedor. Prioridade: regra do vendedor > regra do tipo
+    (interno/parceiro) > regra global. Faixas por valor da venda e vigência opcionais."""
+    __tablename__ = 'regras_comissao_vendedor'
+    id = db.Column(db.Integer, primary_key=True)
+    vendedor_id = db.Column(db.Integer, db.ForeignKey('vendedores.id'), nullable=True)
+    tipo = db.Column(db.String(20), nullable=True)  # interno | parceiro | nulo
+    valor_min = db.Column(db.Float, nullable=False, default=0.0)
+    valor_max = db.Column(db.Float, nullable=True)
+    percentual = db.Column(db.Float, nullable=False)
+    base = db.Column(db.String(20), nullable=False, default='comissao')  # comissao | valor
+    inicio_vigencia = db.Column(db.Date, nullable=True)
+    fim_vigencia = db.Column(db.Date, nullable=True)
+
+class Venda(db.Model):
+    __tablename__ = 'vendas'
+    id = db.Column(db.Integer, primary_key=True)
+    vendedor_id = db.Column(db.Integer, db.ForeignKey('vendedores.id'), nullable=False)
+    cliente_nome = db.Column(db.String(255), nullable=False)
+    cliente_documento = db.Column(db.String(30), nullable=False)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id'), nullable=True)
+    valor = db.Column(db.Numeric(14, 2), nullable=False)
+    # mesma quantia em centavos inteiros (somas/contas sem Decimal nem float)
+    valor_centavos = db.Column(db.BigInteger, Computed("(valor * 100)::bigint", persisted=True))
+    banco = db.Column(db.String(150), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='enviada')
+    data_venda = db.Column(db.DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+    loja_parceira = db.Column(db.String(255))
+    observacoes = db.Column(db.Text)
+    # referências opcionais
+    banco_id = db.Column(db.Integer, nullable=True)
+    loja_parceira_id = db.Column(db.Integer, nullable=True)
+
+    # NOVOS (percentual escolhido e valor da comissão)
+    perc_comissao_aplicado = db.Column(db.Float, nullable=True)  # em %
+
+    # Coluna computada no PG moderno; no fallback vira coluna simples e cuidamos manualmente
+    valor_comissao = db.Column(
+        db.Numeric(12, 2),
+        Computed("ROUND(COALESCE(valor,0) * COALESCE(perc_comissao_aplicado,0)::numeric / 100.0, 2)", persisted=True),
+        nullable=True
+    )
+
+class Banco(db.Model):
+    __tablename__ = 'bancos'
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(150), nullable=False)
+    codigo = db.Column(db.String(20))
+    ativo = db.Column(db.Boolean, nullable=False, default=True)
+    comissoes = db.Column(JSONB, nullable=True)  # JSONB no Postgres
+
+class BancoComissaoVersao(db.Model):
+    """Tabela de comissões de um banco vigente a partir de `vigencia_inicio`
+    (até o início da versão seguinte). Linhas nunca são alteradas; no mesmo
+    dia, a de maior id prevalece."""
+    __tablename__ = 'bancos_comissoes_versoes'
+    __table_args__ = (db.Index('ix_bancos_comissoes_versoes_banco', 'banco_id', 'vigencia_inicio', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    banco_id = db.Column(db.Integer, db.ForeignKey('bancos.id'), nullable=False)
+    vigencia_inicio = db.Column(db.Date, nullable=False)
+    comissoes = db.Column(JSONB, nullable=False)
+    criado_em = db.Column(db.DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+    criado_por = db.Column(db.Integer, nullable=True)
+
+class LojaParceira(db.Model):
+    __tablename__ = 'lojas_parceiras'
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(150), nullable=False)
+    cnpj = db.Column(db.String(20))
+    cidade = db.Column(db.String(120))
+    ativo = db.Column(db.Boolean, nullable=False, default=True)
+    # novos
+    repasse = db.Column(db.Numeric(10, 2))
+    data_inicio = db.Column(db.Date, nullable=True)
+    data_fim = db.Column(db.Date, nullable=True)
+
+class Meta(db.Model):
+    __tablename__ = 'metas'
+    __table_args__ = (db.UniqueConstraint('vendedor_id', 'ano', 'mes', name='uq_metas_vendedor_mes'),)
+    id = db.Column(db.Integer, primary_key=True)
+    vendedor_id = db.Column(db.Integer, db.ForeignKey('vendedores.id'), nullable=False)
+    ano = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    valor_alvo = db.Column(db.Numeric(14, 2), nullable=False)
+    tipo_bonus = db.Column(db.String(20), nullable=True)  # fixo | percentual
+    valor_bonus = db.Column(db.Numeric(14, 2), nullable=True)
+
+class MetaEvento(db.Model):
+    """Log de alterações que invalidam o cache de metas. `xid` é a transação que
+    gravou o evento (a versão do cache); ano=0/mes=0 significa alteração global
+    (ex.: vendedor criado/alterado)."""
+    __tablename__ = 'metas_eventos'
+    __table_args__ = (db.Index('ix_metas_eventos_mes', 'ano', 'mes', 'id'),
+                      db.Index('ix_metas_eventos_mes_xid', 'ano', 'mes', 'xid'))
+    id = db.Column(db.BigInteger, primary_key=True)
+    ano = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    vendedor_id = db.Column(db.Integer, nullable=True)
+    criado_em = db.Column(db.DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+    xid = db.Column(db.BigInteger, nullable=False, server_default=text('(pg_current_xact_id()::text)::bigint'))
+
+class FechamentoMes(db.Model):
+    __tablename__ = 'fechamentos'
+    __table_args__ = (db.UniqueConstraint('ano', 'mes', name='uq_fechamentos_mes'),)
+    id = db.Column(db.Integer, primary_key=True)
+    ano = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    fechado_em = db.Column(db.DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+    fechado_por = db.Column(db.Integer, db.ForeignKey('vendedores.id'), nullable=True)
+    qtd_vendas = db.Column(db.Integer, nullable=False, default=0)
+
+class VendaFechada(db.Model):
+    """Snapshot imutável do financeiro de cada venda de um mês fechado
+    (UPDATE/DELETE bloqueados por trigger)."""
+    __tablename__ = 'vendas_fechadas'
+    __table_args__ = (
+        db.Index('ix_vendas_fechadas_mes_vendedor', 'ano', 'mes', 'vendedor_id'),
+        db.Index('ix_vendas_fechadas_mes_loja', 'ano', 'mes', 'loja_parceira_id'),
+    )
+    venda_id = db.Column(db.Integer, primary_key=True)
+    ano = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    vendedor_id = db.Column(db.Integer, nullable=False)
+    loja_parceira_id = db.Column(db.Integer, nullable=True)
+    banco_id = db.Column(db.Integer, nullable=True)
+    data_venda = db.Column(db.DateTime, nullable=False)
+    cliente_nome = db.Column(db.String(255), nullable=False)
+    cliente_documento = db.Column(db.String(30), nullable=False)
+    banco = db.Column(db.String(150))
+    loja_parceira = db.Column(db.String(255))
+    status = db.Column(db.String(20), nullable=False)
+    valor = db.Column(db.Numeric(14, 2), nullable=False)
+    perc_comissao_aplicado = db.Column(db.Numeric(7, 4), nullable=True)
+    comissao_real = db.Column(db.Numeric(14, 2), nullable=False)
+    loja_repasse_percent = db.Column(db.Numeric(7, 4), nullable=False)
+    loja_repasse_valor = db.Column(db.Numeric(14, 2), nullable=False)
+    comissao_vendedor = db.Column(db.Numeric(14, 2), nullable=True)
+    empresa_bruta = db.Column(db.Numeric(14, 2), nullable=False)
+    empresa_liquida = db.Column(db.Numeric(14, 2), nullable=True)
+
+    def to_financeiro(self) -> dict:
+        return {
+            'comissao_real': float(self.comissao_real),
+            'loja_repasse_percent': float(self.loja_repasse_percent),
+            'loja_repasse_valor': float(self.loja_repasse_valor),
+            'comissao_vendedor': (float(self.comissao_vendedor) if self.comissao_vendedor is not None else None),
+            'empresa_bruta': float(self.empresa_bruta),
+            'empresa_liquida': (float(self.empresa_liquida) if self.empresa_liquida is not None else None),
+        }
+
+class LojaRepasseVersao(db.Model):
+    """Configuração de repasse de uma loja vigente para vendas a partir de
+    `vigencia_inicio` (até a versão seguinte). Mesmo dia: maior id prevalece."""
+    __tablename__ = 'lojas_repasse_versoes'
+    __table_args__ = (db.Index('ix_lojas_repasse_versoes_loja', 'loja_parceira_id', 'vigencia_inicio', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    loja_parceira_id = db.Column(db.Integer, db.ForeignKey('lojas_parceiras.id'), nullable=False)
+    vigencia_inicio = db.Column(db.Date, nullable=False)
+    repasse = db.Column(db.Numeric(10, 2))
+    ativo = db.Column(db.Boolean, nullable=False, default=True)
+    data_inicio = db.Column(db.Date, nullable=True)
+    data_fim = db.Column(db.Date, nullable=True)
+    criado_em = db.Column(db.DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+    criado_por = db.Column(db.Integer, nullable=True)
+
+class ChaveIdempotencia(db.Model):
+    """Resposta gravada por (usuário, Idempotency-Key) até `expira_em`.
+    status_code nulo = requisição original ainda em andamento."""
+    __tablename__ = 'idempotencia'
+    usuario_id = db.Column(db.Integer, primary_key=True)
+    chave = db.Column(db.String(255), primary_key=True)
+    rota = db.Column(db.String(120), nullable=False)
+    corpo_hash = db.Column(db.LargeBinary(32), nullable=False)
+    status_code = db.Column(db.SmallInteger, nullable=True)
+    resposta = db.Column(JSONB, nullable=True)
+    expira_em = db.Column(db.DateTime, nullable=False, index=True)
+
+class VendaAudit(db.Model):
+    """Histórico de alterações de vendas, um registro por campo alterado
+    (somente-inserção; UPDATE/DELETE bloqueados por trigger)."""
+    __tablename__ = 'vendas_audit'
+    __table_args__ = (db.Index('ix_vendas_audit_venda', 'venda_id', 'alterado_em', 'id'),)
+    id = db.Column(db.BigInteger, primary_key=True)
+    venda_id = db.Column(db.Integer, nullable=False)
+    campo = db.Column(db.String(40), nullable=False)
+    valor_antigo = db.Column(db.Text, nullable=True)
+    valor_novo = db.Column(db.Text, nullable=True)
+    alterado_por = db.Column(db.Integer, nullable=True)
+    alterado_em = db.Column(db.DateTime, nullable=False)  # UTC, momento do commit da alteração
+    origem = db.Column(db.String(20), nullable=True)       # 'edicao' | 'lote'
+
+class TokenRevogado(db.Model):
+    """Revogações de JWT. Com `jti`: só aquele token (logout). Sem `jti`: evento
+    do usuário (geração de tokens trocada, vigência/role alteradas) que obriga
+    os processos a recarregar o cache. Linhas somem após `expira_em` (UTC),
+    quando nenhum token afetado ainda seria aceito."""
+    __tablename__ = 'tokens_revogados'
+    id = db.Column(db.BigInteger, primary_key=True)
+    jti = db.Column(db.String(64), nullable=True, unique=True)
+    vendedor_id = db.Column(db.Integer, nullable=True)
+    expira_em = db.Column(db.DateTime, nullable=False, index=True)
+    criado_em = db.Column(db.DateTime, nullable=False, server_default=text("timezone('utc', now())"))
+
+class Job(db.Model):
+    """Job em segundo plano, consumido por `flask jobs-worker`.
+    status: pendente -> executando -> concluido | falhou | cancelado."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_fila', 'executar_em', 'id', postgresql_where=text("status = 'pendente'")),
+    )
+    id = db.Column(db.BigInteger, primary_key=True)
+    tipo = db.Column(db.String(40), nullable=False)
+    params = db.Column(JSONB, nullable=False, default=dict)
+    status = db.Column(db.String(12), nullable=False, default='pendente', index=True)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    max_tentativas = db.Column(db.Integer, nullable=False, default=3)
+    executar_em = db.Column(db.DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+    cancelar = db.Column(db.Boolean, nullable=False, default=False)
+    progresso = db.Column(db.SmallInteger, nullable=True)  # 0..100
+    mensagem = db.Column(db.Text, nullable=True)
+    resultado = db.Column(JSONB, nullable=True)
+    erro = db.Column(db.Text, nullable=True)
+    criado_por = db.Column(db.Integer, nullable=True)
+    criado_em = db.Column(db.DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+    iniciado_em = db.Column(db.DateTime, nullable=True)
+    heartbeat_em = db.Column(db.DateTime, nullable=True)
+    finalizado_em = db.Column(db.DateTime, nullable=True)
+
+class ArquivoVendas(db.Model):
+    """Manifesto do arquivo morto: cada linha é um arquivo comprimido (Parquet ou
+    NDJSON.gz, em ARQUIVO_VENDAS_PASTA) com vendas de um mês removidas de `vendas`."""
+    __tablename__ = 'vendas_arquivos'
+    __table_args__ = (db.Index('ix_vendas_arquivos_mes', 'ano', 'mes'),)
+    id = db.Column(db.Integer, primary_key=True)
+    ano = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    arquivo = db.Column(db.String(255), nullable=False, unique=True)  # relativo à pasta
+    formato = db.Column(db.String(10), nullable=False)  # parquet | ndjson
+    linhas = db.Column(db.Integer, nullable=False)
+    venda_id_min = db.Column(db.Integer, nullable=False)
+    venda_id_max = db.Column(db.Integer, nullable=False)
+    criado_em = db.Column(db.DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+
+class LegadoMigracao(db.Model):
+    """Checkpoint da migração do SQLite legado: último id legado gravado por
+    etapa (atualizado na mesma transação do lote)."""
+    __tablename__ = 'legado_migracao'
+    etapa = db.Column(db.String(30), primary_key=True)  # vendedores | regras_comissao | metas | vendas
+    ultimo_id = db.Column(db.Integer, nullable=False, default=0)
+    linhas = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+
+class LegadoVendedor(db.Model):
+    """user.id do SQLite legado -> vendedores.id (criado ou já existente pelo e-mail)."""
+    __tablename__ = 'legado_vendedores'
+    legado_id = db.Column(db.Integer, primary_key=True)
+    vendedor_id = db.Column(db.Integer, db.ForeignKey('vendedores.id'), nullable=False)
+
+class LimiteLogin(db.Model):
+    """Baldes do limite de tentativas de login no modo postgres (compartilhado
+    entre os workers): `liberado_em` é o instante em que o balde volta a ficar cheio."""
+    __tablename__ = 'limites_login'
+    chave = db.Column(db.String(320), primary_key=True)  # ip:<endereço> | email:<e-mail>
+    liberado_em = db.Column(db.DateTime, nullable=False)
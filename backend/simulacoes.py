@@ -0,0 +1,262 @@
+"""
+Simulação de mudanças de regras de comissão sobre as vendas de um período.
+
+POST /simulations recalcula comissão real, repasse e empresa bruta de cada
+venda com as regras atuais e com as propostas (repasse de lojas, tabela de
+percentuais de bancos, faixas de `regras_comissao`), sem gravar nada, e
+devolve as diferenças por mês, banco, loja e vendedor. As vendas vêm numa
+consulta só e as contas são vetorizadas com NumPy, com o mesmo arredondamento
+de dinheiro.py (o numpy só é importado na primeira simulação, para não pesar
+no boot da aplicação). Meses fechados também são recalculados: a comparação é entre
+regras, não contra o snapshot.
+"""
+import os
+from datetime import date, datetime
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+from sqlalchemy import Date, cast
+
+from dinheiro import ESCALA_PCT, centavos, pct_escala, reais
+from extensions import db, read_only
+from modelos import Banco, LojaParceira, RegraComissao, Venda
+from util import _add_months, normalize_commissions, parse_month, _parse_pct, _to_int_or_none
+from comissoes import _indice_comissoes_banco, _indice_repasse_lojas, _vendedores_info
+from autenticacao import admin_required
+
+bp = Blueprint('simulacoes', __name__, cli_group=None)
+
+SIMULACAO_MAX_MESES = int(os.getenv('SIMULACAO_MAX_MESES', '24'))
+_DIVISOR = 100 * ESCALA_PCT
+CAMPOS = ('comissao_real', 'repasse', 'empresa_bruta')
+
+# ---- aritmética vetorizada (mesmos resultados de dinheiro.py) ----
+def _aplicar_pct(valor_c, pct):
+    """aplicar_pct() por linha: int64, meio para longe do zero."""
+    import numpy as np
+    n = valor_c * pct
+    return np.sign(n) * ((np.abs(n) + _DIVISOR // 2) // _DIVISOR)
+
+def _pct_escala(perc):
+    """pct_escala() por linha (NaN -> 0); só os valores distintos passam pelo Decimal."""
+    import numpy as np
+    distintos, inv = np.unique(perc, return_inverse=True)
+    esc = np.array([0 if np.isnan(p) else pct_escala(float(p)) for p in distintos], dtype=np.int64)
+    return esc[inv.reshape(-1)]
+
+def _comissao_percentual(valor_c, perc):
+    """_calc_commission_value(): percentual fora de 0..100 não gera comissão."""
+    esc = _pct_escala(perc)
+    esc[(esc < 0) | (esc > pct_escala(100))] = 0
+    return _aplicar_pct(valor_c, esc)
+
+def _comissao_faixas(valor_c, vendedor, regras):
+    """calcular_comissao() por linha. regras: [(vendedor_id | None, min_c, max_c | None, pct)]
+    em ordem de valor_min; como no laço original, vale a última faixa que casa."""
+    import numpy as np
+    esc = np.zeros(len(valor_c), dtype=np.int64)
+    for vid, vmin, vmax, pct in regras:
+        casa = valor_c >= vmin
+        if vmax is not None:
+            casa &= valor_c <= vmax
+        if vid is not None:
+            casa &= vendedor == vid
+        esc[casa] = pct
+    return _aplicar_pct(valor_c, esc)
+
+def _repasse_pct(loja, dias, propostas):
+    """% de repasse (ESCALA_PCT) vigente na data de cada venda (histórico das lojas).
+    `propostas` {loja_id: %} troca o percentual, mantendo ativo e data_inicio/data_fim."""
+    import numpy as np
+    idx = _indice_repasse_lojas()
+    out = np.zeros(len(loja), dtype=np.int64)
+    for lid in np.unique(loja[loja > 0]).tolist():
+        inicios = idx.inicios.get(lid)
+        if not inicios:
+            continue
+        linhas = np.flatnonzero(loja == lid)
+        d = dias[linhas]
+        versao = np.searchsorted(np.array(inicios, dtype='datetime64[D]'), d, side='right') - 1
+        for k, ver in enumerate(idx.versoes[lid]):
+            vale = versao == k
+            if not ver.ativo or not vale.any():
+                continue
+            if ver.data_inicio:
+                vale &= d >= np.datetime64(ver.data_inicio, 'D')
+            if ver.data_fim:
+                vale &= d <= np.datetime64(ver.data_fim, 'D')
+            out[linhas[vale]] = pct_escala(float(propostas.get(lid, ver.repasse) or 0))
+    return out
+
+def _financeiro(valor_c, vendedor, perc, rep_pct, regras):
+    """(comissao_real, repasse, empresa_bruta) em centavos, por venda."""
+    import numpy as np
+    sem_perc = np.isnan(perc)
+    comissao = _comissao_percentual(valor_c, perc)
+    if sem_perc.any():
+        comissao[sem_perc] = _comissao_faixas(valor_c[sem_perc], vendedor[sem_perc], regras)
+    repasse = _aplicar_pct(comissao, rep_pct)
+    return comissao, repasse, comissao - repasse
+
+# ---- entrada ----
+def _regras_atuais() -> list:
+    rows = RegraComissao.query.order_by(RegraComissao.valor_min.asc(), RegraComissao.id.asc()).all()
+    return [(r.vendedor_id, centavos(r.valor_min), centavos(r.valor_max), pct_escala(r.percentual)) for r in rows]
+
+def _le_propostas(data: dict, regras: list):
+    """Valida o corpo; devolve (lojas, bancos, regras simuladas). ValueError com a mensagem para o 400."""
+    lojas = {}
+    for item in data.get('lojas') or []:
+        lid, rep = _to_int_or_none(item.get('id')), _parse_pct(item.get('repasse'))
+        if lid is None or rep is None:
+            raise ValueError('lojas: informe id e repasse (0 a 100)')
+        lojas[lid] = rep
+    if lojas:
+        existentes = {r[0] for r in db.session.query(LojaParceira.id).filter(LojaParceira.id.in_(lojas))}
+        if set(lojas) - existentes:
+            raise ValueError(f'Loja não encontrada: {min(set(lojas) - existentes)}')
+
+    # bancos: {"id": 3, "comissoes": {"1.5": 1.2}} (de -> para) ou uma lista com
+    # o mesmo tamanho da tabela vigente hoje (troca posição a posição)
+    bancos = {}
+    indice = _indice_comissoes_banco()
+    for item in data.get('bancos') or []:
+        bid, coms = _to_int_or_none(item.get('id')), item.get('comissoes')
+        if bid is None or not isinstance(coms, (dict, list)):
+            raise ValueError('bancos: informe id e comissoes')
+        if isinstance(coms, dict):
+            pares = [(_parse_pct(de), _parse_pct(para)) for de, para in coms.items()]
+        else:
+            atual = indice.tabela(bid, date.today()) or ()
+            nova = normalize_commissions(coms)
+            if len(nova) != len(atual):
+                raise ValueError(f'Banco {bid}: a tabela vigente tem {len(atual)} percentuais; '
+                                 'envie a mesma quantidade ou um mapa {de: para}')
+            pares = list(zip(atual, nova))
+        if any(de is None or para is None for de, para in pares):
+            raise ValueError(f'Banco {bid}: percentuais devem estar entre 0 e 100')
+        bancos[bid] = pares
+
+    # regras_comissao: [{"vendedor_id": null, "faixas": [...]}] substitui as faixas daquele escopo
+    trocados, novas = set(), []
+    for item in data.get('regras_comissao') or []:
+        vid = _to_int_or_none(item.get('vendedor_id'))
+        trocados.add(vid)
+        for f in item.get('faixas') or []:
+            vmin, vmax, pct = f.get('valor_min'), f.get('valor_max'), _parse_pct(f.get('percentual'))
+            try:
+                vmin_c = centavos(float(vmin or 0))
+                vmax_c = centavos(float(vmax)) if vmax not in (None, '') else None
+            except (TypeError, ValueError):
+                raise ValueError('regras_comissao: valor_min/valor_max inválidos')
+            if pct is None or vmin_c < 0 or (vmax_c is not None and vmax_c < vmin_c):
+                raise ValueError('regras_comissao: faixa inválida')
+            novas.append((vid, vmin_c, vmax_c, pct_escala(pct)))
+    if trocados:
+        regras = sorted([r for r in regras if r[0] not in trocados] + novas, key=lambda r: r[1])
+    return lojas, bancos, regras
+
+def _carrega(ini: datetime, fim: datetime, status):
+    """Vendas do período numa consulta, como colunas NumPy."""
+    import numpy as np
+    q = (db.session.query(Venda.vendedor_id, Venda.banco_id, Venda.loja_parceira_id,
+                          cast(Venda.data_venda, Date), Venda.valor_centavos, Venda.perc_comissao_aplicado)
+         .filter(Venda.data_venda >= ini, Venda.data_venda < fim))
+    if status:
+        q = q.filter(Venda.status == status)
+    rows = q.all()
+    n = len(rows)
+    vendedor, banco, loja, dias, valor, perc = zip(*rows) if rows else ((),) * 6
+    return {
+        'vendedor': np.fromiter(vendedor, np.int64, n),
+        'banco': np.fromiter((-1 if b is None else b for b in banco), np.int64, n),
+        'loja': np.fromiter((-1 if l is None else l for l in loja), np.int64, n),
+        'dias': np.array(dias, dtype='datetime64[D]'),
+        'valor': np.fromiter(valor, np.int64, n),
+        'perc': np.fromiter((np.nan if p is None else p for p in perc), np.float64, n),
+    }
+
+# ---- saída ----
+def _totais(atual, simulado) -> dict:
+    return {
+        'atual': {c: reais(int(a)) for c, a in zip(CAMPOS, atual)},
+        'simulado': {c: reais(int(s)) for c, s in zip(CAMPOS, simulado)},
+        'delta': {c: reais(int(s) - int(a)) for c, a, s in zip(CAMPOS, atual, simulado)},
+    }
+
+def _agrupa(chave, atual, simulado):
+    """[(chave, qtd, totais)] somando por chave com bincount (centavos < 2**53: exato)."""
+    import numpy as np
+    chaves, inv = np.unique(chave, return_inverse=True)
+    inv = inv.reshape(-1)
+    qtd = np.bincount(inv, minlength=len(chaves))
+    somas = [np.rint(np.bincount(inv, weights=v, minlength=len(chaves))).astype(np.int64)
+             for v in atual + simulado]
+    return [(chaves[i].item(), int(qtd[i]), _totais([s[i] for s in somas[:3]], [s[i] for s in somas[3:]]))
+            for i in range(len(chaves))]
+
+def _por_delta(grupos: list) -> list:
+    return sorted(grupos, key=lambda g: -abs(g['delta']['empresa_bruta']))
+
+# ===================== SIMULAÇÃO =====================
+@bp.post('/simulations')
+@jwt_required()
+@admin_required
+@read_only
+def simulate():
+    try:
+        import numpy as np
+    except ImportError:  # pip install numpy
+        return jsonify({'msg': 'Simulação indisponível: numpy não instalado'}), 503
+    data = request.get_json(silent=True) or {}
+    ini_ym, fim_ym = parse_month(data.get('start')), parse_month(data.get('end'))
+    if not ini_ym or not fim_ym or not (1 <= ini_ym[1] <= 12) or not (1 <= fim_ym[1] <= 12):
+        return jsonify({'msg': 'start e end (YYYY-MM) são obrigatórios'}), 400
+    meses = (fim_ym[0] * 12 + fim_ym[1]) - (ini_ym[0] * 12 + ini_ym[1]) + 1
+    if not (1 <= meses <= SIMULACAO_MAX_MESES):
+        return jsonify({'msg': f'Período deve ter de 1 a {SIMULACAO_MAX_MESES} meses'}), 400
+    try:
+        regras = _regras_atuais()
+        lojas, bancos, regras_sim = _le_propostas(data, regras)
+    except ValueError as e:
+        return jsonify({'msg': str(e)}), 400
+    status = (data.get('status') or '').strip() or None
+
+    ini = datetime(ini_ym[0], ini_ym[1], 1)
+    fim = datetime(*_add_months(fim_ym[0], fim_ym[1], 1), 1)
+    v = _carrega(ini, fim, status)
+
+    perc_sim = v['perc'].copy()
+    for bid, pares in bancos.items():
+        do_banco = v['banco'] == bid
+        for de, para in pares:
+            # mesma tolerância da checagem de percentual permitido
+            perc_sim[do_banco & (np.abs(v['perc'] - de) <= 1e-4)] = para
+    rep_atual = _repasse_pct(v['loja'], v['dias'], {})
+    rep_sim = _repasse_pct(v['loja'], v['dias'], lojas) if lojas else rep_atual
+    atual = list(_financeiro(v['valor'], v['vendedor'], v['perc'], rep_atual, regras))
+    simulado = list(_financeiro(v['valor'], v['vendedor'], perc_sim, rep_sim, regras_sim))
+
+    mes = v['dias'].astype('datetime64[M]').astype(np.int64)  # meses desde 1970-01
+    por_mes = [{'month': f'{1970 + m // 12:04d}-{m % 12 + 1:02d}', 'vendas': n, **t}
+               for m, n, t in _agrupa(mes, atual, simulado)]
+    g_banco, g_loja = _agrupa(v['banco'], atual, simulado), _agrupa(v['loja'], atual, simulado)
+    g_vendedor = _agrupa(v['vendedor'], atual, simulado)
+    nomes_banco = dict(db.session.query(Banco.id, Banco.nome).filter(Banco.id.in_([k for k, _, _ in g_banco])))
+    nomes_loja = dict(db.session.query(LojaParceira.id, LojaParceira.nome)
+                      .filter(LojaParceira.id.in_([k for k, _, _ in g_loja])))
+    vendedores = _vendedores_info({k for k, _, _ in g_vendedor})
+
+    return jsonify({
+        'range': {'start': ini.date().isoformat(), 'end_exclusive': fim.date().isoformat()},
+        'status': status,
+        'vendas': int(len(v['valor'])),
+        'totais': _totais([int(a.sum()) for a in atual], [int(s.sum()) for s in simulado]),
+        'by_month': por_mes,
+        'by_bank': _por_delta([{'banco_id': None if k < 0 else k, 'banco': nomes_banco.get(k), 'vendas': n, **t}
+                               for k, n, t in g_banco]),
+        'by_store': _por_delta([{'loja_id': None if k < 0 else k, 'loja': nomes_loja.get(k), 'vendas': n, **t}
+                                for k, n, t in g_loja]),
+        'by_seller': _por_delta([{'vendedor_id': k, 'vendedor_nome': vendedores.get(k, (None, None))[0],
+                                  'vendas': n, **t} for k, n, t in g_vendedor]),
+    })
@@ -0,0 +1,25 @@
+from colunar import colunar, linhas
+
+VENDAS = [
+    {'id': 7, 'banco': 'Itaú', 'status': 'aceita', 'valor': 1500.0, 'vendedor_nome': None},
+    {'id': 6, 'banco': 'Itaú', 'status': 'enviada', 'valor': 820.5, 'vendedor_nome': 'Ana'},
+    {'id': 5, 'banco': None, 'status': 'aceita', 'valor': 0.01, 'vendedor_nome': 'Ana'},
+]
+
+def test_colunar_codifica_em_dicionario_na_ordem_da_primeira_ocorrencia():
+    p = colunar(VENDAS)
+    assert p['formato'] == 'colunar' and p['linhas'] == 3
+    assert p['colunas']['id'] == [7, 6, 5]
+    assert p['colunas']['banco'] == [0, 0, None]
+    assert p['dicionarios']['banco'] == ['Itaú']
+    assert p['colunas']['status'] == [0, 1, 0]
+    assert p['dicionarios']['status'] == ['aceita', 'enviada']
+    assert p['colunas']['vendedor_nome'] == [None, 0, 0]
+
+def test_ida_e_volta():
+    assert linhas(colunar(VENDAS)) == VENDAS
+
+def test_lista_vazia():
+    p = colunar([])
+    assert p['linhas'] == 0 and p['colunas'] == {}
+    assert linhas(p) == []
@@ -0,0 +1,48 @@
+import random
+from decimal import Decimal, ROUND_HALF_UP
+
+from dinheiro import ESCALA_PCT, aplicar_pct, centavos, decimal_reais, dividir, pct_escala, reais
+
+def test_centavos_arredonda_meio_para_longe_do_zero():
+    assert centavos('1.005') == 101
+    assert centavos(0.005) == 1
+    assert centavos(-0.005) == -1
+    assert centavos(0.1) + centavos(0.2) == centavos(0.3)
+    assert centavos(Decimal('12.344')) == 1234
+    assert centavos(7) == 700
+    assert centavos(None) is None
+
+def test_pct_escala():
+    assert pct_escala(1.5) == 15000
+    assert pct_escala('0.00005') == 1
+    assert pct_escala(100) == 100 * ESCALA_PCT
+    assert pct_escala(None) is None
+
+def test_dividir_meio_para_longe_do_zero():
+    assert dividir(5, 2) == 3
+    assert dividir(-5, 2) == -3
+    assert dividir(5, -2) == -3
+    assert dividir(4, 3) == 1
+    assert dividir(-4, 3) == -1
+
+def test_aplicar_pct():
+    assert aplicar_pct(10000, pct_escala(1.5)) == 150
+    assert aplicar_pct(333, pct_escala(1.5)) == 5     # 4,995 centavos
+    assert aplicar_pct(-333, pct_escala(1.5)) == -5
+    assert aplicar_pct(0, pct_escala(1.5)) == 0
+    assert aplicar_pct(10000, 0) == 0
+
+def test_aplicar_pct_igual_ao_round_do_numeric():
+    rnd = random.Random(3)
+    for _ in range(5000):
+        v = rnd.randint(-10**9, 10**9)
+        p = rnd.randint(0, 100 * ESCALA_PCT)
+        esperado = (Decimal(v) * p / (100 * ESCALA_PCT)).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+        assert aplicar_pct(v, p) == int(esperado)
+
+def test_reais_e_decimal_reais():
+    assert reais(12345) == 123.45
+    assert reais(None) is None
+    assert decimal_reais(12345) == Decimal('123.45')
+    assert decimal_reais(-5) == Decimal('-0.05')
+    assert decimal_reais(None) is None
@@ -0,0 +1,76 @@
+from collections import Counter
+
+import pytest
+from flask import Flask
+
+import limites
+
+class _Relogio:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+@pytest.fixture
+def relogio(monkeypatch):
+    r = _Relogio()
+    monkeypatch.setattr(limites.time, 'monotonic', r)
+    monkeypatch.setattr(limites, '_memoria', limites._BaldesMemoria())
+    monkeypatch.setattr(limites, 'LOGIN_LIMITE_MODO', 'memoria')
+    monkeypatch.setitem(limites.BALDES, 'ip', (3, 6.0))     # rajada 3, uma ficha a cada 10 s
+    monkeypatch.setitem(limites.BALDES, 'email', (2, 2.0))  # rajada 2, uma ficha a cada 30 s
+    for contador in ('_verificadas', '_rejeitadas', '_falhas'):
+        monkeypatch.setattr(limites, contador, Counter())
+    return r
+
+def test_balde_libera_rajada_e_depois_uma_ficha_por_intervalo(relogio):
+    b = limites._memoria
+    assert [b.consome('ip:a', 'ip') for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert b.consome('ip:a', 'ip') == pytest.approx(10.0)
+    relogio.t += 4
+    assert b.consome('ip:a', 'ip') == pytest.approx(6.0)
+    relogio.t += 6
+    assert b.consome('ip:a', 'ip') == 0.0
+    assert b.consome('ip:a', 'ip') == pytest.approx(10.0)
+
+def test_balde_cheio_nao_acumula_alem_da_rajada(relogio):
+    b = limites._memoria
+    relogio.t += 3600
+    assert [b.consome('ip:a', 'ip') for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert b.consome('ip:a', 'ip') > 0
+
+def test_chaves_independentes(relogio):
+    b = limites._memoria
+    for _ in range(3):
+        b.consome('ip:a', 'ip')
+    assert b.consome('ip:a', 'ip') > 0
+    assert b.consome('ip:b', 'ip') == 0.0
+
+def _app():
+    a = Flask(__name__)
+
+    @a.post('/login')
+    @limites.limita_tentativas
+    def login():
+        return {'ok': True}
+    return a
+
+def test_decorador_responde_429_com_retry_after(relogio):
+    c = _app().test_client()
+    corpo = {'email': 'Fulano@Exemplo.com '}
+    assert [c.post('/login', json=corpo).status_code for _ in range(2)] == [200, 200]
+    r = c.post('/login', json={'email': 'fulano@exemplo.com'})  # mesmo balde: normalizado
+    assert r.status_code == 429
+    assert r.headers['Retry-After'] == '30'
+    # a 3ª tentativa já gastou a última ficha do IP: outro e-mail também para
+    r = c.post('/login', json={'email': 'outro@exemplo.com'})
+    assert r.status_code == 429
+    assert r.headers['Retry-After'] == '10'
+    m = limites.metricas()
+    assert m['rejeitadas']['/login'] == {'email': 1, 'ip': 1}
+
+def test_decorador_desligado(relogio, monkeypatch):
+    monkeypatch.setattr(limites, 'LOGIN_LIMITE_MODO', 'desligado')
+    c = _app().test_client()
+    assert {c.post('/login', json={'email': 'a@b.c'}).status_code for _ in range(10)} == {200}
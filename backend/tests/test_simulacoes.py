@@ -0,0 +1,51 @@
+"""As contas vetorizadas da simulação batem, centavo a centavo, com as por linha."""
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import simulacoes  # noqa: E402
+from comissoes import _calc_commission_value, comissoes_faixa_lote  # noqa: E402
+from dinheiro import aplicar_pct, pct_escala  # noqa: E402
+from extensions import db  # noqa: E402
+from modelos import RegraComissao  # noqa: E402
+
+REGRAS = [
+    (None, 0, 10000, 1.0), (None, 10000.01, 50000, 1.5), (None, 50000.01, None, 2.0),
+    (7, 0, None, 3.0), (8, 20000, 30000, 2.25), (8, 25000, None, 0.5),
+]
+
+def _valores(rnd, n):
+    return [rnd.choice([0, 1, 99, 1000000, 1000001, 2000000, 2500000, 3000000, 5000001])
+            if rnd.random() < 0.2 else rnd.randint(-50000, 10**8) for _ in range(n)]
+
+def test_aplicar_pct_vetorizado():
+    rnd = random.Random(1)
+    valores = _valores(rnd, 5000)
+    pcts = [rnd.randint(0, 100 * 10000) for _ in valores]
+    esperado = [aplicar_pct(v, p) for v, p in zip(valores, pcts)]
+    obtido = simulacoes._aplicar_pct(np.array(valores, dtype=np.int64), np.array(pcts, dtype=np.int64))
+    assert obtido.tolist() == esperado
+
+def test_comissao_percentual_igual_a_calc_commission_value():
+    rnd = random.Random(2)
+    valores = _valores(rnd, 3000)
+    percs = [rnd.choice([-1, 0, 0.5, 1.2345, 1.5, 2, 99.99995, 100, 100.5]) for _ in valores]
+    esperado = [_calc_commission_value(v, p) for v, p in zip(valores, percs)]
+    obtido = simulacoes._comissao_percentual(np.array(valores, dtype=np.int64), np.array(percs, dtype=np.float64))
+    assert obtido.tolist() == esperado
+
+def test_comissao_faixas_igual_a_calcular_comissao(app_sqlite):
+    RegraComissao.__table__.create(db.engine)
+    for vid, vmin, vmax, pct in REGRAS:
+        db.session.add(RegraComissao(vendedor_id=vid, valor_min=vmin, valor_max=vmax, percentual=pct))
+    db.session.commit()
+
+    rnd = random.Random(3)
+    valores = [v for v in _valores(rnd, 3000) if v >= 0]
+    vendedores = [rnd.choice([1, 7, 8, 9]) for _ in valores]
+    esperado = comissoes_faixa_lote(list(zip(vendedores, valores)))
+    obtido = simulacoes._comissao_faixas(np.array(valores, dtype=np.int64), np.array(vendedores, dtype=np.int64),
+                                         simulacoes._regras_atuais())
+    assert obtido.tolist() == esperado
@@ -0,0 +1,42 @@
+"""Boot preguiçoso: `import app` + create_app() não conectam no banco nem pesam."""
+import json
+import os
+import subprocess
+import sys
+
+from conftest import PASTA_BACKEND
+
+STARTUP_LIMITE_MS = float(os.getenv('STARTUP_LIMITE_MS', '3000'))
+
+_SONDA = r'''
+import json, sys, time
+from sqlalchemy.engine.default import DefaultDialect
+
+conexoes = []
+def _conecta(self, *a, **k):
+    conexoes.append(self.name)
+    raise RuntimeError('conexão com o banco durante o boot')
+DefaultDialect.connect = _conecta
+
+t0 = time.perf_counter()
+import app as modulo
+a = modulo.create_app({'AUTO_BOOTSTRAP': False})
+r = a.test_client().get('/ping')
+print(json.dumps({'ms': (time.perf_counter() - t0) * 1000, 'status': r.status_code,
+                  'conexoes': conexoes, 'numpy': 'numpy' in sys.modules}))
+'''
+
+def _boot() -> dict:
+    env = {k: v for k, v in os.environ.items() if k not in ('DATABASE_URL', 'DATABASE_URL_READ')}
+    env['AUTO_BOOTSTRAP'] = '0'
+    p = subprocess.run([sys.executable, '-c', _SONDA], cwd=PASTA_BACKEND, env=env,
+                       capture_output=True, text=True, timeout=120)
+    assert p.returncode == 0, p.stderr[-2000:]
+    return json.loads(p.stdout.strip().splitlines()[-1])
+
+def test_boot_sem_database_url_nao_conecta_e_cabe_no_limite():
+    r = _boot()
+    assert r['status'] == 200
+    assert r['conexoes'] == []
+    assert r['numpy'] is False  # simulacoes importa o numpy só na primeira simulação
+    assert r['ms'] < STARTUP_LIMITE_MS, f"boot levou {r['ms']:.0f} ms (limite {STARTUP_LIMITE_MS:.0f})"
@@ -0,0 +1,122 @@
+"""
+Helpers puros: CPF/CNPJ, parse de datas/percentuais e normalização de comissões.
+"""
+from datetime import datetime
+
+def _add_months(y: int, m: int, delta: int):
+    idx = y * 12 + (m - 1) + delta
+    return idx // 12, idx % 12 + 1
+
+# ============== UTIL CPF/CNPJ ==============
+def apenas_digitos(s: str) -> str:
+    return ''.join(ch for ch in (s or '') if ch.isdigit())
+
+def valida_cpf(cpf: str) -> bool:
+    cpf = apenas_digitos(cpf)
+    if len(cpf) != 11 or cpf == cpf[0]*11:
+        return False
+    soma = sum(int(cpf[i])*(10-i) for i in range(9))
+    d1 = (soma*10) % 11
+    d1 = 0 if d1 == 10 else d1
+    soma = sum(int(cpf[i])*(11-i) for i in range(10))
+    d2 = (soma*10) % 11
+    d2 = 0 if d2 == 10 else d2
+    return cpf[-2:] == f"{d1}{d2}"
+
+def valida_cnpj(cnpj: str) -> bool:
+    cnpj = apenas_digitos(cnpj)
+    if len(cnpj) != 14 or cnpj == cnpj[0]*14:
+        return False
+    pesos1 = [5,4,3,2,9,8,7,6,5,4,3,2]
+    pesos2 = [6] + pesos1
+    soma = sum(int(cnpj[i])*pesos1[i] for i in range(12))
+    d1 = 11 - (soma % 11); d1 = 0 if d1 >= 10 else d1
+    soma = sum(int(cnpj[i])*pesos2[i] for i in range(13))
+    d2 = 11 - (soma % 11); d2 = 0 if d2 >= 10 else d2
+    return cnpj[-2:] == f"{d1}{d2}"
+
+def valida_documento(doc: str) -> bool:
+    d = apenas_digitos(doc or '')
+    if len(d) == 11: return valida_cpf(d)
+    if len(d) == 14: return valida_cnpj(d)
+    return False
+
+# ======= Normalização de comissões (backend) =======
+def _parse_pct(token):
+    try:
+        s = str(token).strip().replace(' ', '').replace(',', '.')
+        if not s:
+            return None
+        n = float(s)
+        if n < 0 or n > 100:
+            return None
+        return round(n, 4)
+    except Exception:
+        return None
+
+def normalize_commissions(data):
+    source = None
+    if isinstance(data, dict):
+        source = data.get('comissoes') or data.get('faixas') or data.get('commission_values')
+    elif isinstance(data, (list, str)):
+        source = data
+    else:
+        source = None
+
+    vals = []
+    if isinstance(source, list):
+        vals = [_parse_pct(v) for v in source]
+    elif isinstance(source, str):
+        try:
+            import json
+            parsed = json.loads(source)
+            if isinstance(parsed, list):
+                vals = [_parse_pct(v) for v in parsed]
+            else:
+                raise ValueError()
+        except Exception:
+            import re
+            tokens = [t for t in re.split(r'[;\n,]+', source) if t.strip()]
+            vals = [_parse_pct(t) for t in tokens]
+    vals = [v for v in vals if v is not None]
+    vals = sorted(set(vals))
+    return vals
+
+def parse_date(s):
+    if not s: return None
+    try:
+        return datetime.strptime(s, '%Y-%m-%d').date()
+    except Exception:
+        return None
+
+def parse_month(s: str):
+    if not s: return None
+    try:
+        y, m = s.split('-'); y = int(y); m = int(m)
+        return y, m
+    except Exception:
+        return None
+
+def parse_percent_to_float_or_none(v):
+    if v is None:
+        return None
+    s = str(v).strip()
+    if s == '':
+        return None
+    s = s.replace('.', '').replace(',', '.')
+    try:
+        n = float(s)
+        if n < 0 or n > 100:
+            return None
+        return round(n, 4)
+    except Exception:
+        return None
+
+# ======= HELPERS NOVOS (repasse loja e parse int) =======
+def _to_int_or_none(v):
+    try:
+        if v is None or v == '' or str(v).strip().lower() == 'null':
+            return None
+        return int(str(v))
+    except Exception:
+        return None
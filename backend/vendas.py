@@ -0,0 +1,520 @@
+"""
+Endpoints de vendas: listagem, criação, alteração (unitária e em lote) e
+histórico.
+"""
+import os
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import func, text
+
+from arquivo import horizonte_arquivo, vendas_arquivadas
+from colunar import colunar
+from dinheiro import centavos, decimal_reais
+from extensions import db, read_only
+from modelos import Banco, Cliente, FechamentoMes, LojaParceira, Venda, VendaAudit, Vendedor
+from util import apenas_digitos, parse_date, _to_int_or_none, valida_documento
+from comissoes import (
+    _calc_commission_value, calcular_comissao, calcular_financeiro_lote, comissoes_vendedor_lote,
+    financeiro_centavos, _regrava_valor_comissao, repasse_percent_lote, validar_percentuais_lote,
+    _valor_c, _venda_to_dict, _vendedores_info,
+)
+from idempotencia import idempotente
+from clientes import upsert_cliente
+from auditoria import AUDIT_CAMPOS, audit_diffs, _auditoria
+from eventos import _notifica_vendas
+from metas import _registra_evento_meta_venda
+from fechamento import mes_fechado, trava_mes_aberto
+
+bp = Blueprint('vendas', __name__, cli_group=None)
+
+# ===================== VENDAS =====================
+VENDAS_LISTA_LIMITE = 1000
+
+def _filtro_arquivo(cliente, doc, status, banco_id, loja_id, vendedor_id, dt_ini, dt_fim):
+    """Os mesmos filtros de list_sales, aplicados às linhas (dicts) do arquivo morto."""
+    cliente, doc = (cliente or '').lower(), (doc or '').lower()
+    ini = dt_ini.isoformat() if dt_ini else None
+    fim = (dt_fim + timedelta(days=1)).isoformat() if dt_fim else None  # ISO compara como string
+
+    def filtro(l):
+        return ((not cliente or cliente in (l.get('cliente_nome') or '').lower())
+                and (not doc or doc in (l.get('cliente_documento') or '').lower())
+                and (not status or l.get('status') == status)
+                and (not banco_id or l.get('banco_id') == banco_id)
+                and (not loja_id or l.get('loja_parceira_id') == loja_id)
+                and (not vendedor_id or l.get('vendedor_id') == vendedor_id)
+                and (not ini or (l.get('data_venda') or '') >= ini)
+                and (not fim or (l.get('data_venda') or '') < fim))
+    return filtro
+
+def _lista_vendas(linhas: list):
+    """?format=columnar: uma lista por coluna em vez de um objeto por venda."""
+    return colunar(linhas) if request.args.get('format') == 'columnar' else linhas
+
+@bp.get('/sales')
+@jwt_required()
+@read_only
+def list_sales():
+    claims = get_jwt(); role = claims.get('role')
+    uid = int(get_jwt_identity())
+
+    q = db.session.query(Venda)
+
+    cliente = request.args.get('cliente_nome')
+    doc = request.args.get('cliente_documento')
+    status = request.args.get('status')
+
+    if cliente:
+        q = q.filter(Venda.cliente_nome.ilike(f'%{cliente}%'))
+    if doc:
+        q = q.filter(Venda.cliente_documento.ilike(f'%{doc}%'))
+    if status:
+        q = q.filter(Venda.status == status)
+
+    # intervalo opcional (YYYY-MM-DD, fim inclusivo) sobre data_venda cru -> poda de partições
+    dt_ini = parse_date(request.args.get('data_inicio'))
+    dt_fim = parse_date(request.args.get('data_fim'))
+    if dt_ini:
+        q = q.filter(Venda.data_venda >= datetime.combine(dt_ini, datetime.min.time()))
+    if dt_fim:
+        q = q.filter(Venda.data_venda < datetime.combine(dt_fim + timedelta(days=1), datetime.min.time()))
+
+    banco_id = request.args.get('banco_id', type=int)
+    loja_id = request.args.get('loja_id', type=int)
+    vendedor_id = request.args.get('vendedor_id', type=int) if role == 'admin' else None
+
+    if banco_id:
+        q = q.filter(Venda.banco_id == banco_id)
+    if loja_id:
+        q = q.filter(Venda.loja_parceira_id == loja_id)
+    if role != 'admin':
+        q = q.filter(Venda.vendedor_id == uid)
+    elif vendedor_id:
+        q = q.filter(Venda.vendedor_id == vendedor_id)
+
+    vendas = q.order_by(Venda.data_venda.desc()).limit(VENDAS_LISTA_LIMITE).all()
+
+    # map vendedores (nome para admin, tipo para a comissão do vendedor)
+    vendedores = _vendedores_info({v.vendedor_id for v in vendas})
+    financeiro = calcular_financeiro_lote(vendas, vendedores)
+
+    nomes = ({k: n for k, (n, _t) in vendedores.items()} if role == 'admin' else {})
+    out = [_venda_to_dict(v, fin, nomes.get(v.vendedor_id)) for v, fin in zip(vendas, financeiro)]
+
+    # intervalo que alcança o arquivo morto: completa com as vendas arquivadas
+    if (dt_ini or dt_fim) and len(out) < VENDAS_LISTA_LIMITE:
+        horizonte = horizonte_arquivo()
+        if horizonte and (dt_ini is None or dt_ini < horizonte):
+            filtro = _filtro_arquivo(cliente, doc, status, banco_id, loja_id,
+                                     uid if role != 'admin' else vendedor_id, dt_ini, dt_fim)
+            arquivadas = vendas_arquivadas(dt_ini, dt_fim, filtro, VENDAS_LISTA_LIMITE - len(out))
+            if role != 'admin':
+                for l in arquivadas:
+                    l['vendedor_nome'] = None
+            out.extend(arquivadas)
+            out.sort(key=lambda l: l.get('data_venda') or '', reverse=True)
+    return jsonify(_lista_vendas(out))
+
+@bp.post('/sales')
+@jwt_required()
+@idempotente
+def create_sale():
+    uid = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+    try:
+        cliente_nome = (data.get('cliente_nome') or '').strip()
+        cliente_documento = apenas_digitos(data.get('cliente_documento') or '')
+        valor_c = centavos(data.get('valor'))
+        status = (data.get('status') or 'enviada').strip()
+        observacoes = (data.get('observacoes') or '').strip() or None
+
+        banco_id = _to_int_or_none(data.get('banco_id'))
+        loja_id = _to_int_or_none(data.get('loja_parceira_id'))
+
+        perc_com_aplicado = data.get('perc_comissao_aplicado', None)
+        if perc_com_aplicado is not None and perc_com_aplicado != '':
+            perc_com_aplicado = float(perc_com_aplicado)
+            if perc_com_aplicado < 0 or perc_com_aplicado > 100:
+                return jsonify({'msg': 'Percentual de comissão inválido'}), 400
+        else:
+            perc_com_aplicado = None
+    except Exception:
+        return jsonify({'msg': 'Dados inválidos'}), 400
+
+    if not cliente_nome or not cliente_documento or not valor_c:
+        return jsonify({'msg': 'Cliente, documento e valor são obrigatórios'}), 400
+    if not valida_documento(cliente_documento):
+        return jsonify({'msg': 'CPF/CNPJ inválido'}), 400
+    if status not in ('enviada','aceita','recusada'):
+        return jsonify({'msg': 'Status inválido'}), 400
+
+    # resolve nomes por id (se fornecidos)
+    banco_nome = None
+    loja_nome = None
+    if banco_id:
+        b = db.session.get(Banco, banco_id)
+        if not b: return jsonify({'msg': 'Banco não encontrado'}), 404
+        banco_nome = b.nome
+    if loja_id:
+        l = db.session.get(LojaParceira, loja_id)
+        if not l: return jsonify({'msg': 'Loja parceira não encontrada'}), 404
+        loja_nome = l.nome
+    # percentual precisa constar na tabela do banco vigente hoje
+    if banco_id and not validar_percentuais_lote([(banco_id, date.today(), perc_com_aplicado)])[0]:
+        return jsonify({'msg': 'Percentual de comissão não permitido para este banco'}), 400
+
+    # quase-duplicata: mesmo cliente, banco e valor no mesmo dia (índice ix_vendas_quase_duplicada).
+    # Vendedor só é comparado com as próprias vendas (o 409 não revela venda de outro);
+    # a faixa em data_venda deixa o Postgres ler só a partição de hoje.
+    if not data.get('confirmar_duplicada'):
+        dup = (db.session.query(Venda.id)
+               .filter(Venda.cliente_documento == cliente_documento,
+                       (Venda.banco_id == banco_id) if banco_id else Venda.banco_id.is_(None),
+                       Venda.valor == decimal_reais(valor_c),
+                       Venda.data_venda >= func.current_date(),
+                       Venda.data_venda < func.current_date() + 1,
+                       func.cast(Venda.data_venda, db.Date) == func.current_date()))
+        if get_jwt().get('role') != 'admin':
+            dup = dup.filter(Venda.vendedor_id == uid)
+        dup = dup.first()
+        if dup:
+            return jsonify({
+                'msg': 'Já existe proposta igual hoje (cliente, banco e valor). '
+                       'Envie confirmar_duplicada=true para registrar mesmo assim.',
+                'duplicada_de': dup[0],
+            }), 409
+
+    v = Venda(
+        vendedor_id=uid,
+        cliente_nome=cliente_nome,
+        cliente_documento=cliente_documento,
+        cliente_id=upsert_cliente(cliente_documento, cliente_nome),
+        valor=decimal_reais(valor_c),
+        status=status,
+        observacoes=observacoes,
+        # data_venda -> deixamos para CURRENT_TIMESTAMP do banco
+        banco=banco_nome or (data.get('banco') or '').strip() or '—',
+        loja_parceira=loja_nome or (data.get('loja_parceira') or '').strip() or None,
+        banco_id=banco_id,
+        loja_parceira_id=loja_id,
+        perc_comissao_aplicado=perc_com_aplicado
+    )
+    db.session.add(v)
+    db.session.flush()  # pega id do insert
+    sale_id = v.id  # salva antes de qualquer possível expiração
+
+    # comissão real (centavos)
+    comissao_c = (
+        _calc_commission_value(valor_c, v.perc_comissao_aplicado)
+        if v.perc_comissao_aplicado is not None
+        else calcular_comissao(uid, valor_c)
+    )
+
+    # Fallback: atualiza valor_comissao APENAS se a coluna não for GENERATED.
+    # Rodamos em SAVEPOINT; se falhar (coluna gerada), fazemos rollback do savepoint e seguimos.
+    sp = db.session.begin_nested()
+    try:
+        db.session.execute(
+            text("UPDATE public.vendas SET valor_comissao = :vc WHERE id = :id"),
+            {"vc": decimal_reais(comissao_c), "id": sale_id}
+        )
+        sp.commit()
+    except Exception:
+        sp.rollback()
+
+    # repasse loja
+    venda_date = date.today()
+    rep_pct = repasse_percent_lote([(loja_id, venda_date)])[0] if loja_id else 0.0
+
+    # comissão do vendedor
+    vend = db.session.get(Vendedor, uid)
+    vendedor_c = comissoes_vendedor_lote([
+        (uid, (vend.tipo if vend else None), valor_c, venda_date, comissao_c)
+    ])[0]
+    fin = financeiro_centavos(comissao_c, rep_pct, vendedor_c)
+
+    _registra_evento_meta_venda(sale_id)
+    _notifica_vendas('venda_criada', sale_id)
+    db.session.commit()
+    return jsonify({
+        'id': sale_id,
+        'comissao': fin['comissao_real'],    # compat
+        **fin,
+    }), 201
+
+@bp.put('/sales/<int:sale_id>')
+@jwt_required()
+def update_sale(sale_id):
+    uid = int(get_jwt_identity())
+    claims = get_jwt(); role = claims.get('role')
+    v = Venda.query.get_or_404(sale_id)
+    if role != 'admin' and v.vendedor_id != uid:
+        return jsonify({'msg': 'Você não pode alterar esta venda'}), 403
+    if v.data_venda:
+        trava_mes_aberto(v.data_venda.year, v.data_venda.month)
+        if mes_fechado(v.data_venda.year, v.data_venda.month):
+            return jsonify({'msg': 'Venda de mês fechado não pode ser alterada'}), 409
+    antes = {c: getattr(v, c) for c in AUDIT_CAMPOS}
+
+    data = request.get_json(silent=True) or {}
+    if 'cliente_nome' in data:
+        n = (data.get('cliente_nome') or '').strip()
+        if not n: return jsonify({'msg': 'Nome inválido'}), 400
+        v.cliente_nome = n
+    if 'cliente_documento' in data:
+        d = apenas_digitos(data.get('cliente_documento') or '')
+        if not valida_documento(d): return jsonify({'msg': 'CPF/CNPJ inválido'}), 400
+        v.cliente_documento = d
+    if 'cliente_nome' in data or 'cliente_documento' in data:
+        v.cliente_id = upsert_cliente(v.cliente_documento, v.cliente_nome)
+    if 'valor' in data:
+        try:
+            v.valor = decimal_reais(centavos(data.get('valor')))
+        except Exception:
+            return jsonify({'msg': 'Valor inválido'}), 400
+    if 'status' in data:
+        s = (data.get('status') or '').strip()
+        if s not in ('enviada','aceita','recusada'):
+            return jsonify({'msg': 'Status inválido'}), 400
+        v.status = s
+    if 'observacoes' in data:
+        v.observacoes = (data.get('observacoes') or '').strip() or None
+
+    if 'banco_id' in data:
+        bid = data.get('banco_id')
+        if bid:
+            b = db.session.get(Banco, bid)
+            if not b: return jsonify({'msg': 'Banco não encontrado'}), 404
+            v.banco_id = bid; v.banco = b.nome
+        else:
+            v.banco_id = None
+    if 'loja_parceira_id' in data:
+        lid = data.get('loja_parceira_id')
+        if lid:
+            l = db.session.get(LojaParceira, lid)
+            if not l: return jsonify({'msg': 'Loja parceira não encontrada'}), 404
+            v.loja_parceira_id = lid; v.loja_parceira = l.nome
+        else:
+            v.loja_parceira_id = None
+
+    if 'perc_comissao_aplicado' in data:
+        raw = data.get('perc_comissao_aplicado')
+        if raw in (None, '', 'null'):
+            v.perc_comissao_aplicado = None
+        else:
+            try:
+                p = float(raw)
+                if p < 0 or p > 100:
+                    return jsonify({'msg': 'Percentual de comissão inválido'}), 400
+                v.perc_comissao_aplicado = p
+            except Exception:
+                return jsonify({'msg': 'Percentual de comissão inválido'}), 400
+
+    # percentual x tabela do banco vigente na data da venda
+    if ('perc_comissao_aplicado' in data or 'banco_id' in data) and v.banco_id:
+        dia = v.data_venda.date() if v.data_venda else date.today()
+        if not validar_percentuais_lote([(v.banco_id, dia, v.perc_comissao_aplicado)])[0]:
+            return jsonify({'msg': 'Percentual de comissão não permitido para este banco'}), 400
+
+    db.session.flush()
+
+    comissao_c = (
+        _calc_commission_value(_valor_c(v), v.perc_comissao_aplicado)
+        if v.perc_comissao_aplicado is not None
+        else calcular_comissao(v.vendedor_id, _valor_c(v))
+    )
+
+    sp = db.session.begin_nested()
+    try:
+        db.session.execute(
+            text("UPDATE public.vendas SET valor_comissao = :vc WHERE id = :id"),
+            {"vc": decimal_reais(comissao_c), "id": v.id}
+        )
+        sp.commit()
+    except Exception:
+        sp.rollback()
+
+    _registra_evento_meta_venda(v.id)
+    _notifica_vendas('venda_atualizada', v.id)
+    diffs = audit_diffs(v.id, antes, {c: getattr(v, c) for c in AUDIT_CAMPOS}, uid, 'edicao')
+    db.session.commit()
+    _auditoria.registrar(diffs)
+    return jsonify({'ok': True})
+
+@bp.get('/sales/<int:sale_id>/history')
+@jwt_required()
+@read_only
+def sale_history(sale_id):
+    """Alterações da venda (gravação assíncrona: a mais recente pode levar ~AUDIT_FLUSH_SEG)."""
+    claims = get_jwt(); role = claims.get('role')
+    uid = int(get_jwt_identity())
+    v = Venda.query.get_or_404(sale_id)
+    if role != 'admin' and v.vendedor_id != uid:
+        return jsonify({'msg': 'Venda não encontrada'}), 404
+    rows = (VendaAudit.query.filter_by(venda_id=sale_id)
+            .order_by(VendaAudit.alterado_em.asc(), VendaAudit.id.asc()).all())
+    nomes = {k: n for k, (n, _t) in _vendedores_info({r.alterado_por for r in rows if r.alterado_por}).items()}
+    return jsonify([{
+        'campo': r.campo, 'valor_antigo': r.valor_antigo, 'valor_novo': r.valor_novo,
+        'alterado_por': r.alterado_por, 'alterado_por_nome': nomes.get(r.alterado_por),
+        'alterado_em': r.alterado_em.isoformat(), 'origem': r.origem,
+    } for r in rows])
+
+VENDAS_LOTE_MAX = int(os.getenv('VENDAS_LOTE_MAX', '5000'))
+
+@bp.patch('/sales/batch')
+@jwt_required()
+def update_sales_batch():
+    """
+    Alteração em massa: {"ids": [...]} ou {"filtro": {status, banco_id, loja_id,
+    vendedor_id, data_inicio, data_fim}} + {"alteracoes": {status,
+    perc_comissao_aplicado, banco_id}}. Um único UPDATE ... WHERE id = ANY(...)
+    numa transação; devolve o resultado de cada venda.
+    """
+    uid = int(get_jwt_identity())
+    role = get_jwt().get('role')
+    data = request.get_json(silent=True) or {}
+    alt = data.get('alteracoes') or {}
+    if not isinstance(alt, dict) or not alt.keys() & {'status', 'perc_comissao_aplicado', 'banco_id'}:
+        return jsonify({'msg': 'Informe alteracoes (status, perc_comissao_aplicado e/ou banco_id)'}), 400
+
+    campos = {}
+    if 'status' in alt:
+        s = (alt.get('status') or '').strip()
+        if s not in ('enviada', 'aceita', 'recusada'):
+            return jsonify({'msg': 'Status inválido'}), 400
+        campos['status'] = s
+    if 'perc_comissao_aplicado' in alt:
+        raw = alt.get('perc_comissao_aplicado')
+        if raw in (None, '', 'null'):
+            campos['perc_comissao_aplicado'] = None
+        else:
+            try:
+                p = float(raw)
+            except Exception:
+                return jsonify({'msg': 'Percentual de comissão inválido'}), 400
+            if p < 0 or p > 100:
+                return jsonify({'msg': 'Percentual de comissão inválido'}), 400
+            campos['perc_comissao_aplicado'] = p
+    if 'banco_id' in alt:
+        bid = _to_int_or_none(alt.get('banco_id'))
+        campos['banco_id'] = bid
+        if bid:
+            b = db.session.get(Banco, bid)
+            if not b:
+                return jsonify({'msg': 'Banco não encontrado'}), 404
+            campos['banco'] = b.nome
+
+    # candidatos, travados em ordem de id (lotes concorrentes não se bloqueiam em ciclo)
+    q = db.session.query(Venda.id, Venda.vendedor_id, Venda.data_venda, Venda.banco_id,
+                         Venda.perc_comissao_aplicado, Venda.status)
+    ids_pedidos = None
+    if data.get('ids') is not None:
+        try:
+            ids_pedidos = list(dict.fromkeys(int(i) for i in data.get('ids')))
+        except Exception:
+            return jsonify({'msg': 'ids deve ser uma lista de inteiros'}), 400
+        if not ids_pedidos:
+            return jsonify({'msg': 'ids vazio'}), 400
+        if len(ids_pedidos) > VENDAS_LOTE_MAX:
+            return jsonify({'msg': f'Máximo de {VENDAS_LOTE_MAX} vendas por lote'}), 400
+        q = q.filter(Venda.id.in_(ids_pedidos))
+    else:
+        f = data.get('filtro') or {}
+        if not isinstance(f, dict) or not f:
+            return jsonify({'msg': 'Informe ids ou filtro'}), 400
+        if f.get('status'):
+            q = q.filter(Venda.status == f['status'])
+        if _to_int_or_none(f.get('banco_id')):
+            q = q.filter(Venda.banco_id == _to_int_or_none(f['banco_id']))
+        if _to_int_or_none(f.get('loja_id')):
+            q = q.filter(Venda.loja_parceira_id == _to_int_or_none(f['loja_id']))
+        dt_ini, dt_fim = parse_date(f.get('data_inicio')), parse_date(f.get('data_fim'))
+        if dt_ini:
+            q = q.filter(Venda.data_venda >= datetime.combine(dt_ini, datetime.min.time()))
+        if dt_fim:
+            q = q.filter(Venda.data_venda < datetime.combine(dt_fim + timedelta(days=1), datetime.min.time()))
+        if role != 'admin':
+            q = q.filter(Venda.vendedor_id == uid)
+        elif _to_int_or_none(f.get('vendedor_id')):
+            q = q.filter(Venda.vendedor_id == _to_int_or_none(f['vendedor_id']))
+    linhas = q.order_by(Venda.id.asc()).limit(VENDAS_LOTE_MAX + 1).with_for_update().all()
+    if ids_pedidos is None and len(linhas) > VENDAS_LOTE_MAX:
+        db.session.rollback()
+        return jsonify({'msg': f'Filtro abrange mais de {VENDAS_LOTE_MAX} vendas; refine o filtro'}), 400
+
+    for ano, mes in sorted({(r.data_venda.year, r.data_venda.month) for r in linhas if r.data_venda}):
+        trava_mes_aberto(ano, mes)
+    fechados = {(f.ano, f.mes) for f in FechamentoMes.query.all()}
+    encontrados = {r.id: r for r in linhas}
+    ordem = ids_pedidos if ids_pedidos is not None else [r.id for r in linhas]
+    candidatos = []
+    resultado = {}
+    for vid in ordem:
+        r = encontrados.get(vid)
+        if r is None:
+            resultado[vid] = 'nao_encontrada'
+        elif role != 'admin' and r.vendedor_id != uid:
+            resultado[vid] = 'sem_permissao'
+        elif r.data_venda and (r.data_venda.year, r.data_venda.month) in fechados:
+            resultado[vid] = 'mes_fechado'
+        else:
+            candidatos.append(r)
+    # percentual x tabela do banco vigente na data de cada venda (índice em memória)
+    if 'perc_comissao_aplicado' in campos or 'banco_id' in campos:
+        permitidos = validar_percentuais_lote([
+            (campos.get('banco_id', r.banco_id),
+             r.data_venda.date() if r.data_venda else date.today(),
+             campos.get('perc_comissao_aplicado', r.perc_comissao_aplicado))
+            for r in candidatos
+        ])
+        for r, ok in zip(candidatos, permitidos):
+            if not ok:
+                resultado[r.id] = 'percentual_nao_permitido'
+    ok_ids = [r.id for r in candidatos if r.id not in resultado]
+
+    if ok_ids:
+        sets = ', '.join(f'{c} = :{c}' for c in campos)
+        db.session.execute(text(f"UPDATE public.vendas SET {sets} WHERE id = ANY(:ids)"),
+                           {**campos, 'ids': ok_ids})
+        if 'perc_comissao_aplicado' in campos:
+            _regrava_valor_comissao(ok_ids)
+        _registra_evento_meta_venda(ok_ids)
+        _notifica_vendas('venda_atualizada', ok_ids)
+    db.session.commit()
+    diffs = []
+    for vid in ok_ids:
+        r = encontrados[vid]
+        antes = {'status': r.status, 'perc_comissao_aplicado': r.perc_comissao_aplicado, 'banco_id': r.banco_id}
+        diffs += audit_diffs(vid, antes, {c: campos[c] for c in antes if c in campos}, uid, 'lote')
+        resultado[vid] = 'ok'
+    _auditoria.registrar(diffs)
+    return jsonify({
+        'atualizadas': len(ok_ids),
+        'resultados': [{'id': vid, 'resultado': resultado[vid]} for vid in ordem],
+    })
+
+@bp.get('/clients/<int:cliente_id>/sales')
+@jwt_required()
+@read_only
+def client_sales(cliente_id):
+    """Histórico do cliente: uma busca no índice (cliente_id, data_venda)."""
+    claims = get_jwt(); role = claims.get('role')
+    uid = int(get_jwt_identity())
+    c = Cliente.query.get_or_404(cliente_id)
+    q = Venda.query.filter(Venda.cliente_id == cliente_id)
+    if role != 'admin':
+        q = q.filter(Venda.vendedor_id == uid)
+    vendas = q.order_by(Venda.data_venda.desc()).limit(1000).all()
+    if role != 'admin' and not vendas:
+        return jsonify({'msg': 'Cliente não encontrado'}), 404
+    vendedores = _vendedores_info({v.vendedor_id for v in vendas})
+    financeiro = calcular_financeiro_lote(vendas, vendedores)
+    nomes = ({k: n for k, (n, _t) in vendedores.items()} if role == 'admin' else {})
+    return jsonify({
+        'cliente': {'id': c.id, 'nome': c.nome, 'documento': c.documento},
+        'vendas': _lista_vendas([_venda_to_dict(v, fin, nomes.get(v.vendedor_id))
+                                 for v, fin in zip(vendas, financeiro)]),
+    })
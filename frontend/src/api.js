@@ -46,10 +46,27 @@ try {
   if (saved) setToken(saved);
 } catch {}
 
+// Read-your-writes com réplica de leitura: o backend devolve o LSN da última
+// escrita em X-Escrita-LSN e só lê da réplica quando ela já chegou nele.
+// Guardado no localStorage para valer entre abas.
+const HEADER_LSN = 'x-escrita-lsn';
+
+api.interceptors.request.use((config) => {
+  let lsn = null;
+  try { lsn = localStorage.getItem('escritaLsn'); } catch {}
+  if (lsn) config.headers[HEADER_LSN] = lsn;
+  return config;
+});
+
 // Interceptor global de respostas:
+// - Guarda o LSN da última escrita (read-your-writes).
 // - Se receber 401 (não autenticado), limpa sessão e leva para o login.
 api.interceptors.response.use(
-  (res) => res,
+  (res) => {
+    const lsn = res?.headers?.[HEADER_LSN];
+    if (lsn) { try { localStorage.setItem('escritaLsn', lsn); } catch {} }
+    return res;
+  },
   (err) => {
     const status = err?.response?.status;
     if (status === 401) {
@@ -65,6 +82,26 @@ api.interceptors.response.use(
   }
 );
 
+// Eventos ao vivo (SSE) de vendas criadas/alteradas.
+// onEvent recebe { evento, id, vendedor_id, mes, status } ou { evento: 'resync' }
+// (eventos podem ter se perdido: recarregue tudo). Retorna a função para fechar.
+export function subscribeSalesEvents(onEvent){
+  let token = null;
+  try { token = localStorage.getItem('token'); } catch {}
+  if (!token || typeof window === 'undefined' || !window.EventSource) return () => {};
+  const es = new EventSource(`${API_BASE}/events?jwt=${encodeURIComponent(token)}`);
+  es.addEventListener('venda', (e) => {
+    try { onEvent(JSON.parse(e.data)); } catch {}
+  });
+  es.addEventListener('resync', () => onEvent({ evento: 'resync' }));
+  // token expirou: para de reconectar (a próxima requisição leva ao login)
+  es.addEventListener('expired', () => es.close());
+  return () => es.close();
+}
+
+// Listagens com ?format=columnar (decodificador em colunar.js, testável sem axios)
+export { fromColumnar } from './colunar';
+
 // Opcional: exporta a BASE para facilitar debug no console
 export { API_BASE };
 
@@ -0,0 +1,19 @@
+// frontend/src/colunar.js
+// Listagens com ?format=columnar: { colunas: {campo: [...]}, dicionarios: {campo: [...]} }
+// -> array de objetos (as colunas em dicionário trazem o índice do valor).
+export function fromColumnar(payload){
+  if (Array.isArray(payload)) return payload;
+  const colunas = { ...(payload?.colunas || {}) };
+  Object.entries(payload?.dicionarios || {}).forEach(([k, valores]) => {
+    if (colunas[k]) colunas[k] = colunas[k].map((i) => (i == null ? null : valores[i]));
+  });
+  const chaves = Object.keys(colunas);
+  const n = payload?.linhas || 0;
+  const out = new Array(n);
+  for (let i = 0; i < n; i++){
+    const row = {};
+    for (const k of chaves) row[k] = colunas[k][i];
+    out[i] = row;
+  }
+  return out;
+}
@@ -0,0 +1,37 @@
+// frontend/src/colunar.test.js
+import { fromColumnar } from './colunar';
+
+// mesmo payload que backend/colunar.py gera para as linhas abaixo
+const LINHAS = [
+  { id: 7, banco: 'Itaú', status: 'aceita', valor: 1500.0, vendedor_nome: null },
+  { id: 6, banco: 'Itaú', status: 'enviada', valor: 820.5, vendedor_nome: 'Ana' },
+  { id: 5, banco: null, status: 'aceita', valor: 0.01, vendedor_nome: 'Ana' },
+];
+const PAYLOAD = {
+  formato: 'colunar',
+  linhas: 3,
+  colunas: {
+    id: [7, 6, 5], banco: [0, 0, null], status: [0, 1, 0],
+    valor: [1500.0, 820.5, 0.01], vendedor_nome: [null, 0, 0],
+  },
+  dicionarios: { banco: ['Itaú'], status: ['aceita', 'enviada'], vendedor_nome: ['Ana'] },
+};
+
+test('fromColumnar reconstrói as linhas (dicionários e null)', () => {
+  expect(fromColumnar(PAYLOAD)).toEqual(LINHAS);
+});
+
+test('fromColumnar não altera o payload recebido', () => {
+  const copia = JSON.parse(JSON.stringify(PAYLOAD));
+  fromColumnar(PAYLOAD);
+  expect(PAYLOAD).toEqual(copia);
+});
+
+test('fromColumnar devolve arrays (formato antigo) sem mexer', () => {
+  expect(fromColumnar(LINHAS)).toBe(LINHAS);
+});
+
+test('fromColumnar com payload vazio', () => {
+  expect(fromColumnar({ formato: 'colunar', linhas: 0, colunas: {}, dicionarios: {} })).toEqual([]);
+  expect(fromColumnar(null)).toEqual([]);
+});
@@ -1,7 +1,7 @@
 // frontend/src/components/Shell.jsx
 import React from 'react';
 import { Link, NavLink, useNavigate } from 'react-router-dom';
-import { getUserInfo } from '../api';
+import api, { getUserInfo, setToken } from '../api';
 
 export default function Shell({ children, onLogout }) {
   const nav = useNavigate();
@@ -9,7 +9,9 @@ export default function Shell({ children, onLogout }) {
   const isAdmin = user?.role === 'admin';
 
   function logout() {
-    localStorage.removeItem('token');
+    // revoga o token no backend (sem esperar: a sessão local acaba de qualquer jeito)
+    api.post('/auth/logout').catch(() => {});
+    setToken(null);
     localStorage.removeItem('user');
     onLogout?.();
     nav('/login', { replace: true });
@@ -1,5 +1,5 @@
-import React, { useEffect, useMemo, useState } from 'react';
-import api, { getUserInfo } from '../api';
+import React, { useEffect, useMemo, useRef, useState } from 'react';
+import api, { getUserInfo, subscribeSalesEvents } from '../api';
 import { Bar, Doughnut } from 'react-chartjs-2';
 import {
   Chart as ChartJS, BarElement, ArcElement, CategoryScale, LinearScale, Tooltip, Legend
@@ -101,6 +101,20 @@ export default function Dashboard(){
 
   useEffect(()=>{ loadFilters(); fetchStats(); /* eslint-disable-next-line */ },[]);
 
+  // ao vivo: recarrega só quando muda venda de um mês do período exibido
+  const liveRef = useRef({});
+  liveRef.current = { fetchStats, start: toYearMonth(startDate), end: toYearMonth(endDate) };
+  useEffect(() => {
+    let timer = null;
+    const unsubscribe = subscribeSalesEvents((ev) => {
+      const { start, end } = liveRef.current;
+      if (ev.evento !== 'resync' && (ev.mes < start || ev.mes > end)) return;
+      clearTimeout(timer);
+      timer = setTimeout(() => liveRef.current.fetchStats(), 1000);
+    });
+    return () => { clearTimeout(timer); unsubscribe(); };
+  }, []);
+
   // Totais
   const totals = useMemo(() => {
     const t = data?.totals || { count: 0, sum: 0 };
@@ -1,8 +1,15 @@
 // frontend/src/sections/AddSale.jsx
-import React, { useEffect, useMemo, useState } from 'react';
+import React, { useEffect, useMemo, useRef, useState } from 'react';
 import api from '../api';
 
 function onlyDigits(s=''){ return s.replace(/\D/g,''); }
+
+// chave por tentativa de cadastro: reenvios (rede ruim) não duplicam a venda
+function newIdempotencyKey(){
+  try { if (window.crypto?.randomUUID) return window.crypto.randomUUID(); } catch {}
+  return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
 function maskCpfCnpj(v=''){
   const d = onlyDigits(v);
   if(d.length <= 11){ // CPF: 000.000.000-00
@@ -85,8 +92,10 @@ export default function AddSale({ onCreated, onBankChange }){
     setDoc(maskCpfCnpj(value));
   }
 
-  async function submit(e){
-    e.preventDefault();
+  const idemKey = useRef(null);
+
+  async function submit(e, confirmarDuplicada = false){
+    e?.preventDefault();
     setMsg('');
 
     const payload = {
@@ -99,10 +108,16 @@ export default function AddSale({ onCreated, onBankChange }){
       loja_parceira_id: loja_parceira_id || undefined,
       // envia a comissão escolhida (em %)
       perc_comissao_aplicado: percComissao ? Number(percComissao) : undefined,
+      // proposta igual já registrada hoje: só reenvia depois da confirmação
+      confirmar_duplicada: confirmarDuplicada || undefined,
     };
 
+    if(!idemKey.current) idemKey.current = newIdempotencyKey();
     try{
-      const { data } = await api.post('/sales', payload);
+      const { data } = await api.post('/sales', payload, {
+        headers: { 'Idempotency-Key': idemKey.current },
+      });
+      idemKey.current = null;
       setMsg(`Venda #${data.id} salva.`);
       // limpa
       setCliente(''); setDoc(''); setValor(''); setStatus('enviada'); setObs('');
@@ -110,6 +125,13 @@ export default function AddSale({ onCreated, onBankChange }){
       onCreated?.();
       onBankChange?.(null);
     }catch(err){
+      // com resposta do servidor a tentativa terminou; sem resposta, reenvia com a mesma chave
+      if(err?.response) idemKey.current = null;
+      const dup = err?.response?.status === 409 ? err.response.data?.duplicada_de : undefined;
+      if(dup !== undefined && !confirmarDuplicada
+         && window.confirm(`Já existe uma proposta igual hoje (venda #${dup}: cliente, banco e valor). Registrar mesmo assim?`)){
+        return submit(null, true);
+      }
       setMsg(err?.response?.data?.msg || 'Erro ao salvar');
     }
   }
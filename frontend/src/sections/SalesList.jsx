@@ -1,6 +1,6 @@
 // frontend/src/sections/SalesList.jsx
-import React, { useEffect, useMemo, useState } from 'react';
-import api, { getUserInfo } from '../api';
+import React, { useEffect, useMemo, useRef, useState } from 'react';
+import api, { fromColumnar, getUserInfo, subscribeSalesEvents } from '../api';
 import EditSaleModal from './EditSaleModal';
 
 // Paginação compacta
@@ -60,19 +60,31 @@ export default function SalesList(){
     loadRefs();
   }, [isAdmin]);
 
-  async function fetch(){
-    const params = { cliente_nome, cliente_documento, status };
+  async function fetch({ keepPage = false } = {}){
+    const params = { cliente_nome, cliente_documento, status, format: 'columnar' };
     if (bancoId) params.banco_id = bancoId;
     if (lojaId) params.loja_id = lojaId;
     if (isAdmin && vendedorId) params.vendedor_id = vendedorId;
 
     const { data } = await api.get('/sales', { params });
-    setItems(data || []);
-    setPage(1);
+    setItems(fromColumnar(data));
+    if (!keepPage) setPage(1);
   }
 
   useEffect(()=>{ fetch(); /* eslint-disable-next-line */ },[refreshKey]);
 
+  // ao vivo: recarrega (mantendo a página) quando chega evento de venda
+  const fetchRef = useRef(fetch);
+  fetchRef.current = fetch;
+  useEffect(() => {
+    let timer = null;
+    const unsubscribe = subscribeSalesEvents(() => {
+      clearTimeout(timer);
+      timer = setTimeout(() => fetchRef.current({ keepPage: true }).catch(() => {}), 1000);
+    });
+    return () => { clearTimeout(timer); unsubscribe(); };
+  }, []);
+
   const totalPages = Math.max(1, Math.ceil((items?.length || 0) / pageSize));
   const pagedItems = useMemo(() => {
     const start = (page - 1) * pageSize;